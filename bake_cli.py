@@ -0,0 +1,136 @@
+"""
+命令行批量烘焙, 用于无界面的渲染机(如每晚重新烘焙):
+    blender -b --factory-startup -P bake_cli.py -- a.blend b.blend --tree "Bake Recipe" --json summary.json
+    blender -b --factory-startup -P bake_cli.py -- a.blend --list
+    blender -b --factory-startup -P bake_cli.py -- a.blend --resume     # 跳过上次中断前已完成的任务
+依次打开每个 blend 文件, 同步执行选中的(默认全部) BakeNodeTree, 所有文件共用同一组常驻后台进程
+退出码: 0 全部成功, 1 有烘焙错误, 2 参数错误/文件无法打开/找不到节点树
+"""
+from __future__ import annotations
+import sys
+import json
+import time
+import argparse
+import importlib
+import traceback
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent
+
+EXIT_OK = 0
+EXIT_BAKE_ERROR = 1
+EXIT_USAGE = 2
+
+
+def parse_args(argv: list[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="bake_cli")
+    parser.add_argument("files", nargs="+", help=".blend files")
+    parser.add_argument("--tree", action="append", default=[], help="Bake tree name, repeatable (default: all)")
+    parser.add_argument("--json", default="", help="Write JSON summary to this path")
+    parser.add_argument("--list", action="store_true", help="List bake trees and exit")
+    parser.add_argument("--fail-fast", action="store_true", help="Stop at the first failed tree")
+    parser.add_argument("--resume", action="store_true", help="Skip jobs completed by an interrupted run")
+    return parser.parse_args(argv)
+
+
+def enable_addon():
+    import addon_utils
+    # 插件目录即包, 从上级目录导入
+    if ROOT.parent.as_posix() not in sys.path:
+        sys.path.insert(0, ROOT.parent.as_posix())
+    if addon_utils.enable(ROOT.name, default_set=True) is None:
+        raise RuntimeError(f"Enable add-on failed: {ROOT.name}")
+    return sys.modules[ROOT.name]
+
+
+def addon_module(name: str):
+    # 脚本以 __main__ 运行, 不能使用相对导入
+    return importlib.import_module(f"{ROOT.name}.{name}")
+
+
+def run_tree(tree, resume=False) -> dict:
+    TNodeTree = addon_module("src.node_tree.node_tree").TNodeTree
+    TaskExecutor = addon_module("src.node_tree.executor").TaskExecutor
+    BakeResult = addon_module("src.node_tree.api").BakeResult
+    task = tree.dump()
+    if resume:
+        TNodeTree.set_resume(task)
+    task.pop("Tree", None)
+    start = time.perf_counter()
+    try:
+        # 主线程同步执行, Timer.submit 直接运行
+        result = BakeResult.from_results(tree.name, TNodeTree.execute_task(TaskExecutor, task))
+    except Exception as e:
+        traceback.print_exc()
+        result = BakeResult(tree.name)
+        result.errors.append({"error": f"{type(e).__name__}: {e}"})
+    result.wall = time.perf_counter() - start
+    return result.to_dict()
+
+
+def run_file(path: str, args: argparse.Namespace) -> dict:
+    import bpy
+    TREE_TYPE = addon_module("src.node_tree.node_tree").TREE_TYPE
+    summary = {"path": path, "trees": []}
+    try:
+        bpy.ops.wm.open_mainfile(filepath=path, load_ui=False)
+    except RuntimeError as e:
+        summary["error"] = str(e)
+        return summary
+    trees = [t for t in bpy.data.node_groups if t.bl_idname == TREE_TYPE]
+    if args.tree:
+        missing = set(args.tree) - {t.name for t in trees}
+        if missing:
+            summary["error"] = f"Bake tree not found: {', '.join(sorted(missing))}"
+        trees = [t for t in trees if t.name in args.tree]
+    if not trees and "error" not in summary:
+        summary["error"] = "No bake tree"
+    for tree in trees:
+        if args.list:
+            summary["trees"].append({"name": tree.name, "outputs": [n.name for n in tree.get_outputs()]})
+            continue
+        print(f"[BakeCLI] {Path(path).name}: {tree.name}")
+        result = run_tree(tree, args.resume)
+        print(f"[BakeCLI] {tree.name}: {result['status']} {result['wall']:.2f}s")
+        summary["trees"].append(result)
+        if args.fail_fast and result["errors"]:
+            break
+    return summary
+
+
+def exit_code(files: list[dict]) -> int:
+    if any("error" in f for f in files):
+        return EXIT_USAGE
+    if any(t.get("status") == "failed" for f in files for t in f["trees"]):
+        return EXIT_BAKE_ERROR
+    return EXIT_OK
+
+
+def main(argv: list[str]) -> int:
+    try:
+        args = parse_args(argv)
+    except SystemExit as e:
+        return EXIT_USAGE if e.code else EXIT_OK
+    enable_addon()
+    WorkerPool = addon_module("src.node_tree.worker").WorkerPool
+    WorkerPool.keep_warm = True
+    files = []
+    try:
+        for path in args.files:
+            files.append(run_file(Path(path).resolve().as_posix(), args))
+            if args.fail_fast and exit_code(files) != EXIT_OK:
+                break
+    finally:
+        WorkerPool.close_all()
+    code = exit_code(files)
+    report = json.dumps({"exit_code": code, "files": files}, indent=2, ensure_ascii=False)
+    if args.json:
+        Path(args.json).write_text(report, encoding="utf-8")
+    else:
+        print(report)
+    return code
+
+
+if __name__ == "__main__":
+    # blender 会把 "--" 之后的参数原样留给脚本
+    sys.exit(main(sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []))
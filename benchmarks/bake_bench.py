@@ -0,0 +1,297 @@
+"""
+端到端烘焙基准测试, 在后台 blender 中运行:
+    blender -b --factory-startup -P benchmarks/bake_bench.py -- --out bench.json
+    blender -b --factory-startup -P benchmarks/bake_bench.py -- --polys 10000 --objects 1 --resolutions 512 --samples 1
+程序化生成不同面数/物体数的场景, 为每种分辨率构建节点树(BlenderPass + PBRPass + 所有 CustomPass 预设),
+以 CPU Cycles 同步执行, 输出各用例的总耗时、分阶段耗时(来自 Trace)和每个通道的记录(来自 PerfHistory)
+比较两次(两个版本)的结果, 不需要 blender:
+    python benchmarks/bake_bench.py --compare old.json new.json
+"""
+from __future__ import annotations
+import os
+import sys
+import json
+import math
+import time
+import platform
+import argparse
+import subprocess
+from pathlib import Path
+from tempfile import mkdtemp
+
+ROOT = Path(__file__).resolve().parent.parent
+
+DEFAULT_POLYS = [10_000, 100_000, 1_000_000]
+DEFAULT_OBJECTS = [1, 8]
+DEFAULT_RESOLUTIONS = [512, 1024]
+BENCH_NAME = "BakeBench"
+BLENDER_PASSES = {"NORMAL", "AO"}
+PBR_PASSES = {"Albedo", "Roughness", "Normal"}
+# 按名称前缀合并的阶段(名称中带有物体/通道/图片名)
+STAGE_PREFIXES = {"Bake ": "Bake Job", "Derive ": "Derive", "Save ": "Save Image"}
+
+
+def parse_args(argv: list[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="bake_bench")
+    ints = lambda s: [int(float(i)) for i in s.split(",") if i]
+    parser.add_argument("--out", default="", help="JSON report path")
+    parser.add_argument("--polys", type=ints, default=DEFAULT_POLYS, help="Total polygons per scene, comma separated")
+    parser.add_argument("--objects", type=ints, default=DEFAULT_OBJECTS, help="Object counts, comma separated")
+    parser.add_argument("--resolutions", type=ints, default=DEFAULT_RESOLUTIONS, help="Bake resolutions, comma separated")
+    parser.add_argument("--samples", type=int, default=1)
+    parser.add_argument("--passes", default="blender,pbr,custom", help="Pass nodes to include: blender,pbr,custom")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="Compare two reports and exit")
+    return parser.parse_args(argv)
+
+
+def script_argv() -> list[str]:
+    # blender 会把 "--" 之后的参数原样留给脚本
+    return sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else sys.argv[1:]
+
+
+def git_revision() -> str:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, timeout=5)
+        dirty = subprocess.run(["git", "status", "--porcelain"], cwd=ROOT, capture_output=True, text=True, timeout=5)
+    except (OSError, subprocess.SubprocessError):
+        return ""
+    return out.stdout.strip() + ("-dirty" if dirty.stdout.strip() else "")
+
+
+def aggregate_stages(events: list[dict]) -> dict[str, dict]:
+    """
+    Trace 事件按阶段名汇总: {name: {"count", "total"(秒), "max"(秒)}}
+    """
+    stages = {}
+    for event in events:
+        if event.get("ph") != "X" or event.get("cat") == "node":
+            continue
+        name = event["name"]
+        for prefix, stage in STAGE_PREFIXES.items():
+            if name.startswith(prefix):
+                name = stage
+                break
+        dur = event.get("dur", 0) / 1e6
+        item = stages.setdefault(name, {"count": 0, "total": 0.0, "max": 0.0})
+        item["count"] += 1
+        item["total"] += dur
+        item["max"] = max(item["max"], dur)
+    return stages
+
+
+def best_cases(report: dict) -> dict[str, dict]:
+    # 重复运行的用例取总耗时最短的一次
+    cases = {}
+    for case in report.get("cases", []):
+        if case["name"] not in cases or case["wall"] < cases[case["name"]]["wall"]:
+            cases[case["name"]] = case
+    return cases
+
+
+def compare(old_path: str, new_path: str) -> str:
+    old = json.loads(Path(old_path).read_text(encoding="utf-8"))
+    new = json.loads(Path(new_path).read_text(encoding="utf-8"))
+    old_cases = best_cases(old)
+    lines = [f"{old['meta'].get('revision', old_path)} -> {new['meta'].get('revision', new_path)}",
+             f"{'Case':<36}{'Stage':<20}{'Old(s)':>10}{'New(s)':>10}{'Ratio':>8}"]
+    for case in best_cases(new).values():
+        base = old_cases.get(case["name"])
+        if not base:
+            lines.append(f"{case['name']:<36}{'(new case)':<20}")
+            continue
+        rows = [("Wall", base["wall"], case["wall"])]
+        for stage in sorted(set(base["stages"]) | set(case["stages"])):
+            rows.append((stage, base["stages"].get(stage, {}).get("total", 0), case["stages"].get(stage, {}).get("total", 0)))
+        for stage, a, b in rows:
+            ratio = f"{b / a:>8.2f}" if a else f"{'-':>8}"
+            lines.append(f"{case['name']:<36}{stage:<20}{a:>10.3f}{b:>10.3f}{ratio}")
+    return "\n".join(lines)
+
+
+class Bench:
+    """
+    所有 bpy 相关操作, 仅在 blender 中使用
+    """
+
+    def __init__(self, args: argparse.Namespace):
+        import bpy
+        self.bpy = bpy
+        self.args = args
+        self.work_dir = Path(mkdtemp(prefix="bake_bench_"))
+        self.addon = None
+
+    def enable_addon(self):
+        import addon_utils
+        # 仓库根目录即插件包, 从上级目录导入
+        sys.path.insert(0, ROOT.parent.as_posix())
+        self.addon = addon_utils.enable(ROOT.name, default_set=True)
+        if self.addon is None:
+            raise RuntimeError(f"Enable add-on failed: {ROOT.name}")
+        # 基准测试不写入用户的性能历史
+        perf_history = sys.modules[f"{ROOT.name}.src.node_tree.perf_history"]
+        perf_history.PerfHistory.close()
+        perf_history.PerfHistory.db_path = self.work_dir.joinpath("perf_history.sqlite")
+
+    def module(self, name: str):
+        return sys.modules[f"{ROOT.name}.{name}"]
+
+    def setup_scene(self):
+        scene = self.bpy.context.scene
+        scene.render.engine = "CYCLES"
+        scene.cycles.device = "CPU"
+        scene.cycles.samples = self.args.samples
+        return scene
+
+    def clear_scene(self):
+        bpy = self.bpy
+        coll = bpy.data.collections.get(BENCH_NAME)
+        if coll:
+            for obj in list(coll.objects):
+                bpy.data.objects.remove(obj)
+            bpy.data.collections.remove(coll)
+        for datas in (bpy.data.meshes, bpy.data.materials, bpy.data.node_groups):
+            for item in list(datas):
+                if item.name.startswith(BENCH_NAME):
+                    datas.remove(item)
+        # 烘焙结果图片以物体/通道命名
+        for img in list(bpy.data.images):
+            if img.users == 0:
+                bpy.data.images.remove(img)
+
+    def build_scene(self, polys: int, objects: int):
+        """
+        每个物体是一张带起伏的网格, 面数平均分配, 各自带 UV 和 Principled 材质
+        """
+        import bmesh
+        bpy = self.bpy
+        coll = bpy.data.collections.new(BENCH_NAME)
+        self.bpy.context.scene.collection.children.link(coll)
+        segments = max(int(math.sqrt(polys / objects)), 1)
+        cols = math.ceil(math.sqrt(objects))
+        for i in range(objects):
+            bm = bmesh.new()
+            bm.loops.layers.uv.new("UVMap")
+            bmesh.ops.create_grid(bm, x_segments=segments, y_segments=segments, size=1, calc_uvs=True)
+            for v in bm.verts:
+                v.co.z = 0.1 * math.sin(v.co.x * 12) * math.cos(v.co.y * 9)
+            mesh = bpy.data.meshes.new(f"{BENCH_NAME}_{i}")
+            bm.to_mesh(mesh)
+            bm.free()
+            mat = bpy.data.materials.new(f"{BENCH_NAME}_{i}")
+            mat.use_nodes = True
+            bsdf = mat.node_tree.nodes.get("Principled BSDF")
+            if bsdf:
+                bsdf.inputs["Base Color"].default_value = (0.2 + 0.6 * (i % 2), 0.4, 0.6, 1)
+                bsdf.inputs["Roughness"].default_value = 0.3 + 0.4 * (i % 3) / 2
+            mesh.materials.append(mat)
+            obj = bpy.data.objects.new(f"{BENCH_NAME}_{i}", mesh)
+            obj.location = (i % cols * 2.5, i // cols * 2.5, 0)
+            coll.objects.link(obj)
+        return coll
+
+    def build_tree(self, coll, resolution: int):
+        bpy = self.bpy
+        tree = bpy.data.node_groups.new(BENCH_NAME, self.module("src.node_tree.node_tree").TREE_TYPE)
+        nodes, links = tree.nodes, tree.links
+        bake = nodes.new("Bake")
+        meshes = nodes.new("CollectionMesh")
+        meshes.collection = coll
+        links.new(meshes.outputs["Mesh"], bake.inputs["Meshes"])
+        setting = nodes.new("BakeSetting")
+        setting.resolution = (resolution, resolution)
+        setting.samples = self.args.samples
+        links.new(setting.outputs["Bake Setting"], bake.inputs["Bake Setting"])
+        kinds = set(self.args.passes.split(","))
+        if "blender" in kinds:
+            node = nodes.new("Pass")
+            node.bake_passes = BLENDER_PASSES
+            links.new(node.outputs["Pass"], bake.inputs["Pass"])
+        if "pbr" in kinds:
+            node = nodes.new("PBRPass")
+            node.bake_passes = PBR_PASSES
+            links.new(node.outputs["Pass"], bake.inputs["Pass"])
+        if "custom" in kinds:
+            node = nodes.new("CustomPass")
+            presets = {item[0] for item in node.bake_pass_items()}
+            if presets:
+                node.bake_passes = presets
+                links.new(node.outputs["Pass"], bake.inputs["Pass"])
+            else:
+                nodes.remove(node)
+        save = nodes.new("SaveToImage")
+        save.directory = self.work_dir.joinpath("images").as_posix()
+        save.file_format = "PNG"
+        links.new(bake.outputs["Image"], save.inputs["Image"])
+        return tree
+
+    def run_case(self, polys: int, objects: int, resolution: int, repeat: int) -> dict:
+        name = f"p{polys}_o{objects}_r{resolution}_s{self.args.samples}"
+        executor = self.module("src.node_tree.executor").TaskExecutor
+        node_tree = self.module("src.node_tree.node_tree")
+        perf_history = self.module("src.node_tree.perf_history").PerfHistory
+        trace = self.module("utils.trace").Trace
+        self.clear_scene()
+        coll = self.build_scene(polys, objects)
+        tree = self.build_tree(coll, resolution)
+        task = tree.dump()
+        task.pop("Tree")
+        since = time.time()
+        start = time.perf_counter()
+        # 主线程同步执行, Timer.submit 直接运行
+        node_tree.TNodeTree.execute_task(executor, task)
+        wall = time.perf_counter() - start
+        tracer = trace.last
+        rows = perf_history.query(since=since, limit=100000)
+        return {
+            "name": name,
+            "repeat": repeat,
+            "polys": polys,
+            "objects": objects,
+            "resolution": resolution,
+            "samples": self.args.samples,
+            "wall": wall,
+            "stages": aggregate_stages(tracer.events if tracer else []),
+            "passes": [{k: r[k] for k in ("object", "cat", "pass", "wall", "peak_mem", "stages", "resources")} for r in rows],
+        }
+
+    def run(self) -> dict:
+        bpy = self.bpy
+        self.enable_addon()
+        self.setup_scene()
+        report = {
+            "meta": {
+                "revision": git_revision(),
+                "blender": bpy.app.version_string,
+                "platform": platform.platform(),
+                "cpu_count": os.cpu_count(),
+                "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "args": {k: v for k, v in vars(self.args).items() if k not in {"out", "compare"}},
+            },
+            "cases": [],
+        }
+        for polys in self.args.polys:
+            for objects in self.args.objects:
+                for resolution in self.args.resolutions:
+                    for repeat in range(self.args.repeat):
+                        case = self.run_case(polys, objects, resolution, repeat)
+                        print(f"[Bench] {case['name']}#{repeat}: {case['wall']:.3f}s")
+                        report["cases"].append(case)
+        self.clear_scene()
+        return report
+
+
+def main():
+    args = parse_args(script_argv())
+    if args.compare:
+        print(compare(*args.compare))
+        return
+    report = Bench(args).run()
+    out = Path(args.out or ROOT.joinpath("logs", "bench", f"{time.strftime('%Y%m%d-%H%M%S')}.json"))
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"[Bench] report: {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+微基准测试用的最小 bpy 替身, 只够导入插件模块并运行纯 Python/NumPy 的热点路径
+    bpy.types.* 为空类, bpy.props.* 返回 None, bpy.data.images 为 NumPy 实现的图片集合
+    不追求行为一致, 只保证 ImageCombine/SHM 读取等路径能走到与 blender 中相同的代码
+"""
+from __future__ import annotations
+import sys
+import types
+import tempfile
+import numpy as np
+
+
+class FakePixels:
+    def __init__(self, image: FakeImage):
+        self.image = image
+
+    def __len__(self):
+        return self.image.data.size
+
+    def foreach_get(self, seq):
+        seq[:] = self.image.data.ravel()
+
+    def foreach_set(self, seq):
+        self.image.data[:] = np.asarray(seq, dtype=np.float32).reshape(self.image.data.shape)
+
+
+class FakeImage:
+    def __init__(self, name: str, width: int, height: int):
+        self.name = name
+        self.users = 0
+        self.data = np.zeros((height, width, 4), dtype=np.float32)
+        self.pixels = FakePixels(self)
+
+    @property
+    def size(self) -> tuple[int, int]:
+        return self.data.shape[1], self.data.shape[0]
+
+    def scale(self, width: int, height: int):
+        if (width, height) == self.size:
+            return
+        # 最近邻采样
+        ys = np.arange(height) * self.data.shape[0] // height
+        xs = np.arange(width) * self.data.shape[1] // width
+        self.data = self.data[ys][:, xs].copy()
+
+    def copy(self) -> FakeImage:
+        img = data.images.new(f"{self.name}.001", *self.size)
+        img.data[:] = self.data
+        return img
+
+
+class FakeCollection(dict):
+    def new(self, name: str, *args, **kwargs):
+        item = types.SimpleNamespace(name=name)
+        self[name] = item
+        return item
+
+    def remove(self, item):
+        self.pop(item.name, None)
+
+    def __iter__(self):
+        return iter(self.values())
+
+
+class FakeImages(FakeCollection):
+    def new(self, name: str, width: int = 1, height: int = 1, **kwargs) -> FakeImage:
+        img = FakeImage(name, width, height)
+        self[name] = img
+        return img
+
+
+class TypesModule(types.ModuleType):
+    """
+    bpy.types 下任意名称都返回一个可继承的空类
+    """
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        cls = type(name, (), {"bl_rna": types.SimpleNamespace(properties=[])})
+        setattr(self, name, cls)
+        return cls
+
+
+class PropsModule(types.ModuleType):
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return lambda *args, **kwargs: None
+
+
+def _noop(*args, **kwargs):
+    ...
+
+
+data = types.SimpleNamespace(
+    images=FakeImages(),
+    objects=FakeCollection(),
+    materials=FakeCollection(),
+    node_groups=FakeCollection(),
+    texts=FakeCollection(),
+    filepath="",
+)
+
+
+def install() -> types.ModuleType:
+    """
+    注册到 sys.modules, 需在导入插件模块之前调用
+    """
+    if "bpy" in sys.modules:
+        return sys.modules["bpy"]
+    bpy = types.ModuleType("bpy")
+    bpy.types = TypesModule("bpy.types")
+    bpy.props = PropsModule("bpy.props")
+    bpy.data = data
+    bpy.app = types.SimpleNamespace(
+        version=(3, 6, 0),
+        version_string="3.6.0 (fake)",
+        binary_path="",
+        tempdir=tempfile.gettempdir(),
+        background=True,
+        timers=types.SimpleNamespace(register=_noop, unregister=_noop, is_registered=lambda func: False),
+        handlers=types.SimpleNamespace(persistent=lambda func: func, load_post=[], save_pre=[]),
+        translations=types.SimpleNamespace(pgettext=lambda msg, ctx=None: msg, register=_noop, unregister=_noop),
+    )
+    previews = types.ModuleType("bpy.utils.previews")
+    previews.new = lambda: {}
+    previews.remove = _noop
+    bpy.utils = types.ModuleType("bpy.utils")
+    bpy.utils.previews = previews
+    bpy.utils.register_class = _noop
+    bpy.utils.unregister_class = _noop
+    bpy.utils.register_classes_factory = lambda classes: (_noop, _noop)
+    bpy.path = types.SimpleNamespace(abspath=lambda path: path)
+    bake = types.SimpleNamespace(margin=16)
+    bpy.context = types.SimpleNamespace(
+        scene=types.SimpleNamespace(render=types.SimpleNamespace(bake=bake)),
+        screen=None,
+        window_manager=types.SimpleNamespace(windows=[]),
+        evaluated_depsgraph_get=lambda: None,
+    )
+    bpy.ops = types.SimpleNamespace()
+    # node_tree.py 导入节点分类工具
+    nodeitems_utils = types.ModuleType("nodeitems_utils")
+    nodeitems_utils.NodeCategory = type("NodeCategory", (), {"__init__": _noop})
+    nodeitems_utils.NodeItem = type("NodeItem", (), {"__init__": _noop})
+    nodeitems_utils.register_node_categories = _noop
+    nodeitems_utils.unregister_node_categories = _noop
+    sys.modules.update({
+        "nodeitems_utils": nodeitems_utils,
+        "bpy": bpy,
+        "bpy.types": bpy.types,
+        "bpy.props": bpy.props,
+        "bpy.utils": bpy.utils,
+        "bpy.utils.previews": previews,
+    })
+    return bpy
@@ -0,0 +1,274 @@
+"""
+不依赖 blender 的微基准测试, 用 fake_bpy 替身导入插件模块, 按实际规模测量纯 Python/NumPy 热点:
+    TreeCtx 构建/加载、SHM 写入与读取(collect_result)、ImageCombine 合成、TaskExecutor 队列与进度快照、
+    后台进程输出解析及日志限流
+    python benchmarks/micro_bench.py --out micro.json
+    python benchmarks/micro_bench.py --image-size 8192 --pairs 5000 --lines 50000 --only shm,combine
+结果格式与 bake_bench 相同, 可用 bake_bench.py --compare 比较
+"""
+from __future__ import annotations
+import os
+import sys
+import json
+import time
+import types
+import logging
+import argparse
+import platform
+import importlib
+import statistics
+from pathlib import Path
+import numpy as np
+
+import fake_bpy
+from bake_bench import ROOT, git_revision, compare
+
+# 以独立包名加载插件目录, 不执行各级 __init__(其中会注册 blender 类)
+PKG = "bake_node_bench"
+PACKAGES = {PKG: ROOT, f"{PKG}.src": ROOT / "src", f"{PKG}.src.node_tree": ROOT / "src" / "node_tree", f"{PKG}.utils": ROOT / "utils"}
+
+
+def load(name: str):
+    fake_bpy.install()
+    for pkg, path in PACKAGES.items():
+        if pkg not in sys.modules:
+            module = types.ModuleType(pkg)
+            module.__path__ = [path.as_posix()]
+            sys.modules[pkg] = module
+    return importlib.import_module(f"{PKG}.{name}")
+
+
+def measure(func, repeat: int, setup=None) -> dict:
+    """
+    setup 的返回值作为 func 的参数, 不计入耗时
+    """
+    times = []
+    for _ in range(repeat):
+        arg = setup() if setup else None
+        start = time.perf_counter()
+        func(arg) if setup else func()
+        times.append(time.perf_counter() - start)
+    return {"wall": min(times), "mean": statistics.mean(times), "repeat": repeat}
+
+
+class MicroBench:
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.common = load("src.node_tree.common")
+        self.sparse = load("src.node_tree.sparse")
+        self.protocol = load("src.node_tree.protocol")
+        self.executor = load("src.node_tree.executor")
+        self.nodes = load("src.node_tree.nodes")
+        self.shm = load("utils.shm").SHM
+        self.logger = load("utils.logger")
+        # 导入时启动的任务线程会取走队列中的任务, 基准测试中停止
+        self.executor.TaskExecutor.running = False
+        self.logger.logger.set_level(logging.ERROR)
+        self.rng = np.random.default_rng(0)
+
+    def mesh_pairs(self, count: int) -> list[tuple]:
+        return [(f"Obj_{i}", "", "") for i in range(count)]
+
+    def sparse_pixels(self, size: int, coverage=0.3) -> np.ndarray:
+        """
+        模拟烘焙结果: 左侧 coverage 比例的区域有数据, 其余为填充色
+        """
+        pixels = np.zeros((size, size, 4), dtype=np.float32)
+        pixels[:, :int(size * coverage)] = self.rng.random((size, int(size * coverage), 4), dtype=np.float32)
+        return pixels
+
+    def bench_treectx(self) -> dict:
+        TreeCtx = self.common.TreeCtx
+        pairs = self.mesh_pairs(self.args.pairs)
+
+        def build():
+            ctx = TreeCtx()
+            meshes = ctx.ensure_list("Meshes")
+            meshes += [list(p) for p in pairs]
+            passes = ctx.ensure_dict("Pass")
+            for cat, names in (("Internal", ["NORMAL", "AO"]), ("PBR", ["Albedo", "Roughness"])):
+                passes.ensure_list(cat).extend(names)
+            out_images = ctx.ensure_dict("OutImages")
+            for pair in pairs:
+                images = out_images.ensure_dict(pair)
+                for cat, names in passes.items():
+                    for name in names:
+                        images[(cat, name)] = f"{pair[0]}_{cat}_{name}"
+            return ctx
+
+        ctx = build()
+        return {
+            "TreeCtx Build": measure(build, self.args.repeat),
+            "TreeCtx Load": measure(lambda: TreeCtx().load(ctx), self.args.repeat),
+        }
+
+    def bench_shm(self) -> dict:
+        size = self.args.image_size
+        sm = self.shm.create(self.sparse.buffer_size(size, size))
+        pixels = self.sparse_pixels(size)
+        Bake = self.nodes.Bake
+        TreeCtx = self.common.TreeCtx
+
+        def collect(_):
+            Bake.collect_result(sm, ("Obj_0", "", ""), "Internal", "NORMAL", (size, size), TreeCtx(), TreeCtx(), {}, {})
+
+        try:
+            result = {
+                "SHM Write": measure(lambda: self.sparse.write(sm.buf, pixels), self.args.repeat),
+                "SHM Read": measure(collect, self.args.repeat, setup=lambda: self.sparse.write(sm.buf, pixels)),
+            }
+        finally:
+            self.shm.erase(sm.name)
+            fake_bpy.data.images.clear()
+        return result
+
+    def bench_combine(self) -> dict:
+        size = self.args.image_size
+        count = self.args.combine_objects
+        TreeCtx = self.common.TreeCtx
+        sparse = self.sparse
+        sm = self.shm.create(sparse.buffer_size(size, size))
+        task = TreeCtx()
+        task["ImageCombine"] = {"combine": True}
+        out_images = task.ensure_dict("OutImages")
+        out_tiles = task.ensure_dict("OutTiles")
+        try:
+            # 各物体占据不同的横向条带, 与实际多物体共用一张UV布局类似
+            for i, pair in enumerate(self.mesh_pairs(count)):
+                pixels = np.zeros((size, size, 4), dtype=np.float32)
+                band = slice(i * size // count, (i + 1) * size // count)
+                pixels[band] = self.rng.random((band.stop - band.start, size, 4), dtype=np.float32)
+                sparse.write(sm.buf, pixels)
+                self.nodes.Bake.collect_result(sm, pair, "Internal", "NORMAL", (size, size), out_images, out_tiles, {}, {})
+        finally:
+            self.shm.erase(sm.name)
+        ImageCombine = self.nodes.ImageCombine
+        ImageCombine.nname = "ImageCombine"
+        executor = self.executor.TaskExecutor
+        try:
+            return {"ImageCombine": measure(lambda: ImageCombine.execute(executor, task), self.args.repeat)}
+        finally:
+            fake_bpy.data.images.clear()
+
+    def bench_executor(self) -> dict:
+        executor = self.executor.TaskExecutor
+        count = self.args.pairs
+
+        def queue():
+            for i in range(count):
+                executor.submit_task({"Task": i})
+            while not executor.tasks.empty():
+                executor.tasks.get_nowait()
+
+        def progress():
+            for i in range(count):
+                executor.set_exe_node(f"Bake {i}")
+                executor.update_node_process(i / count)
+                executor.set_eta(count - i)
+                self.executor.ProgressSync.collect()
+
+        return {
+            "Executor Queue": measure(queue, self.args.repeat),
+            "Executor Progress": measure(progress, self.args.repeat),
+        }
+
+    def worker_lines(self) -> list[str]:
+        protocol = self.protocol
+        lines = []
+        for i in range(self.args.lines):
+            kind = i % 10
+            if kind < 6:
+                lines.append(f"Fra:1 Mem:{i % 900}.00M (Peak 1024.00M) | Time:00:{i % 60:02d}.00 | Mem:12.00M, Peak:40.00M | Scene | Path Tracing Sample {i}/4096")
+            elif kind < 8:
+                lines.append(f"Baking map {i} of object Obj_{i % 100}")
+            elif kind == 8:
+                lines.append(protocol.trace_line("Cycles Bake", i, i + 1000, type="NORMAL").strip())
+            else:
+                lines.append(f"{protocol.RUN_PARAMS}: {{\"elementsCount\": {i}}}")
+        return lines
+
+    def bench_log(self) -> dict:
+        parse_line = self.protocol.parse_line
+        lines = self.worker_lines()
+        log = self.logger.logger
+
+        def parse():
+            for line in lines:
+                parse_line(line)
+
+        def dispatch():
+            # 与 Bake.execute 中的转发相同: 进度行按 collapse 合并, 其他行按来源限流
+            rate_filter = self.logger.RateLimitFilter()
+            for line in lines:
+                kind, payload = parse_line(line)
+                if kind == "progress":
+                    record = log.makeRecord(log.name, logging.INFO, __file__, 0, "%s", (payload["info"],), None, extra={"collapse": "bake_progress"})
+                elif kind == "log":
+                    record = log.makeRecord(log.name, logging.CRITICAL, __file__, 0, "%s", (payload,), None, extra={"source": "bake_worker"})
+                else:
+                    continue
+                rate_filter.filter(record)
+
+        return {
+            "Log Parse": measure(parse, self.args.repeat),
+            "Log Dispatch": measure(dispatch, self.args.repeat),
+        }
+
+    def run(self) -> dict:
+        benches = {
+            "treectx": self.bench_treectx,
+            "shm": self.bench_shm,
+            "combine": self.bench_combine,
+            "executor": self.bench_executor,
+            "log": self.bench_log,
+        }
+        only = set(self.args.only.split(",")) if self.args.only else set(benches)
+        report = {
+            "meta": {
+                "revision": git_revision(),
+                "python": platform.python_version(),
+                "numpy": np.__version__,
+                "platform": platform.platform(),
+                "cpu_count": os.cpu_count(),
+                "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "args": {k: v for k, v in vars(self.args).items() if k not in {"out", "compare"}},
+            },
+            "cases": [],
+        }
+        for key, bench in benches.items():
+            if key not in only:
+                continue
+            for name, result in bench().items():
+                print(f"[Micro] {name:<20} min {result['wall'] * 1000:>10.2f}ms  mean {result['mean'] * 1000:>10.2f}ms")
+                report["cases"].append({"name": name, "stages": {}, **result})
+        self.shm.clear()
+        return report
+
+
+def parse_args(argv: list[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="micro_bench")
+    parser.add_argument("--out", default="", help="JSON report path")
+    parser.add_argument("--pairs", type=int, default=5000, help="Mesh pairs / queued tasks")
+    parser.add_argument("--image-size", type=int, default=4096, help="Image size for SHM and ImageCombine")
+    parser.add_argument("--combine-objects", type=int, default=8)
+    parser.add_argument("--lines", type=int, default=50000, help="Worker stdout lines")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--only", default="", help="Comma separated: treectx,shm,combine,executor,log")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="Compare two reports and exit")
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args(sys.argv[1:])
+    if args.compare:
+        print(compare(*args.compare))
+        return
+    report = MicroBench(args).run()
+    out = Path(args.out or ROOT.joinpath("logs", "bench", f"micro_{time.strftime('%Y%m%d-%H%M%S')}.json"))
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"[Micro] report: {out}")
+
+
+if __name__ == "__main__":
+    main()
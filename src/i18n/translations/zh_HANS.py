@@ -8,6 +8,17 @@ PREF_CTX = "BakeNodePref"
 
 translations = (
     ("Default Bake Resolution", "默认烘焙分辨率", PREF_CTX),
+    ("Bake Agents", "远程烘焙节点", PREF_CTX),
+    ("Agent Retries", "失败重试次数", PREF_CTX),
+    ("Agent Token", "节点令牌", PREF_CTX),
+    ("Job Timeout", "任务超时", PREF_CTX),
+    ("Stall Timeout", "无输出超时", PREF_CTX),
+    ("Job Retries", "任务重试次数", PREF_CTX),
+    ("Max Local Workers", "本机并行烘焙数", PREF_CTX),
+    ("Worker Threads", "每进程线程数", PREF_CTX),
+    ("Pin Worker CPUs", "绑定CPU核心", PREF_CTX),
+    ("Bake Device", "烘焙设备", PREF_CTX),
+    ("Auto", "自动", PREF_CTX),
     ("Easy Bake Node", "简易烘焙节点"),
     ("Bake Nodes", "烘焙节点"),
     ("Bake Setting", "烘焙设置"),
@@ -70,10 +81,30 @@ translations = (
     ("UseMatName", "使用材质名", PROP_CTX),
     ("BakeTypeDescription", "描述", PROP_CTX),
     ("Node Progress", "节点进度", PROP_CTX),
+    ("ETA", "预计剩余", PROP_CTX),
+    ("Derived Passes", "推导通道"),
+    ("Converge", "收敛采样"),
+    ("Max Samples", "最大采样"),
+    ("Denoise", "降噪"),
+    ("Denoise Method", "降噪方式"),
+    ("Island Filter", "孤岛内滤波"),
+    ("Denoise Passes", "降噪通道"),
+    ("Denoise Strength", "降噪强度"),
+    ("Auto Resolution", "自动分辨率"),
+    ("Texel Density", "纹素密度"),
+    ("Min Resolution", "最小分辨率"),
+    ("Max Resolution", "最大分辨率"),
+    ("Pack Channels", "打包通道"),
+    ("Pack Name", "打包名称"),
+    ("Split Channels", "拆分通道"),
+    ("Pack name conflicts with a PBR pass", "打包名称与PBR通道重名"),
     ("Save", "保存", OPS_CTX),
     ("Load", "加载", OPS_CTX),
     ("Delete", "删除", OPS_CTX),
     ("Run Bake", "执行烘焙", OPS_CTX),
+    ("Resume Bake", "继续烘焙", OPS_CTX),
+    ("Build Preset Library", "生成预设库", OPS_CTX),
+    ("Performance Report", "性能报告", OPS_CTX),
     ("Save As Bake Presets", "保存为烘焙类型", OPS_CTX),
     ("Mark Prop As Params", "标记为烘焙参数", OPS_CTX),
     ("Delete Prop From Params", "从烘焙参数移除", OPS_CTX),
@@ -5,6 +5,7 @@ from .nodes import NodeBase, CustomPass, SingleMeshConfig, MeshConfig
 from .node_tree import TREE_NAME, TNodeTree, TNodeCategory, TNodeItem
 from .executor import TaskExecutor
 from .handler import hanlder_reg, hanlder_unreg
+from .preset_registry import PresetRegistry
 
 node_clss = [nc for nc in NodeBase.__subclasses__() if nc.__name__ != "CustomPass"]
 clss = [TNodeTree, SingleMeshConfig, MeshConfig, *SocketBase.__subclasses__(), *node_clss]
@@ -36,3 +37,4 @@ def unregister():
     unregister_node_categories(TREE_NAME)
     cls_unreg()
     CustomPass.unreg()
+    PresetRegistry.clear()
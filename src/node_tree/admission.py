@@ -0,0 +1,109 @@
+"""
+本机并行烘焙的内存准入控制: 预估每个任务需要的内存, 按可用内存决定同时运行的后台进程数, 其余任务排队
+    预估 = 后台进程基础占用 + 场景 + 像素缓冲(图片/烘焙结果/采样点) + 网格 + 父进程共享内存
+    同类通道在相同分辨率下有历史峰值(后台进程的绝对峰值 RSS, 已包含基础占用和场景)时, 以历史代替前四项
+    至少允许一个任务运行, 否则单个超出预算的任务会永远排队
+"""
+from __future__ import annotations
+import time
+from ...utils.procstat import read_meminfo
+from . import sparse
+
+MB = 2 ** 20
+# 后台 blender 进程(未加载场景)的常驻内存
+WORKER_BASE = 400 * MB
+# 每像素每通道: 图片和烘焙结果各一份 float
+CHANNEL_BYTES = 4 * 2
+# 每像素的烘焙采样点(BakePixel: 图元/物体序号, 随机种子, uv 及其导数)
+BAKE_PIXEL_BYTES = 40
+# 收敛模式每像素额外的累加缓冲: 当前批次/奇偶两份累加/平均值, 各 4 个 float
+CONVERGE_BYTES = 4 * 4 * 4
+# 降噪每像素的临时缓冲: 孤岛编号图和滤波中的颜色/权重数组
+DENOISE_BYTES = 128
+# 每个面的网格数据和 BVH
+POLY_BYTES = 1024
+# 场景文件加载后的内存约为文件大小的倍数
+SCENE_FACTOR = 2
+HISTORY_MARGIN = 1.15
+
+
+def estimate_job_memory(width: int, height: int, channels=4, polys=0, scene_bytes=0, history_mb: float = None, converge=False, denoise=False) -> int:
+    """
+    单个烘焙任务的内存预估(字节), 包括父进程中接收结果的共享内存
+    """
+    shm = sparse.buffer_size(width, height)
+    # 历史峰值可能来自未启用收敛/降噪的运行, 两种情况都加上
+    extra = width * height * ((CONVERGE_BYTES if converge else 0) + (DENOISE_BYTES if denoise else 0))
+    if history_mb:
+        return int(history_mb * MB * HISTORY_MARGIN) + shm + extra
+    pixels = width * height * (channels * CHANNEL_BYTES + BAKE_PIXEL_BYTES)
+    return WORKER_BASE + scene_bytes * SCENE_FACTOR + pixels + polys * POLY_BYTES + shm + extra
+
+
+class Admission:
+    """
+    budget: 开始时的可用内存减去预留, 已准入任务的预估之和不超过 budget
+        每次准入时还要求当前可用内存(其他程序也在使用)能容纳新任务, 读取结果缓存 refresh 秒
+    无法读取内存信息时只按 max_workers 限制
+    """
+    # 预留给系统和 blender 界面进程的内存: 总内存的比例, 不少于 reserve_min
+    reserve_ratio = 0.1
+    reserve_min = 1024 * MB
+    refresh = 1.0
+
+    def __init__(self, max_workers: int):
+        self.max_workers = max(max_workers, 1)
+        self.running = 0
+        self.reserved = 0
+        self._available: int = None
+        self._read_at = 0.0
+        info = read_meminfo()
+        self.reserve = max(int(info["total"] * self.reserve_ratio), self.reserve_min) if info else 0
+        self.budget = info["available"] - self.reserve if info else None
+
+    def available(self) -> int | None:
+        now = time.monotonic()
+        if now - self._read_at > self.refresh:
+            info = read_meminfo()
+            self._available = info["available"] - self.reserve if info else None
+            self._read_at = now
+        return self._available
+
+    def fits(self, need: int) -> bool:
+        if self.budget is None:
+            return True
+        if self.reserved + need > self.budget:
+            return False
+        available = self.available()
+        return available is None or need <= available
+
+    def try_admit(self, need: int) -> bool:
+        if self.running >= self.max_workers:
+            return False
+        if self.running and not self.fits(need):
+            return False
+        self.running += 1
+        self.reserved += need
+        return True
+
+    def capacity(self, needs: list[int]) -> int:
+        """
+        按顺序准入 needs 时可同时运行的任务数(至少为1), CPU 按该数量划分
+        """
+        limit = min(self.max_workers, len(needs))
+        if self.budget is None:
+            return max(limit, 1)
+        budget = self.budget
+        if (available := self.available()) is not None:
+            budget = min(budget, available)
+        count, reserved = 0, 0
+        for need in needs[:limit]:
+            if count and reserved + need > budget:
+                break
+            reserved += need
+            count += 1
+        return max(count, 1)
+
+    def release(self, need: int):
+        self.running -= 1
+        self.reserved -= need
@@ -0,0 +1,263 @@
+"""
+远程烘焙 agent, 在渲染机上用普通 python 运行(不需要 blender 界面):
+    python agent.py --blender /opt/blender/blender --host 0.0.0.0 --port 7788 --slots 2 --pin-cpus --token <共享令牌>
+接收协调端发来的场景文件(按哈希缓存)和任务, 用常驻的后台 blender 执行 run.py, 把稀疏结果和输出行回传
+同一台机器上启动多个 agent(不同端口)可在本机模拟多机
+默认只监听本机; 每个连接的第一条消息必须是携带共享令牌的 AUTH, 令牌也可由环境变量 BAKE_AGENT_TOKEN 指定
+"""
+from __future__ import annotations
+import os
+import re
+import sys
+import hmac
+import signal
+import threading
+import argparse
+import socketserver
+import traceback
+from ast import literal_eval
+from pathlib import Path
+from queue import Queue
+from tempfile import gettempdir
+from subprocess import Popen, PIPE, STDOUT, TimeoutExpired
+from multiprocessing import shared_memory
+sys.path.append(Path(__file__).parent.as_posix())
+from protocol import command, worker_args
+from remote import DEFAULT_PORT, HEARTBEAT, send_msg, recv_msg, digest
+from supervisor import OutputStream, Supervisor
+from cpu_policy import CpuPlan
+import sparse
+
+SCRIPT = Path(__file__).parent.joinpath("run.py")
+# 场景文件按 remote.digest 缓存, 只接受该格式的文件名
+RE_DIGEST = re.compile(r"[0-9a-f]{32}")
+
+
+class AgentWorker:
+    """
+    agent 上的一个常驻后台 blender 进程及其共享内存, 任务由 Supervisor 提交和监管
+    """
+
+    def __init__(self, blender: str, cpu_config: dict = None):
+        self.blender = blender
+        # 该 slot 分到的线程数和 CPU, 写入每个任务的配置
+        self.cpu_config = cpu_config or {}
+        self.blend_path = ""
+        self.process: Popen = None
+        self.stream: OutputStream = None
+        self.shm: shared_memory.SharedMemory = None
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+    def send(self, cmd: str, payload=""):
+        self.process.stdin.write(command(cmd, payload))
+        self.process.stdin.flush()
+
+    def prepare(self, blend_path: str, shm_size: int):
+        if not self.alive:
+            extra_args = ["-t", str(self.cpu_config["threads"])] if self.cpu_config.get("threads") else []
+            args = worker_args(self.blender, blend_path, SCRIPT.as_posix(), extra_args)
+            self.process = Popen(args, stdin=PIPE, stdout=PIPE, stderr=STDOUT, cwd=SCRIPT.parent.as_posix())
+            self.stream = OutputStream(self.process)
+        elif blend_path != self.blend_path:
+            self.send("OPEN", blend_path)
+        self.blend_path = blend_path
+        if self.shm is None or self.shm.size < shm_size:
+            self.release_shm()
+            self.shm = shared_memory.SharedMemory(create=True, size=shm_size)
+
+    def job_config(self, config: dict) -> dict:
+        sparse.reset(self.shm.buf)
+        return dict(config, shm_name=self.shm.name, **self.cpu_config)
+
+    def result(self) -> bytes:
+        return bytes(self.shm.buf[:sparse.used_size(self.shm.buf)])
+
+    def kill(self):
+        if self.process is None:
+            return
+        if self.alive:
+            self.process.kill()
+        self.process.wait()
+
+    def release_shm(self):
+        if self.shm is None:
+            return
+        self.shm.close()
+        self.shm.unlink()
+        self.shm = None
+
+    def close(self, timeout=10):
+        if self.alive:
+            try:
+                self.send("QUIT")
+                self.process.wait(timeout=timeout)
+            except (OSError, TimeoutExpired):
+                self.process.kill()
+                self.process.wait()
+        self.release_shm()
+
+
+class Agent:
+    workers: Queue = Queue()
+    cache_dir = Path(gettempdir()).joinpath("BakeNodeAgent")
+    token = ""
+
+    @classmethod
+    def setup(cls, blender: str, slots: int, cache_dir: str = "", threads=0, pin_cpus=False, token=""):
+        cls.token = token
+        if cache_dir:
+            cls.cache_dir = Path(cache_dir)
+        cls.cache_dir.mkdir(parents=True, exist_ok=True)
+        # 每个 slot 固定使用一组 CPU
+        plan = CpuPlan(slots, threads, pin_cpus)
+        for _ in range(slots):
+            cls.workers.put(AgentWorker(blender, plan.job_config(plan.acquire())))
+
+    @classmethod
+    def blend_path(cls, blend_digest: str) -> Path:
+        if not isinstance(blend_digest, str) or not RE_DIGEST.fullmatch(blend_digest):
+            raise ValueError(f"Invalid blend digest: {blend_digest!r}")
+        return cls.cache_dir.joinpath(f"{blend_digest}.blend")
+
+    @classmethod
+    def check_token(cls, token) -> bool:
+        return isinstance(token, str) and hmac.compare_digest(token.encode("utf-8"), cls.token.encode("utf-8"))
+
+    @classmethod
+    def close(cls):
+        while not cls.workers.empty():
+            cls.workers.get().close()
+
+
+class AgentHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        sock = self.request
+        try:
+            header, _ = recv_msg(sock)
+            if header.get("cmd") != "AUTH" or not Agent.check_token(header.get("token")):
+                send_msg(sock, {"cmd": "ERROR", "error": "Authentication failed"})
+                return
+            send_msg(sock, {"cmd": "OK", "ok": True})
+        except (OSError, ValueError):
+            return
+        while True:
+            try:
+                header, payload = recv_msg(sock)
+            except (OSError, ValueError):
+                return
+            cmd = header.get("cmd")
+            try:
+                if cmd == "BYE":
+                    return
+                if cmd == "HAS":
+                    send_msg(sock, {"cmd": "OK", "ok": Agent.blend_path(header["blend"]).exists()})
+                elif cmd == "BLEND":
+                    path = Agent.blend_path(header["blend"])
+                    if digest(payload) != header["blend"]:
+                        send_msg(sock, {"cmd": "ERROR", "error": "Blend digest mismatch"})
+                        continue
+                    tmp = path.with_suffix(".tmp")
+                    tmp.write_bytes(payload)
+                    tmp.replace(path)
+                    send_msg(sock, {"cmd": "OK", "ok": True})
+                elif cmd == "JOB":
+                    self.run_job(sock, header)
+                else:
+                    send_msg(sock, {"cmd": "ERROR", "error": f"Unknown command: {cmd}"})
+            except OSError:
+                return
+            except Exception as e:
+                traceback.print_exc()
+                send_msg(sock, {"cmd": "ERROR", "error": f"{type(e).__name__}: {e}"})
+
+    def run_job(self, sock, header: dict):
+        """
+        任务超时/无输出超时由协调端在 JOB 中传入, 超时的进程被终止
+        等待空闲 slot 和执行期间每 HEARTBEAT 秒发送 PING, 协调端据此判断连接是否仍然有效
+        """
+        path = Agent.blend_path(header["blend"])
+        if not path.exists():
+            send_msg(sock, {"cmd": "ERROR", "error": "Blend not cached"})
+            return
+        config = header["config"]
+        while isinstance(config, str):
+            config = literal_eval(config)
+        lock = threading.Lock()
+        stopped = threading.Event()
+
+        def send(reply: dict, payload: bytes = b""):
+            with lock:
+                send_msg(sock, reply, payload)
+
+        def stop():
+            # 持锁设置, 之后不会再有 PING 混入下一个请求的回复
+            with lock:
+                stopped.set()
+
+        def heartbeat():
+            while not stopped.wait(HEARTBEAT):
+                with lock:
+                    if stopped.is_set():
+                        return
+                    try:
+                        send_msg(sock, {"cmd": "PING"})
+                    except OSError:
+                        return
+
+        threading.Thread(target=heartbeat, daemon=True).start()
+        worker: AgentWorker = Agent.workers.get()
+        finished = False
+        try:
+            worker.prepare(path.as_posix(), header["shm_size"])
+            with Supervisor() as supervisor:
+                supervisor.submit(0, worker, worker.job_config(config), header.get("timeout", 0), header.get("stall", 0))
+                for _, kind, payload in supervisor.events():
+                    if kind != "done":
+                        send({"cmd": "LINE", "kind": kind, "payload": payload})
+            finished = True
+            stop()
+            send({"cmd": "RESULT"}, worker.result())
+        finally:
+            stop()
+            if not finished:
+                # 协调端断开时进程仍在执行被放弃的任务, 其输出和共享内存会混入下一个任务, 终止后由下一个任务重启
+                worker.kill()
+            Agent.workers.put(worker)
+
+
+class AgentServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="agent")
+    parser.add_argument("--blender", required=True, help="Blender executable")
+    parser.add_argument("--host", default="127.0.0.1", help="Listen address, 0.0.0.0 to accept other machines")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--slots", type=int, default=1, help="Concurrent background Blender processes")
+    parser.add_argument("--cache-dir", default="", help="Where received scenes are cached")
+    parser.add_argument("--threads", type=int, default=0, help="Render threads per slot, 0 to split the CPU cores between slots")
+    parser.add_argument("--pin-cpus", action="store_true", help="Bind each slot to its own CPU cores (Linux only)")
+    parser.add_argument("--token", default=os.environ.get("BAKE_AGENT_TOKEN", ""), help="Shared token clients must send, defaults to $BAKE_AGENT_TOKEN")
+    args = parser.parse_args()
+    if not args.token:
+        parser.error("a shared token is required (--token or BAKE_AGENT_TOKEN)")
+    Agent.setup(args.blender, max(args.slots, 1), args.cache_dir, args.threads, args.pin_cpus, args.token)
+    # 被终止时也关闭后台进程并释放共享内存
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    with AgentServer((args.host, args.port), AgentHandler) as server:
+        print(f"[Agent] listening on {args.host}:{args.port}, slots {args.slots}", flush=True)
+        try:
+            server.serve_forever()
+        except (KeyboardInterrupt, SystemExit):
+            ...
+        finally:
+            Agent.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""
+供外部流程调用的烘焙接口, 不依赖界面属性轮询:
+    from EasyBakeNode.src.node_tree import api
+    future = api.submit("Bake Recipe", overrides={"Bake Setting": {"samples": 64}}, on_progress=print)
+    future.add_done_callback(lambda f: print(f.result()))   # BakeResult, 在执行线程中调用
+    futures = api.submit_batch("Bake Recipe", [{"Bake Setting": {"samples": s}} for s in (16, 64, 256)])
+overrides 按 {节点名: {属性: 值}} 在主线程中临时写入节点, 导出任务后立即恢复, 不影响之后的运行
+烘焙过程需要主线程执行 Timer 中的调用, 在主线程(控制台/操作符/handler)中阻塞等待 result() 会死锁:
+    主线程中使用 add_done_callback, 回调中需要访问 bpy 数据时用 Timer.submit 转回主线程
+    只有其他线程可以调用 result() 等待
+"""
+from __future__ import annotations
+import threading
+from concurrent.futures import Future
+from collections.abc import Callable, Iterable
+from ...utils.timer import Timer
+from .executor import TaskExecutor
+from .node_tree import TNodeTree, TREE_TYPE
+import bpy
+
+
+class BakeResult:
+    """
+    outputs: {输出节点名: {"images": [图片名], "saved": [保存路径]}}
+    passes: 每个烘焙通道的耗时统计(Bake.record_perf 写入的 PassStats)
+    """
+
+    def __init__(self, tree: str):
+        self.tree = tree
+        self.outputs: dict[str, dict] = {}
+        self.passes: list[dict] = []
+        self.errors: list[dict] = []
+        self.wall = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+    @property
+    def images(self) -> list[str]:
+        return [img for out in self.outputs.values() for img in out["images"]]
+
+    @property
+    def saved(self) -> list[str]:
+        return [path for out in self.outputs.values() for path in out["saved"]]
+
+    @classmethod
+    def from_results(cls, tree: str, results: dict) -> BakeResult:
+        res = cls(tree)
+        for name, ctx in results.items():
+            images = [img for pair in ctx.get("OutImages", {}).values() for img in pair.values()]
+            res.outputs[name] = {"images": images, "saved": list(ctx.get("SavedImages", []))}
+            res.passes.extend(dict(stat, output=name) for stat in ctx.get("PassStats", []))
+            res.errors.extend(ctx.get("Errors", []))
+            res.wall += ctx.get("Wall", 0.0)
+        return res
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.tree,
+            "status": "ok" if self.ok else "failed",
+            "wall": self.wall,
+            "outputs": self.outputs,
+            "passes": self.passes,
+            "errors": self.errors,
+        }
+
+    def __repr__(self):
+        return f"<BakeResult {self.tree!r} {'ok' if self.ok else 'failed'} {self.wall:.2f}s>"
+
+
+class BakeFuture(Future):
+    """
+    主线程中对未完成的任务调用 result()/exception() 时直接报错, 而不是死锁
+    """
+
+    def check_thread(self):
+        if not self.done() and threading.current_thread() is threading.main_thread():
+            raise RuntimeError("Waiting for a bake on Blender's main thread would deadlock, use add_done_callback")
+
+    def result(self, timeout=None):
+        self.check_thread()
+        return super().result(timeout)
+
+    def exception(self, timeout=None):
+        self.check_thread()
+        return super().exception(timeout)
+
+
+def get_tree(tree: TNodeTree | str) -> TNodeTree:
+    if isinstance(tree, str):
+        tree = bpy.data.node_groups.get(tree)
+    if tree is None or tree.bl_idname != TREE_TYPE:
+        raise ValueError(f"Bake tree not found: {tree}")
+    return tree
+
+
+@Timer.wait_run
+def dump_task(tree: TNodeTree, overrides: dict, outputs: Iterable[str] | None) -> dict:
+    """
+    主线程中写入 overrides 并导出任务, 导出后恢复原值
+    """
+    old_values = []
+    try:
+        for node_name, values in overrides.items():
+            node = tree.nodes.get(node_name)
+            if node is None:
+                raise KeyError(f"Node not found: {node_name}")
+            for prop, value in values.items():
+                old_values.append((node, prop, getattr(node, prop)))
+                setattr(node, prop, value)
+        task = tree.dump()
+    finally:
+        for node, prop, value in reversed(old_values):
+            setattr(node, prop, value)
+    if outputs is not None:
+        outputs = set(outputs)
+        missing = outputs - set(task) - {"Tree"}
+        if missing:
+            raise KeyError(f"Output node not found: {', '.join(sorted(missing))}")
+        for name in list(task):
+            if name != "Tree" and name not in outputs:
+                task.pop(name)
+    return task
+
+
+def submit(tree: TNodeTree | str,
+           overrides: dict[str, dict] | None = None,
+           outputs: Iterable[str] | None = None,
+           on_progress: Callable[[dict], None] | None = None,
+           resume=False) -> BakeFuture:
+    """
+    提交一次烘焙, 返回 BakeFuture[BakeResult]
+        outputs: 只执行这些输出节点, 默认全部
+        on_progress: 在执行线程中以进度快照调用(etask/enode/etask_p/enode_p/eta), 需自行保证线程安全
+        resume: 跳过上次中断的运行在烘焙日志中记录的已完成任务
+    取消返回的 Future 会移除尚未开始的任务, 已开始的任务会执行完成
+    """
+    tree = get_tree(tree)
+    tree_name = tree.name
+    task = dump_task(tree, overrides or {}, outputs)
+    if resume:
+        TNodeTree.set_resume(task)
+    inner = Future()
+    task["Future"] = inner
+    if on_progress:
+        task["Progress"] = on_progress
+    future = BakeFuture()
+
+    def on_done(f: Future):
+        if future.done():
+            return
+        if f.cancelled():
+            future.cancel()
+        elif f.exception():
+            future.set_exception(f.exception())
+        else:
+            future.set_result(BakeResult.from_results(tree_name, f.result()))
+
+    def on_cancel(f: Future):
+        if f.cancelled():
+            inner.cancel()
+
+    future.add_done_callback(on_cancel)
+    inner.add_done_callback(on_done)
+    TaskExecutor.submit_task(task)
+    return future
+
+
+def submit_batch(tree: TNodeTree | str,
+                 variants: Iterable[dict[str, dict]],
+                 outputs: Iterable[str] | None = None,
+                 on_progress: Callable[[int, dict], None] | None = None) -> list[BakeFuture]:
+    """
+    按 variants 中的每组 overrides 各提交一次, 返回与 variants 顺序一致的 Future 列表
+        任务按顺序排队执行, on_progress 额外传入序号
+    """
+    tree = get_tree(tree)
+    outputs = list(outputs) if outputs is not None else None
+    futures = []
+    for i, overrides in enumerate(variants):
+        progress = (lambda data, i=i: on_progress(i, data)) if on_progress else None
+        futures.append(submit(tree, overrides, outputs, progress))
+    return futures
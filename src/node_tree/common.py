@@ -19,3 +19,27 @@ class TreeCtx(dict):
             else:
                 self[key] = value
         return self
+
+
+# 烘焙结果图像格式, 后台进程与父进程使用同一规则
+#   数据通道以 Non-Color 存储, 避免烘焙时做 sRGB 编码
+#   位置/法线/UV/IOR 取值超出 [0, 1] 或需要高精度, 8位图像会截断并量化为 1/255, 使用浮点图像
+FLOAT_PASSES = {"POSITION", "NORMAL", "UV", "Normal", "IOR"}
+COLOR_PASSES = {"COMBINED", "DIFFUSE", "GLOSSY", "TRANSMISSION", "EMIT", "ENVIRONMENT", "Albedo", "Emission"}
+
+
+def image_spec(cat: str, bake_pass: str) -> tuple[bool, str]:
+    """
+    返回 (float_buffer, 色彩空间)
+        Derived: 推导通道的源图(物体空间法线/世界位置)
+        Advanced: 自定义通道保持原有的 sRGB 图像
+    """
+    if cat == "Derived":
+        return True, "Non-Color"
+    if cat == "Advanced":
+        return False, "sRGB"
+    if bake_pass in FLOAT_PASSES:
+        return True, "Non-Color"
+    if bake_pass in COLOR_PASSES:
+        return False, "sRGB"
+    return False, "Non-Color"
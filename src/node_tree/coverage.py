@@ -0,0 +1,139 @@
+"""
+UV覆盖掩码: 按网格+UV层光栅化一次并缓存, 用于图片合并/推导通道判断像素归属
+    光栅化规则与烘焙一致: 像素中心落在UV三角形内即视为覆盖
+    缓存以 packbits 压缩存储
+"""
+from __future__ import annotations
+from collections import OrderedDict
+from threading import Lock
+import hashlib
+import numpy as np
+
+# 单批次最多处理的采样点数量, 限制内存占用
+CHUNK = 1 << 22
+
+
+def _inside(uv_tris: np.ndarray, tid: np.ndarray, px: np.ndarray, py: np.ndarray, width: int, height: int) -> np.ndarray:
+    a, b, c = uv_tris[tid, 0], uv_tris[tid, 1], uv_tris[tid, 2]
+    x = (px + 0.5) / width
+    y = (py + 0.5) / height
+
+    def edge(p, q):
+        return (q[:, 0] - p[:, 0]) * (y - p[:, 1]) - (q[:, 1] - p[:, 1]) * (x - p[:, 0])
+
+    e0, e1, e2 = edge(a, b), edge(b, c), edge(c, a)
+    # 兼容顺/逆时针三角形, 边上的点视为覆盖
+    return ((e0 >= 0) & (e1 >= 0) & (e2 >= 0)) | ((e0 <= 0) & (e1 <= 0) & (e2 <= 0))
+
+
+def rasterize(uv_tris: np.ndarray, width: int, height: int, labels: np.ndarray = None) -> np.ndarray:
+    """
+    uv_tris: (T, 3, 2) UV坐标, 返回 (height, width) bool 掩码
+    labels: (T,) 每个三角形的非零编号(如UV孤岛), 给出时返回 int32 编号图, 0 为未覆盖
+    """
+    mask = np.zeros((height, width), dtype=bool if labels is None else np.int32)
+    if not len(uv_tris):
+        return mask
+    uv_tris = np.asarray(uv_tris, dtype=np.float64)
+    lo = uv_tris.min(axis=1)
+    hi = uv_tris.max(axis=1)
+    size = np.array((width, height))
+    # 像素中心 (i + 0.5) / size 落在包围盒内的像素范围
+    p0 = np.clip(np.ceil(lo * size - 0.5), 0, size).astype(np.int64)
+    p1 = np.clip(np.floor(hi * size - 0.5), -1, size - 1).astype(np.int64)
+    nx = np.maximum(p1[:, 0] - p0[:, 0] + 1, 0)
+    ny = np.maximum(p1[:, 1] - p0[:, 1] + 1, 0)
+    counts = nx * ny
+    tids = np.flatnonzero(counts)
+    if not len(tids):
+        return mask
+    big = tids[counts[tids] > CHUNK]
+    small = tids[counts[tids] <= CHUNK]
+    # 小三角形按采样点总数分批, 批内完全向量化
+    csum = np.cumsum(counts[small])
+    start = 0
+    while start < len(small):
+        limit = (csum[start - 1] if start else 0) + CHUNK
+        end = max(int(np.searchsorted(csum, limit, side="right")), start + 1)
+        batch = small[start:end]
+        start = end
+        c = counts[batch]
+        tid = np.repeat(batch, c)
+        local = np.arange(c.sum()) - np.repeat(np.cumsum(c) - c, c)
+        w = np.repeat(nx[batch], c)
+        px = p0[tid, 0] + local % w
+        py = p0[tid, 1] + local // w
+        hit = _inside(uv_tris, tid, px, py, width, height)
+        mask[py[hit], px[hit]] = True if labels is None else labels[tid[hit]]
+    # 超大三角形按行分块
+    for t in big:
+        rows = max(CHUNK // int(nx[t]), 1)
+        xs = np.arange(p0[t, 0], p1[t, 0] + 1)
+        for y0 in range(p0[t, 1], p1[t, 1] + 1, rows):
+            ys = np.arange(y0, min(y0 + rows, p1[t, 1] + 1))
+            px, py = np.meshgrid(xs, ys)
+            px, py = px.ravel(), py.ravel()
+            hit = _inside(uv_tris, np.full(len(px), t), px, py, width, height)
+            mask[py[hit], px[hit]] = True if labels is None else labels[t]
+    return mask
+
+
+def dilate(mask: np.ndarray, radius: int) -> np.ndarray:
+    """
+    方形膨胀(积分图实现), 用于覆盖烘焙边距(margin)
+    """
+    if radius < 1:
+        return mask
+    k = 2 * radius + 1
+    p = np.pad(mask.astype(np.int32), radius + 1)
+    p = p.cumsum(axis=0).cumsum(axis=1)
+    h, w = mask.shape
+    box = p[k:k + h, k:k + w] - p[:h, k:k + w] - p[k:k + h, :w] + p[:h, :w]
+    return box > 0
+
+
+def composite(canvas: np.ndarray, layers: list[tuple[np.ndarray, np.ndarray, np.ndarray]]) -> np.ndarray:
+    """
+    layers: [(pixels, mask, margin_mask)]
+        先写入所有物体的边距区域, 再写入覆盖区域, 避免某物体的边距覆盖其他物体的UV孤岛
+    """
+    for pixels, _, margin in layers:
+        if margin is None:
+            continue
+        canvas[margin] = pixels[margin]
+    for pixels, mask, _ in layers:
+        canvas[mask] = pixels[mask]
+    return canvas
+
+
+class CoverageCache:
+    """
+    key: (网格名, UV层) + 分辨率 + UV数据指纹, UV变化后自动失效
+    """
+    max_size = 64
+    _cache: OrderedDict[tuple, tuple[np.ndarray, tuple[int, int]]] = OrderedDict()
+    _lock = Lock()
+
+    @staticmethod
+    def fingerprint(uv_tris: np.ndarray) -> str:
+        return hashlib.blake2b(np.ascontiguousarray(uv_tris, dtype=np.float32).tobytes(), digest_size=16).hexdigest()
+
+    @classmethod
+    def get(cls, key, uv_tris: np.ndarray, width: int, height: int) -> np.ndarray:
+        full_key = (*key, width, height, cls.fingerprint(uv_tris))
+        with cls._lock:
+            if full_key in cls._cache:
+                cls._cache.move_to_end(full_key)
+                packed, shape = cls._cache[full_key]
+                return np.unpackbits(packed, count=shape[0] * shape[1]).astype(bool).reshape(shape)
+        mask = rasterize(uv_tris, width, height)
+        with cls._lock:
+            cls._cache[full_key] = (np.packbits(mask, axis=None), mask.shape)
+            while len(cls._cache) > cls.max_size:
+                cls._cache.popitem(last=False)
+        return mask
+
+    @classmethod
+    def clear(cls):
+        with cls._lock:
+            cls._cache.clear()
@@ -0,0 +1,76 @@
+"""
+并行后台进程的 CPU 划分: 把当前进程可用的 CPU 平均分给同时运行的任务, 每个任务的渲染线程数等于分到的 CPU 数
+    可选绑定 CPU(仅 Linux), 避免多个 Cycles 进程的线程在核心间迁移、互相抢占
+    任务数多于 CPU 时多个任务共用一组, 每次分配使用中任务最少的一组
+注意: 该模块会被 agent 进程直接导入, 不能使用相对导入, 也不能依赖 bpy
+"""
+from __future__ import annotations
+import os
+
+
+def usable_cpus() -> list[int]:
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def partition(cpus: list[int], parts: int) -> list[list[int]]:
+    """
+    按顺序切分为 parts 组连续的 CPU(相邻编号通常同属一个物理核/缓存域), 余数分给前几组
+    """
+    parts = max(1, min(parts, len(cpus)))
+    size, extra = divmod(len(cpus), parts)
+    groups, start = [], 0
+    for i in range(parts):
+        end = start + size + (1 if i < extra else 0)
+        groups.append(cpus[start:end])
+        start = end
+    return groups
+
+
+class CpuPlan:
+    """
+    workers: 预计同时运行的任务数(由内存准入决定, 不超过最大并行数)
+    threads: 每个任务的线程数, 0 为分到的 CPU 数
+    pin: 是否把任务绑定到分到的 CPU
+    """
+
+    def __init__(self, workers: int, threads=0, pin=False):
+        self.threads = threads
+        self.pin = pin and hasattr(os, "sched_setaffinity")
+        self.groups: list[list[int]] = []
+        self.users: list[int] = []
+        self.resize(workers)
+
+    def resize(self, workers: int) -> bool:
+        """
+        按新的并行数重新划分, 只能在没有任务使用时进行(运行中任务的线程数/绑定无法修改)
+        """
+        if any(self.users):
+            return False
+        self.groups = partition(usable_cpus(), workers)
+        self.users = [0] * len(self.groups)
+        return True
+
+    def acquire(self) -> int:
+        group = self.users.index(min(self.users))
+        self.users[group] += 1
+        return group
+
+    def release(self, group: int):
+        self.users[group] -= 1
+
+    def thread_count(self, group: int) -> int:
+        return self.threads or len(self.groups[group])
+
+    def job_config(self, group: int) -> dict:
+        """
+        写入任务配置, 由 run.py 在烘焙前应用
+        """
+        return {"threads": self.thread_count(group), "cpus": self.groups[group] if self.pin else []}
+
+    def worker_args(self, group: int) -> list[str]:
+        """
+        启动参数中的线程数, 进程启动阶段(场景加载等)也不会占满所有核心
+        """
+        return ["-t", str(self.thread_count(group))]
@@ -0,0 +1,170 @@
+"""
+烘焙后降噪: 按UV孤岛划分像素, 只在同一孤岛内滤波, 不会跨接缝(seam)混色
+    FILTER: 边缘保持的 à-trous 小波滤波(B3 样条核, 每层间隔翻倍), 值域权重按估计的噪声标准差缩放
+    OIDN: 合成器降噪节点的结果(由 run.py 在 blender 中执行), 靠近其他孤岛的像素回退为 FILTER 的结果
+    未覆盖的像素保持不变, alpha 通道不参与
+注意: 该模块会被后台 blender 进程直接导入, 不能使用相对导入, 也不能依赖 bpy
+"""
+from __future__ import annotations
+import numpy as np
+
+B3 = (1 / 16, 1 / 4, 3 / 8, 1 / 4, 1 / 16)
+# 值域权重的标准差 = 噪声标准差 * 强度 * SIGMA_SCALE, 每层滤波后减半
+SIGMA_SCALE = 2.0
+LEVELS = 3
+# UV坐标量化精度, 同一顶点UV相同的角视为相连
+UV_PRECISION = 1e-5
+
+
+def connected_labels(n: int, a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """
+    n 个节点按边 (a[i], b[i]) 求连通分量, 返回每个节点所在分量的最小节点号
+        挂接 + 指针跳跃, 迭代次数约为 log(n)
+    """
+    parent = np.arange(n)
+    if not len(a):
+        return parent
+    while True:
+        pa, pb = parent[a], parent[b]
+        if (pa == pb).all():
+            return parent
+        np.minimum.at(parent, np.maximum(pa, pb), np.minimum(pa, pb))
+        while True:
+            jumped = parent[parent]
+            if (jumped == parent).all():
+                break
+            parent = jumped
+
+
+def uv_islands(tri_verts: np.ndarray, tri_uvs: np.ndarray) -> np.ndarray:
+    """
+    tri_verts: (T, 3) 顶点序号, tri_uvs: (T, 3, 2)
+    共享 顶点且UV相同 的三角形属于同一孤岛, 返回 (T,) 从 1 开始的孤岛编号
+    """
+    tnum = len(tri_verts)
+    if not tnum:
+        return np.zeros(0, dtype=np.int32)
+    corners = np.concatenate([tri_verts.reshape(-1, 1), np.round(tri_uvs.reshape(-1, 2) / UV_PRECISION)], axis=1)
+    _, corner_ids = np.unique(corners, axis=0, return_inverse=True)
+    # 节点: 三角形 [0, T) + 角 [T, T + K)
+    tri_ids = np.repeat(np.arange(tnum), 3)
+    roots = connected_labels(tnum + int(corner_ids.max()) + 1, tri_ids, corner_ids.ravel() + tnum)[:tnum]
+    _, labels = np.unique(roots, return_inverse=True)
+    return (labels + 1).astype(np.int32)
+
+
+def dilate_labels(labels: np.ndarray, radius: int) -> np.ndarray:
+    """
+    孤岛编号向未覆盖像素扩展 radius 像素(8邻域), 使烘焙边距(margin)归属于相邻孤岛
+    """
+    h, w = labels.shape
+    for _ in range(max(int(radius), 0)):
+        empty = labels == 0
+        if not empty.any():
+            break
+        p = np.pad(labels, 1)
+        grown = labels.copy()
+        for dy in (-1, 0, 1):
+            for dx in (-1, 0, 1):
+                src = p[1 + dy:1 + dy + h, 1 + dx:1 + dx + w]
+                take = (grown == 0) & (src > 0)
+                grown[take] = src[take]
+        labels = np.where(empty, grown, labels)
+    return labels
+
+
+def noise_sigma(color: np.ndarray, labels: np.ndarray) -> float:
+    """
+    同一孤岛内相邻像素各通道差值的中位数绝对偏差, 估计单个通道的噪声标准差
+    """
+    diffs = []
+    for dy, dx in ((0, 1), (1, 0)):
+        a, b = color[:color.shape[0] - dy, :color.shape[1] - dx], color[dy:, dx:]
+        la, lb = labels[:labels.shape[0] - dy, :labels.shape[1] - dx], labels[dy:, dx:]
+        valid = (la > 0) & (la == lb)
+        diffs.append((a - b)[valid])
+    d = np.concatenate(diffs)
+    if not d.size:
+        return 0.0
+    # 两个独立噪声之差的标准差为 sqrt(2) 倍
+    return float(1.4826 * np.median(np.abs(d)) / np.sqrt(2))
+
+
+def atrous(pixels: np.ndarray, labels: np.ndarray, strength=1.0, levels=LEVELS) -> np.ndarray:
+    """
+    pixels: (h, w, 4) float32, labels: (h, w) 孤岛编号, 0 为未覆盖
+    返回新数组, 只修改已覆盖像素的 RGB
+    """
+    covered = labels > 0
+    color = pixels[..., :3].astype(np.float32)
+    sigma = noise_sigma(color, labels) * strength * SIGMA_SCALE
+    out = pixels.copy()
+    if sigma <= 0 or not covered.any():
+        return out
+    h, w = labels.shape
+    for level in range(levels):
+        step = 1 << level
+        pad = 2 * step
+        pc = np.pad(color, ((pad, pad), (pad, pad), (0, 0)), mode="edge")
+        pl = np.pad(labels, pad)
+        inv = np.float32(1 / (2 * sigma * sigma))
+        acc = np.zeros_like(color)
+        wsum = np.zeros((h, w), dtype=np.float32)
+        for i, ky in enumerate(B3):
+            for j, kx in enumerate(B3):
+                y, x = pad + (i - 2) * step, pad + (j - 2) * step
+                c = pc[y:y + h, x:x + w]
+                d = c - color
+                wgt = np.float32(ky * kx) * np.exp(-(d * d).mean(axis=-1) * inv)
+                wgt *= pl[y:y + h, x:x + w] == labels
+                acc += c * wgt[..., None]
+                wsum += wgt
+        # 中心像素权重恒大于 0
+        color = np.where(covered[..., None], acc / np.maximum(wsum, 1e-12)[..., None], color)
+        sigma *= 0.5
+    out[..., :3] = color
+    return out
+
+
+def seam_mask(labels: np.ndarray, radius: int) -> np.ndarray:
+    """
+    (2 * radius + 1) 方形范围内存在其他孤岛的已覆盖像素, 范围内编号的最大/最小值可分离计算
+    """
+    covered = labels > 0
+    hi = window(labels, radius, np.maximum, 0)
+    lo = window(np.where(covered, labels, np.iinfo(np.int32).max), radius, np.minimum, np.iinfo(np.int32).max)
+    return covered & ((hi > labels) | (lo < labels))
+
+
+def window(values: np.ndarray, radius: int, op, fill) -> np.ndarray:
+    h, w = values.shape
+    p = np.pad(values.astype(np.int32), radius, constant_values=fill)
+    rows = p[:, :w].copy()
+    for dx in range(1, 2 * radius + 1):
+        op(rows, p[:, dx:dx + w], out=rows)
+    out = rows[:h].copy()
+    for dy in range(1, 2 * radius + 1):
+        op(out, rows[dy:dy + h], out=out)
+    return out
+
+
+def merge_oidn(pixels: np.ndarray, denoised: np.ndarray, labels: np.ndarray, strength=1.0, radius=2 ** LEVELS) -> np.ndarray:
+    """
+    OIDN 不区分孤岛, 接缝附近(其滤波范围内有其他孤岛)使用孤岛内滤波的结果, 未覆盖像素保持原值
+    """
+    near = seam_mask(labels, radius)
+    out = pixels.copy()
+    inner = (labels > 0) & ~near
+    out[inner, :3] = denoised[inner, :3]
+    if near.any():
+        out[near, :3] = atrous(pixels, labels, strength)[near, :3]
+    return out
+
+
+def denoise(pixels: np.ndarray, labels: np.ndarray, strength=1.0, denoised: np.ndarray = None) -> np.ndarray:
+    """
+    denoised 为 OIDN 的结果时合并, 否则使用孤岛内滤波
+    """
+    if denoised is not None and denoised.shape == pixels.shape:
+        return merge_oidn(pixels, denoised, labels, strength)
+    return atrous(pixels, labels, strength)
@@ -0,0 +1,150 @@
+"""
+图像空间推导通道: 由已烘焙的 法线(物体空间) / 位置 图推导 曲率、腔体(Cavity)、边缘(EdgeMask) 遮罩
+    只依赖 numpy, 所有运算为整图向量化的位移/卷积
+    UV孤岛边界: 只有 都被覆盖 且 世界空间距离连续 的相邻像素才参与计算, 避免跨缝(seam)混色
+"""
+from __future__ import annotations
+import numpy as np
+
+# 8邻域方向
+DIRECTIONS = ((0, 1), (1, 0), (0, -1), (-1, 0), (1, 1), (1, -1), (-1, 1), (-1, -1))
+
+
+def shift(arr: np.ndarray, dy: int, dx: int, fill=0) -> np.ndarray:
+    """
+    out[y, x] = arr[y + dy, x + dx], 越界部分以fill填充
+    """
+    out = np.full_like(arr, fill)
+    h, w = arr.shape[:2]
+    if abs(dy) >= h or abs(dx) >= w:
+        return out
+    ys, yd = slice(max(dy, 0), h + min(dy, 0)), slice(max(-dy, 0), h + min(-dy, 0))
+    xs, xd = slice(max(dx, 0), w + min(dx, 0)), slice(max(-dx, 0), w + min(-dx, 0))
+    out[yd, xd] = arr[ys, xs]
+    return out
+
+
+def coverage_from_pixels(pixels: np.ndarray, background=(0, 0, 0)) -> np.ndarray:
+    """
+    与背景色不同的像素视为已烘焙
+    """
+    return np.abs(pixels[..., :3] - np.asarray(background[:3], dtype=np.float32)).sum(axis=-1) > 0.000001
+
+
+def decode_normal(pixels: np.ndarray, matrix=None) -> np.ndarray:
+    """
+    法线贴图 [0, 1] -> [-1, 1], 若给出物体矩阵则转换到世界空间
+    """
+    n = pixels[..., :3] * 2 - 1
+    if matrix is not None:
+        # 法线使用 逆转置矩阵 变换
+        m = np.linalg.inv(np.asarray(matrix, dtype=np.float32)[:3, :3]).T
+        n = n @ m.T
+    length = np.linalg.norm(n, axis=-1, keepdims=True)
+    return n / np.maximum(length, 1e-8)
+
+
+def texel_size(position: np.ndarray, coverage: np.ndarray) -> float:
+    """
+    单个像素对应的世界空间尺寸(取中位数, 排除跨孤岛的异常值)
+    """
+    dists = []
+    for dy, dx in DIRECTIONS[:2]:
+        valid = coverage & shift(coverage, dy, dx, False)
+        d = np.linalg.norm(shift(position, dy, dx) - position, axis=-1)[valid]
+        if d.size:
+            dists.append(d)
+    if not dists:
+        return 0
+    return float(np.median(np.concatenate(dists)))
+
+
+def island_blur(values: np.ndarray, coverage: np.ndarray, radius: int) -> np.ndarray:
+    """
+    覆盖区域内的归一化盒式模糊(积分图实现), 未覆盖像素不参与也不被写入
+    """
+    if radius < 1:
+        return values
+    weight = coverage.astype(np.float32)
+    data = values * weight
+
+    def box(a: np.ndarray) -> np.ndarray:
+        p = np.pad(a, radius + 1, mode="constant")
+        p = p.cumsum(axis=0).cumsum(axis=1)
+        k = 2 * radius + 1
+        return p[k:, k:] - p[:-k, k:] - p[k:, :-k] + p[:-k, :-k]
+
+    wsum = box(weight)[:values.shape[0], :values.shape[1]]
+    vsum = box(data)[:values.shape[0], :values.shape[1]]
+    out = np.where(wsum > 0, vsum / np.maximum(wsum, 1e-8), 0)
+    return np.where(coverage, out, 0).astype(np.float32)
+
+
+def curvature(normal: np.ndarray, position: np.ndarray, coverage: np.ndarray, radius=1) -> np.ndarray:
+    """
+    离散法曲率: k = mean((n_j - n_i)·(p_j - p_i) / |p_j - p_i|^2), 凸为正, 凹为负
+        返回值已乘以采样半径对应的世界尺寸, 为无量纲的角度变化量
+    """
+    radius = max(int(radius), 1)
+    step = texel_size(position, coverage)
+    if step <= 0:
+        return np.zeros(coverage.shape, dtype=np.float32)
+    # 距离超过该阈值视为跨越了UV孤岛(纹理空间相邻但模型空间不相邻)
+    tolerance = step * radius * 4
+    ksum = np.zeros(coverage.shape, dtype=np.float32)
+    kcnt = np.zeros(coverage.shape, dtype=np.float32)
+    for dy, dx in DIRECTIONS:
+        dy, dx = dy * radius, dx * radius
+        d = shift(position, dy, dx) - position
+        dist2 = (d * d).sum(axis=-1)
+        valid = coverage & shift(coverage, dy, dx, False) & (dist2 > 0) & (dist2 < tolerance * tolerance)
+        dn = shift(normal, dy, dx) - normal
+        k = (dn * d).sum(axis=-1) / np.maximum(dist2, 1e-12)
+        ksum += np.where(valid, k, 0)
+        kcnt += valid
+    k = np.where(kcnt > 0, ksum / np.maximum(kcnt, 1), 0)
+    return (k * step * radius).astype(np.float32)
+
+
+def curvature_map(normal, position, coverage, radius=1, contrast=4.0, blur=1) -> np.ndarray:
+    k = island_blur(curvature(normal, position, coverage, radius), coverage, blur)
+    return np.clip(0.5 + 0.5 * k * contrast, 0, 1)
+
+
+def cavity_map(normal, position, coverage, radius=2, contrast=4.0, blur=2) -> np.ndarray:
+    k = island_blur(curvature(normal, position, coverage, radius), coverage, blur)
+    return np.clip(-k * contrast, 0, 1)
+
+
+def edge_map(normal, position, coverage, radius=1, contrast=4.0, blur=1) -> np.ndarray:
+    k = island_blur(curvature(normal, position, coverage, radius), coverage, blur)
+    return np.clip(k * contrast, 0, 1)
+
+
+# 名称 -> 推导函数, 预设JSON中以 "Derived": "<名称>" 引用
+DERIVED_PASSES = {
+    "Curvature": curvature_map,
+    "Cavity": cavity_map,
+    "EdgeMask": edge_map,
+}
+
+# 推导所需的源通道, 在物体空间烘焙法线
+DERIVED_SOURCES = ("NORMAL", "POSITION")
+
+
+def compute(name: str, normal_pixels: np.ndarray, position_pixels: np.ndarray, matrix=None, params: dict = None, coverage=None) -> np.ndarray:
+    """
+    normal_pixels/position_pixels: (h, w, 4) float32
+    coverage: UV覆盖掩码(h, w), 为空时由法线图推断
+    返回 (h, w, 4) 灰度RGBA
+    """
+    func = DERIVED_PASSES[name]
+    if coverage is None:
+        coverage = coverage_from_pixels(normal_pixels)
+    normal = decode_normal(normal_pixels, matrix)
+    position = position_pixels[..., :3]
+    value = func(normal, position, coverage, **(params or {}))
+    out = np.zeros(normal_pixels.shape, dtype=np.float32)
+    out[..., :3] = np.where(coverage, value, 0)[..., None]
+    out[..., 3] = 1
+    return out
@@ -1,4 +1,5 @@
 from queue import Queue
+from concurrent.futures import Future
 import traceback
 import threading
 import time
@@ -6,16 +7,50 @@ import bpy
 from ...utils.timer import Timer
 
 
+class ProgressSnapshot:
+    """
+    进度快照: 写入时复制字典后整体替换并递增版本号, 读写都不加锁
+        只由执行线程写入, 主线程按版本号判断是否需要同步到界面
+    """
+
+    def __init__(self, **values):
+        self.data = dict(values)
+        self.version = 0
+        # 在写入线程中以新快照调用, 如 api.submit 的进度回调
+        self.listeners = []
+
+    def update(self, **values):
+        data = self.data.copy()
+        data.update(values)
+        self.data = data
+        self.version += 1
+        for listener in self.listeners:
+            try:
+                listener(data)
+            except Exception:
+                traceback.print_exc()
+
+    def __getitem__(self, key):
+        return self.data[key]
+
+    def get(self, key, default=None):
+        return self.data.get(key, default)
+
+
 class TaskExecutor:
     tasks = Queue()
 
-    process = {
-        "tnum": 0,
-        "etask_p": 0,
-        "enode_p": 0,
-        "etask": "",
-        "enode": "",
-    }
+    process = ProgressSnapshot(
+        busy=False,
+        etask_p=0,
+        enode_p=0,
+        etask="",
+        enode="",
+        eta=None,
+    )
+
+    # 后台烘焙进程的资源占用, 只由采样线程写入
+    resources = ProgressSnapshot(rss=0, peak=0, cpu=0, threads=0)
 
     running = False
 
@@ -53,60 +88,68 @@ class TaskExecutor:
                 continue
             task = cls.tasks.get()
             tree = task.pop("Tree", None)
-
-            @Timer.wait_run
-            def f():
-                if not tree:
-                    return
-                tree.is_running = True
-
-            f()
+            future: Future = task.pop("Future", None)
+            progress = task.pop("Progress", None)
+            if future and not future.set_running_or_notify_cancel():
+                continue
+            if progress:
+                cls.process.listeners.append(progress)
+            cls.process.update(busy=True)
+            if tree:
+                Timer.set_attrs(tree, {"is_running": True})
             try:
-                TNodeTree.execute_task(cls, task)
+                results = TNodeTree.execute_task(cls, task)
+            except Exception as e:
+                # 单个任务出错不影响后续任务
+                traceback.print_exc()
+                if future:
+                    future.set_exception(e)
+            else:
+                if future:
+                    future.set_result(results)
             finally:
-                @Timer.wait_run
-                def f():
-                    if not tree:
-                        return
-                    tree.is_running = False
-
-                f()
-            cls.task_done(task)
+                if tree:
+                    Timer.set_attrs(tree, {"is_running": False})
+                cls.task_done(task)
+                if progress:
+                    cls.process.listeners.remove(progress)
 
     @classmethod
     def task_done(cls, task):
-        cls.update_queue_num()
-        cls.set_current_tree("")
-        cls.set_exe_node("")
-        cls.update_node_process(0)
-        cls.update_tree_process(0)
+        cls.process.update(busy=False, etask="", enode="", etask_p=0, enode_p=0, eta=None)
+        cls.resources.update(rss=0, peak=0, cpu=0, threads=0)
 
     @classmethod
     def set_current_tree(cls, tree):
-        cls.process["etask"] = str(tree)
-        bpy.context.window_manager.bake_tree.etask = str(tree)
+        cls.process.update(etask=str(tree))
 
     @classmethod
     def update_tree_process(cls, process):
         if not isinstance(process, (str, int, float)):
             return
-        cls.process["etask_p"] = process
-        bpy.context.window_manager.bake_tree.etask_p = process * 100
+        cls.process.update(etask_p=process)
         # cls.debug("执行进度: {%s}", cls.process)
 
     @classmethod
     def set_exe_node(cls, node):
-        cls.process["enode"] = str(node)
-        bpy.context.window_manager.bake_tree.enode = str(node)
+        cls.process.update(enode=str(node))
 
     @classmethod
     def update_node_process(cls, process):
         if not isinstance(process, (str, int, float)):
             return
-        cls.process["enode_p"] = process
-        bpy.context.window_manager.bake_tree.enode_p = process * 100
+        cls.process.update(enode_p=process)
         # cls.debug("执行进度: {%s}", cls.process)
 
+    @classmethod
+    def set_worker_usage(cls, sample: dict, peak_rss: int):
+        cls.resources.update(rss=sample["rss"], peak=peak_rss, cpu=sample["cpu_pct"], threads=sample["threads"])
+
+    @classmethod
+    def set_eta(cls, seconds):
+        # 按性能历史预估的当前节点剩余时间, None 表示未知
+        cls.process.update(eta=seconds)
+
     @classmethod
     def end_server(cls):
         cls.running = False
@@ -115,17 +158,19 @@ class TaskExecutor:
     @classmethod
     def clear_tasks(cls):
         while not cls.tasks.empty():
-            cls.tasks.get()
-        cls.update_queue_num()
+            if future := cls.tasks.get().get("Future"):
+                future.cancel()
 
     @classmethod
-    def submit_task(cls, task):
+    def submit_task(cls, task) -> Future:
+        """
+        返回的 Future 在执行完成后得到 {输出节点名: 上下文}, 可在 task["Progress"] 中传入进度回调
+        """
+        future = task.setdefault("Future", Future())
         cls.tasks.put(task)
-        cls.update_queue_num()
-
-    @classmethod
-    def update_queue_num(cls):
-        cls.process["tnum"] = cls.tasks.qsize()
+        # 立即同步一次, 不等待空闲间隔
+        ProgressSync.wake()
+        return future
 
     @classmethod
     def push_log_prefix(cls, prefix):
@@ -159,44 +204,103 @@ class TaskExecutor:
     def full_pattern(cls, pattern):
         return "".join(cls._log_prefix) + str(pattern) + "".join(cls._log_suffix)
 
+    # stacklevel=2: 记录中的文件/行号为实际调用处, 限流按调用处分别计数
     @classmethod
     def warn(cls, pattern, *arg, **kwargs):
         pattern = cls.full_pattern(pattern)
-        cls._logger.warn(pattern, *arg, **kwargs)
+        cls._logger.warning(pattern, *arg, stacklevel=2, **kwargs)
 
     @classmethod
     def info(cls, pattern, *arg, **kwargs):
         pattern = cls.full_pattern(pattern)
-        cls._logger.info(pattern, *arg, **kwargs)
+        cls._logger.info(pattern, *arg, stacklevel=2, **kwargs)
 
     @classmethod
     def error(cls, pattern, *arg, **kwargs):
         pattern = cls.full_pattern(pattern)
-        cls._logger.error(pattern, *arg, **kwargs)
+        cls._logger.error(pattern, *arg, stacklevel=2, **kwargs)
 
     @classmethod
     def debug(cls, pattern, *arg, **kwargs):
         pattern = cls.full_pattern(pattern)
-        cls._logger.debug(pattern, *arg, **kwargs)
+        cls._logger.debug(pattern, *arg, stacklevel=2, **kwargs)
 
     @classmethod
     def critical(cls, pattern, *arg, **kwargs):
         pattern = cls.full_pattern(pattern)
-        cls._logger.critical(pattern, *arg, **kwargs)
-
+        cls._logger.critical(pattern, *arg, stacklevel=2, **kwargs)
+
+
+class ProgressSync:
+    """
+    唯一的界面同步定时器: 快照变化时才写入RNA并重绘节点编辑器, 空闲时降低频率
+    """
+    fast = 0.1
+    idle = 1.0
+    synced: dict = {}
+    # RNA属性 -> (快照键, 换算)
+    fields = {
+        "etask": ("etask", str),
+        "enode": ("enode", str),
+        "etask_p": ("etask_p", lambda p: p * 100),
+        "enode_p": ("enode_p", lambda p: p * 100),
+        "eta": ("eta", lambda t: "" if t is None else f"{int(t) // 60:02d}:{int(t) % 60:02d}"),
+    }
 
-TaskExecutor.start_server()
+    @classmethod
+    def collect(cls) -> dict:
+        snapshot = TaskExecutor.process.data
+        values = {prop: conv(snapshot[key]) for prop, (key, conv) in cls.fields.items()}
+        values["tnum"] = TaskExecutor.tasks.qsize()
+        values["worker_usage"] = cls.format_usage(TaskExecutor.resources.data)
+        return values
+
+    @staticmethod
+    def format_usage(usage: dict) -> str:
+        if not usage.get("rss"):
+            return ""
+        gb = 2 ** 30
+        return f"RSS {usage['rss'] / gb:.2f}G / Peak {usage['peak'] / gb:.2f}G | CPU {usage['cpu']:.0f}% | {usage['threads']} Threads"
 
+    @classmethod
+    def sync(cls):
+        busy = TaskExecutor.process.get("busy") or not TaskExecutor.tasks.empty()
+        values = cls.collect()
+        if values == cls.synced:
+            return cls.fast if busy else cls.idle
+        try:
+            props = bpy.context.window_manager.bake_tree
+            for prop, value in values.items():
+                if cls.synced.get(prop) != value:
+                    setattr(props, prop, value)
+        except Exception:
+            return cls.idle
+        cls.synced = values
+        cls.tag_redraw()
+        return cls.fast if busy else cls.idle
+
+    @staticmethod
+    def tag_redraw():
+        from .node_tree import TREE_TYPE
+        try:
+            for window in bpy.context.window_manager.windows:
+                for area in window.screen.areas:
+                    if area.type == "NODE_EDITOR" and area.ui_type == TREE_TYPE:
+                        area.tag_redraw()
+        except Exception:
+            ...
 
-def update_executor():
-    try:
-        bpy.context.window_manager.bake_tree.tnum = TaskExecutor.process["tnum"]
-    except Exception:
-        ...
-    return 0.1
+    @classmethod
+    def wake(cls):
+        if threading.current_thread() is not threading.main_thread():
+            return
+        if bpy.app.timers.is_registered(cls.sync):
+            bpy.app.timers.unregister(cls.sync)
+        bpy.app.timers.register(cls.sync, first_interval=0, persistent=True)
 
 
-bpy.app.timers.register(update_executor, persistent=True)
+TaskExecutor.start_server()
+bpy.app.timers.register(ProgressSync.sync, persistent=True)
 
 
 def register():
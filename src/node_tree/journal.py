@@ -0,0 +1,119 @@
+"""
+烘焙日志(journal): 在磁盘上记录一个 Bake 节点本次运行计划的任务, 以及每个已完成任务的结果文件
+    后台进程崩溃或 blender 退出后, 以 Resume 重新运行时跳过已完成的任务, 从结果文件恢复图片
+    journal.jsonl 只追加写入, 每行一条记录; 结果文件为 sparse 共享内存布局的原始字节
+    key 由场景文件/节点/任务计划计算, 计划变化后不会误用旧结果; 全部成功后删除
+"""
+from __future__ import annotations
+import os
+import json
+import time
+import shutil
+import hashlib
+from pathlib import Path
+
+JOURNAL_DIR = Path(__file__).parent.parent.parent.joinpath("logs", "journal")
+
+
+class BakeJournal:
+    root = JOURNAL_DIR
+    # 超过该天数未更新的日志在打开新日志时清理
+    max_age_days = 7
+
+    def __init__(self, key: str, jobs: list):
+        self.key = key
+        self.dir = self.root.joinpath(key)
+        self.path = self.dir.joinpath("journal.jsonl")
+        self.jobs = [repr(job) for job in jobs]
+        self.done: dict[int, str] = {}
+
+    @staticmethod
+    def plan_key(*parts) -> str:
+        return hashlib.blake2b(repr(parts).encode("utf-8"), digest_size=12).hexdigest()
+
+    @classmethod
+    def open(cls, key: str, jobs: list, resume=False) -> BakeJournal:
+        """
+        resume 为 False 时丢弃同一计划的旧记录重新开始
+        """
+        cls.prune()
+        journal = cls(key, jobs)
+        if resume:
+            journal.load()
+        else:
+            journal.discard()
+        if not journal.path.exists():
+            journal.append({"event": "plan", "jobs": journal.jobs})
+        return journal
+
+    @classmethod
+    def prune(cls):
+        if not cls.root.exists():
+            return
+        deadline = time.time() - cls.max_age_days * 86400
+        for path in cls.root.iterdir():
+            try:
+                if path.stat().st_mtime < deadline:
+                    shutil.rmtree(path, ignore_errors=True)
+            except OSError:
+                ...
+
+    def load(self):
+        if not self.path.exists():
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # 崩溃时最后一行可能不完整
+                    continue
+                if record.get("event") == "plan" and record.get("jobs") != self.jobs:
+                    # key 冲突或计划不一致, 旧结果不可用
+                    self.discard()
+                    self.done.clear()
+                    return
+                if record.get("event") != "done":
+                    continue
+                index = record["job"]
+                if self.dir.joinpath(record["file"]).exists():
+                    self.done[index] = record["file"]
+
+    def append(self, record: dict):
+        self.dir.mkdir(parents=True, exist_ok=True)
+        record = dict(record, ts=time.time())
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def is_done(self, index: int) -> bool:
+        return index in self.done
+
+    def pending(self) -> list[int]:
+        return [i for i in range(len(self.jobs)) if i not in self.done]
+
+    def record_done(self, index: int, data: bytes):
+        if not data:
+            # 空结果不能恢复出图片, 不记录, Resume 时重新烘焙
+            return
+        name = f"job_{index:05d}.bin"
+        tmp = self.dir.joinpath(name + ".tmp")
+        self.dir.mkdir(parents=True, exist_ok=True)
+        with open(tmp, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        # 先写完整结果文件再追加记录, 记录存在时文件一定完整
+        tmp.replace(self.dir.joinpath(name))
+        self.append({"event": "done", "job": index, "file": name, "size": len(data)})
+        self.done[index] = name
+
+    def record_failed(self, index: int, error: str):
+        self.append({"event": "failed", "job": index, "error": error})
+
+    def result(self, index: int) -> bytes:
+        return self.dir.joinpath(self.done[index]).read_bytes()
+
+    def discard(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
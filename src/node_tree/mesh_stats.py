@@ -0,0 +1,88 @@
+from __future__ import annotations
+import bpy
+import numpy as np
+
+
+def get_uv_layer(mesh: bpy.types.Mesh, uv_name: str | int = ""):
+    """
+    uv_name: UV层名 或 索引(烘焙设置中的 uv_layer), 为空时使用激活层
+    """
+    if isinstance(uv_name, int) and not isinstance(uv_name, bool):
+        if 0 <= uv_name < len(mesh.uv_layers):
+            return mesh.uv_layers[uv_name]
+        return mesh.uv_layers.active
+    if uv_name:
+        return mesh.uv_layers.get(uv_name)
+    return mesh.uv_layers.active
+
+
+def mesh_arrays(obj: bpy.types.Object, uv_name="", depsgraph=None):
+    """
+    读取(含修改器的)网格三角面数据, 全部使用 foreach_get 批量读取
+        返回: 世界坐标 (T, 3, 3), UV (T, 3, 2), 面数
+        需在主线程调用
+    """
+    if depsgraph is None:
+        depsgraph = bpy.context.evaluated_depsgraph_get()
+    eval_obj = obj.evaluated_get(depsgraph)
+    mesh = eval_obj.to_mesh()
+    try:
+        mesh.calc_loop_triangles()
+        tnum = len(mesh.loop_triangles)
+        vnum = len(mesh.vertices)
+        lnum = len(mesh.loops)
+        co = np.empty(vnum * 3, dtype=np.float32)
+        mesh.vertices.foreach_get("co", co)
+        co = co.reshape(-1, 3)
+        matrix = np.array(obj.matrix_world, dtype=np.float32)
+        co = co @ matrix[:3, :3].T + matrix[:3, 3]
+        tri_verts = np.empty(tnum * 3, dtype=np.int32)
+        mesh.loop_triangles.foreach_get("vertices", tri_verts)
+        tri_loops = np.empty(tnum * 3, dtype=np.int32)
+        mesh.loop_triangles.foreach_get("loops", tri_loops)
+        uv_layer = get_uv_layer(mesh, uv_name)
+        uvs = np.zeros((lnum, 2), dtype=np.float32)
+        if uv_layer:
+            uv_layer.data.foreach_get("uv", uvs.ravel())
+        polys = len(mesh.polygons)
+    finally:
+        eval_obj.to_mesh_clear()
+    return co[tri_verts.reshape(-1, 3)], uvs[tri_loops.reshape(-1, 3)], polys
+
+
+def triangle_areas(tris: np.ndarray) -> np.ndarray:
+    """
+    tris: (T, 3, 2|3)
+    """
+    e1 = tris[:, 1] - tris[:, 0]
+    e2 = tris[:, 2] - tris[:, 0]
+    if tris.shape[-1] == 2:
+        return np.abs(e1[:, 0] * e2[:, 1] - e1[:, 1] * e2[:, 0]) * 0.5
+    return np.linalg.norm(np.cross(e1, e2), axis=-1) * 0.5
+
+
+def mesh_stats(obj: bpy.types.Object, uv_name="", depsgraph=None) -> dict:
+    co, uvs, polys = mesh_arrays(obj, uv_name, depsgraph)
+    return {
+        "polys": polys,
+        "tris": len(co),
+        "world_area": float(triangle_areas(co).sum()),
+        "uv_area": float(triangle_areas(uvs).sum()),
+    }
+
+
+def auto_resolution(stats: dict, density: float, min_res: int, max_res: int) -> int:
+    """
+    按目标纹素密度(像素/米)计算2的幂分辨率:
+        res * sqrt(uv_area) = density * sqrt(world_area)
+    上下限不是2的幂时向内取整(如 1000 -> 512), 上下限之间没有2的幂时取上限以下最大的2的幂
+    """
+    hi = 2 ** int(np.floor(np.log2(max(max_res, 1))))
+    lo = min(2 ** int(np.ceil(np.log2(max(min_res, 1)))), hi)
+    world_area = stats.get("world_area", 0)
+    uv_area = min(stats.get("uv_area", 0), 1)
+    if world_area <= 0 or uv_area <= 0:
+        return lo
+    res = density * np.sqrt(world_area / uv_area)
+    res = 2 ** int(np.ceil(np.log2(max(res, 1))))
+    return int(min(max(res, lo), hi))
@@ -5,7 +5,9 @@ from contextlib import contextmanager
 from threading import Lock, Thread
 from .executor import TaskExecutor
 from .common import TreeCtx
+from ...utils.trace import Trace
 import bpy
+import time
 import traceback
 
 TREE_NAME = "BakeNodes"
@@ -115,11 +117,25 @@ class TNodeTree(NodeTree):
         task = self.dump()
         TaskExecutor.submit_task(task)
 
+    @staticmethod
+    def set_resume(task: dict):
+        """
+        各输出节点跳过烘焙日志中已完成的任务
+        """
+        for name, ctx in task.items():
+            if name != "Tree":
+                ctx["Resume"] = True
+
     @classmethod
-    def execute_task(cls, executor: TaskExecutor, tasks):
+    def execute_task(cls, executor: TaskExecutor, tasks) -> dict[str, TreeCtx]:
+        """
+        返回 {输出节点名: 执行后的上下文}(含 OutImages/SavedImages/PassStats/Errors/Wall)
+        """
         from .nodes import NodeBase
+        results = {}
         for task_name, task in tasks.items():
             task: TreeCtx = TreeCtx().load(task)
+            results[task_name] = task
             executor.set_current_tree(task_name)
             executor.clear_prefix()
             executor.warn("%s [Config]:", task_name)
@@ -131,12 +147,20 @@ class TNodeTree(NodeTree):
             executor.info("%s [Running]:", task_name)
             executor.push_log_prefix("\t| ")
             nodes = task.get("ExecutionQueue", [])
-            for i, (nlabel, nname) in enumerate(nodes):
-                bp = NodeBase.get_node_cls(nlabel)
-                bp.nname = nname
-                executor.update_tree_process(i / len(nodes))
-                executor.set_exe_node(nname)
-                res = bp.execute(executor, task, **res)
+            Trace.begin(task_name)
+            start = time.perf_counter()
+            try:
+                for i, (nlabel, nname) in enumerate(nodes):
+                    bp = NodeBase.get_node_cls(nlabel)
+                    bp.nname = nname
+                    executor.update_tree_process(i / len(nodes))
+                    executor.set_exe_node(nname)
+                    with Trace.span(nname, cat="node", node=nlabel):
+                        res = bp.execute(executor, task, **res)
+            finally:
+                task["Wall"] = time.perf_counter() - start
+                Trace.end()
+        return results
 
     def dump(self):
         ctx = TreeCtx()
@@ -161,18 +185,3 @@ class TNodeTree(NodeTree):
 
     def get_outputs(self) -> list[bpy.types.Node]:
         return [n for n in self.nodes if getattr(n, "is_output", False)]
-
-
-def update_node_editor():
-    try:
-        import bpy
-        for area in bpy.context.screen.areas:
-            if area.ui_type != TREE_TYPE:
-                continue
-            area.tag_redraw()
-    except Exception:
-        ...
-    return 0.1
-
-
-bpy.app.timers.register(update_node_editor, persistent=True)
@@ -2,20 +2,37 @@ from __future__ import annotations
 from bpy.types import Node, Context, UILayout
 from pathlib import Path
 from functools import cache
-from subprocess import Popen, PIPE, STDOUT
 from tempfile import gettempdir
 from ...utils.logger import logger
-from ...utils.timeit import ScopeTimer
+from ...utils.trace import Trace, now_us
+from ...utils.procstat import ProcSampler
 from ...utils.timer import Timer
 from ...utils.shm import SHM
-from .common import TreeCtx
+from .common import TreeCtx, image_spec
 from .executor import TaskExecutor
+from .worker import BakeWorker, WorkerPool
+from .journal import BakeJournal
+from .supervisor import Supervisor
+from .admission import Admission, estimate_job_memory, MB
+from .cpu_policy import CpuPlan
+from .remote import Coordinator, parse_agents, file_digest
+from .preset_registry import PresetRegistry, parse_bake_preset
+from .perf_history import PerfHistory
+from .derived import DERIVED_PASSES, DERIVED_SOURCES
+from .mesh_stats import mesh_stats, mesh_arrays, auto_resolution
+from .coverage import CoverageCache
+from . import coverage
+from . import derived
+from . import sparse
+from collections import deque
 from collections.abc import Iterable
 
 import bpy
 import bpy.utils.previews
 import json
 import re
+import time
+import sqlite3
 import numpy as np
 
 TREE_TCTX = "BakeNodes"
@@ -57,6 +74,55 @@ def find_to_node(socket: bpy.types.NodeSocket) -> NodeBase:
     return find_to_node(node.outputs[0])
 
 
+def get_coverage_masks(keys: set, uv_layer=0, margin=0) -> dict:
+    """
+    keys: {(mesh_pair, (w, h))}
+    返回 {(mesh_pair, (w, h)): (覆盖掩码, 含边距的掩码)}, 无法获取UV的物体不包含在内
+    """
+    uv_tris = {}
+
+    @Timer.wait_run
+    def f():
+        depsgraph = bpy.context.evaluated_depsgraph_get()
+        for mesh_pair in {key[0] for key in keys}:
+            obj = bpy.data.objects.get(mesh_pair[0])
+            if not obj or obj.type != "MESH":
+                continue
+            uv_tris[mesh_pair] = mesh_arrays(obj, mesh_pair[2] or uv_layer, depsgraph)[1]
+
+    f()
+    masks = {}
+    for mesh_pair, res in keys:
+        if mesh_pair not in uv_tris:
+            continue
+        mask = CoverageCache.get((mesh_pair[0], mesh_pair[2] or uv_layer), uv_tris[mesh_pair], *res)
+        masks[(mesh_pair, res)] = (mask, coverage.dilate(mask, margin))
+    return masks
+
+
+def ensure_image(name, size, cat, bake_pass) -> bpy.types.Image:
+    """
+    按 image_spec 获取/新建结果图像, 已有图像的格式不一致时重新创建
+    """
+    float_buffer, colorspace = image_spec(cat, bake_pass)
+    img = bpy.data.images.get(name)
+    if img and img.is_float != float_buffer:
+        bpy.data.images.remove(img)
+        img = None
+    if not img:
+        img = bpy.data.images.new(name=name, width=size[0], height=size[1], alpha=True, float_buffer=float_buffer)
+    img.colorspace_settings.name = colorspace
+    img.scale(*size)
+    return img
+
+
+def image_to_array(img: bpy.types.Image) -> np.ndarray:
+    w, h = img.size
+    pixels = np.zeros(w * h * 4, dtype=np.float32)
+    img.pixels.foreach_get(pixels)
+    return pixels.reshape(h, w, 4)
+
+
 class NodeBase(Node):
     exclude = False
     category = "None"
@@ -135,6 +201,9 @@ class Bake(NodeBase):
     category = "Core"
     bl_label = "Bake"
     bl_icon = "NODETREE"
+    # 失败任务重试前等待 retry_backoff * 2^n 秒, 最多 retry_backoff_max 秒
+    retry_backoff = 2.0
+    retry_backoff_max = 60.0
 
     def bake_pass_items(_, __):
         def_items = [
@@ -181,6 +250,7 @@ class Bake(NodeBase):
         meshes = ctx.get("Meshes", [])
         bake_settings = ctx.get("BakeSettings", {})
         bake_passes = ctx.get("Pass", {})
+        derived_passes = cls.get_derived_passes(bake_passes, bake_settings)
 
         bake_queue = []
         data = set()
@@ -193,7 +263,15 @@ class Bake(NodeBase):
                 data.add(bpy.data.objects[src])
             for cat, passes in bake_passes.items():
                 for bake_pass in passes:
+                    if cat == "Advanced" and bake_pass in derived_passes:
+                        continue
                     bake_queue.append((tuple(mesh_pair), cat, bake_pass))
+            if not derived_passes:
+                continue
+            # 推导通道只需烘焙一次法线/位置
+            for bake_pass in DERIVED_SOURCES:
+                bake_queue.append((tuple(mesh_pair), "Derived", bake_pass))
+        job_res = cls.get_job_resolutions(ctx, {job[0] for job in bake_queue})
         # 保存blend文件
         blend_path = Path(bpy.app.tempdir).joinpath(f"BAKE_NODE_{cls.nname}.blend")
 
@@ -201,72 +279,522 @@ class Bake(NodeBase):
         def f():
             bpy.ops.wm.save_as_mainfile(filepath=blend_path.as_posix(), copy=True)
 
-        f()
+        with Trace.span("Scene Export"):
+            f()
 
-        # 后台进程blender 运行 blend文件
-        blender = bpy.app.binary_path
-        cwd = Path(__file__).parent
-        args = [blender]
-        args.append(blend_path.as_posix())
-        args.append("-b")
-        args.append("-P")
-        args.append(cwd.joinpath("run.py").as_posix())
-        args.append("--factory-startup")
-        args.append("--")
-        args.append("-bnc")
-        res = bake_settings.get("resolution", (512, 512))
-        # sm = SHM.create2("BakeNodeSHM", res[0] * res[1] * 4 * 4)
-        sm = SHM.create(res[0] * res[1] * 4 * 4)
-        pixels = np.ndarray((*res, 4), dtype=np.float32, buffer=sm.buf)
-        pixels.fill(0)
-        args.append("{}")
         out_images = ctx.ensure_dict("OutImages")
+        out_tiles = ctx.ensure_dict("OutTiles")
+        errors = ctx.ensure_list("Errors")
+        derived_sources = {}
+        pbr_pack = ctx.get("PBRPack", {})
+        samples = bake_settings.get("samples", 1)
+        estimates = [cls.estimate_job(cat, bake_pass, job_res[mesh_pair], samples) for mesh_pair, cat, bake_pass in bake_queue]
+        # 任务计划和已完成的结果记录在磁盘上, Resume 时跳过已完成的任务
+        # 导出的场景文件内容参与计算, 几何/材质修改后不会沿用旧结果
+        plan_key = BakeJournal.plan_key(file_digest(blend_path), executor.process.get("etask", ""), cls.nname, bake_queue, job_res, bake_settings)
+        journal = BakeJournal.open(plan_key, bake_queue, resume=ctx.get("Resume", False))
+        if journal.done:
+            cls.restore_journal(journal, bake_queue, job_res, out_images, out_tiles, derived_sources, pbr_pack)
+            executor.warn("Resumed %d/%d jobs from journal %s", len(journal.done), len(bake_queue), journal.dir.as_posix())
+        error_count = len(errors)
+        # 配置了远程 agent 时分发到 agent 并行执行
+        agents, retries, token = cls.get_agents()
+        prefs = cls.get_worker_prefs()
+        try:
+            if agents:
+                cls.bake_remote(executor, ctx, agents, retries, token, prefs, blend_path, bake_queue, job_res, estimates, journal,
+                                out_images, out_tiles, derived_sources, pbr_pack)
+            else:
+                cls.bake_local(executor, ctx, blend_path, prefs, bake_queue, job_res, estimates, journal,
+                               out_images, out_tiles, derived_sources, pbr_pack)
+        finally:
+            executor.set_eta(None)
+        if len(errors) == error_count:
+            journal.discard()
+        else:
+            executor.warn("Journal kept for resume: %s", journal.dir.as_posix())
+        cls.bake_derived(executor, out_images, derived_sources, derived_passes, bake_settings.get("uv_layer", 0))
+        return ctx
+        # --tree "Bake Recipe" --node "Output Image Path" --sock -1 --debug 0 --ignorevis 0 --solitr 0 --frameitr 0 --batchitr 0 --rend_dev METAL
+
+    @staticmethod
+    def get_agents() -> tuple[list[tuple[str, int]], int, str]:
+        from ..xxx.preference import get_pref
+
+        @Timer.wait_run
+        def f():
+            pref = get_pref()
+            return pref.bake_agents, pref.agent_retries, pref.agent_token
+
+        agents, retries, token = f()
+        return parse_agents(agents), retries, token
+
+    @staticmethod
+    def get_worker_prefs() -> dict:
+        """
+        timeout/stall: 任务超时/无输出超时(秒, 0 为不限制), retries: 失败重试次数
+        max_workers: 本机最大并行数, threads: 每个进程的线程数(0 为平分CPU), pin_cpus: 绑定CPU, device: AUTO/GPU/CPU
+        """
+        from ..xxx.preference import get_pref
+
+        @Timer.wait_run
+        def f():
+            pref = get_pref()
+            return {
+                "timeout": pref.job_timeout,
+                "stall": pref.stall_timeout,
+                "retries": pref.job_retries,
+                "max_workers": pref.max_local_workers,
+                "threads": pref.worker_threads,
+                "pin_cpus": pref.pin_worker_cpus,
+                "device": pref.bake_device,
+            }
+
+        return f()
+
+    @staticmethod
+    def handle_output(executor: TaskExecutor, job: tuple, kind: str, payload, stats: dict, errors: list):
+        """
+        处理后台进程的一条输出, stats: {"stages", "peak_mem", "run_params"}
+        """
+        mesh_pair, cat, bake_pass = job
+        if kind == "run_params":
+            stats["run_params"] = payload
+        elif kind == "trace":
+            Trace.add_events([payload])
+            stats["stages"][payload["name"]] = stats["stages"].get(payload["name"], 0) + payload["dur"] / 1e6
+        elif kind == "progress":
+            stats["peak_mem"] = max(stats["peak_mem"], payload["peak"])
+            executor.info("Fra:%s Mem:%sM %s", payload["frame"], payload["mem"], payload["info"], extra={"collapse": "cycles_progress"})
+        elif kind == "error":
+            # 进程退出, 下一个任务重新启动
+            executor.error(payload)
+            errors.append({"object": mesh_pair[0], "cat": cat, "pass": bake_pass, "error": payload})
+        else:
+            executor.critical("%s", payload, extra={"source": "bake_worker"})
+
+    @classmethod
+    def bake_local(cls, executor: TaskExecutor, ctx: TreeCtx, blend_path: Path, prefs: dict, bake_queue, job_res, estimates, journal: BakeJournal,
+                   out_images: TreeCtx, out_tiles: TreeCtx, derived_sources: dict, pbr_pack: dict):
+        """
+        本机常驻进程并行执行未完成的任务, 同时运行的进程数由内存准入控制决定, 其余任务排队
+            每个运行中的任务使用按其分辨率分配的共享内存, 完成后释放
+            进程崩溃/超时的任务按指数退避重试
+            CPU 按实际并行数平分给各任务, 避免多个 Cycles 进程各自占满所有核心
+        prefs: get_worker_prefs 的返回值
+        """
+        timeout, stall, job_retries, max_workers = prefs["timeout"], prefs["stall"], prefs["retries"], prefs["max_workers"]
+        errors = ctx.ensure_list("Errors")
+        script = Path(__file__).parent.joinpath("run.py")
+        mesh_stats = ctx.get("MeshStats", {})
+        scene_bytes = blend_path.stat().st_size
+        admission = Admission(max_workers)
+        bake_settings = ctx.get("BakeSettings", {})
+        converge, denoise = bake_settings.get("converge", False), bool(bake_settings.get("denoise"))
+        memory = {}
+        for i in journal.pending():
+            mesh_pair, cat, bake_pass = bake_queue[i]
+            polys = mesh_stats.get(mesh_pair, {}).get("polys", 0)
+            memory[i] = estimate_job_memory(*job_res[mesh_pair], polys=polys, scene_bytes=scene_bytes, converge=converge, denoise=denoise,
+                                            history_mb=cls.history_peak(cat, bake_pass, *job_res[mesh_pair]))
+        # (任务序号, 第几次尝试, 最早开始时间)
+        pending = deque((i, 0, 0.0) for i in memory)
+        total = len(pending)
+        finished = 0
+        # CPU 按内存准入后实际能同时运行的任务数划分, 而不是最大并行数
+        cpu_plan = CpuPlan(admission.capacity([memory[p[0]] for p in pending]), prefs["threads"], prefs["pin_cpus"])
+        idle: list[BakeWorker] = []
+        running: dict[int, dict] = {}
         run_params = {}
-        for i, (mesh_pair, cat, bake_pass) in enumerate(bake_queue):
+
+        def start(i: int, attempt: int):
+            mesh_pair, cat, bake_pass = job = bake_queue[i]
+            res = job_res[mesh_pair]
+            if admission.budget is not None and memory[i] > admission.budget:
+                executor.warn("%s[%s] needs ~%dM, more than the %dM available", mesh_pair[0], bake_pass, memory[i] // MB, admission.budget // MB)
+            group = cpu_plan.acquire()
+            worker = idle.pop() if idle else WorkerPool.acquire(bpy.app.binary_path, blend_path.as_posix(), script, cpu_plan.worker_args(group))
+            sm = SHM.create(sparse.buffer_size(*res))
+            sparse.reset(sm.buf)
             config = {
                 "ctx": ctx,
-                "bake_params": (mesh_pair, cat, bake_pass),
+                "bake_params": job,
+                "resolution": res,
                 "shm_name": sm.name,
                 "run_params": run_params,
+                "device": prefs["device"],
+                **cpu_plan.job_config(group),
             }
-            args[-1] = str(config)
-            p = Popen(args, stdout=PIPE, stderr=STDOUT, cwd=cwd.as_posix())
-            t = ScopeTimer(f"Bake {mesh_pair[0]}[{bake_pass}]", executor.warn)
-            executor.update_node_process(i / len(bake_queue))
-            while p.poll() is None:
-                line = p.stdout.readline().decode("utf-8").strip()
-                if not line:
+            running[i] = {
+                "job": job,
+                "worker": worker,
+                "group": group,
+                "sm": sm,
+                "attempt": attempt,
+                "failure": "",
+                "retry": True,
+                "stats": {"stages": {}, "peak_mem": 0, "run_params": run_params},
+                "start": time.perf_counter(),
+                "ts": now_us(),
+            }
+            worker.start()
+            running[i]["sampler"] = ProcSampler(worker.pid, on_sample=executor.set_worker_usage).start()
+            supervisor.submit(i, worker, config, timeout, stall)
+
+        def admit():
+            now = time.monotonic()
+            if not running and (ready := [memory[p[0]] for p in pending if p[2] <= now]):
+                # 没有任务占用 CPU 时, 按剩余任务可准入的并行数重新划分
+                cpu_plan.resize(admission.capacity(ready))
+            for item in list(pending):
+                i, attempt, not_before = item
+                if not_before > now:
                     continue
-                if line.startswith(("Read blend: ", "Info: ", "Blender quit",)):
+                # 按顺序准入, 不让小任务一直插队到大任务之前
+                if not admission.try_admit(memory[i]):
+                    return
+                pending.remove(item)
+                start(i, attempt)
+
+        def finish(i: int):
+            nonlocal finished, run_params
+            slot = running.pop(i)
+            admission.release(memory[i])
+            cpu_plan.release(slot["group"])
+            resources = slot["sampler"].stop()
+            idle.append(slot["worker"])
+            mesh_pair, cat, bake_pass = job = slot["job"]
+            res = job_res[mesh_pair]
+            sm, stats, attempt = slot["sm"], slot["stats"], slot["attempt"]
+            name = f"Bake {mesh_pair[0]}[{bake_pass}]"
+            try:
+                if failure := slot["failure"]:
+                    Trace.record(name, slot["ts"], now_us(), cat, resolution=res, attempt=attempt, error=failure)
+                    if attempt < job_retries and slot["retry"]:
+                        delay = min(cls.retry_backoff * 2 ** attempt, cls.retry_backoff_max)
+                        executor.warn("%s[%s] retry in %.0fs: %s", mesh_pair[0], bake_pass, delay, failure)
+                        pending.appendleft((i, attempt + 1, time.monotonic() + delay))
+                        return
+                    # 进程退出/超时, 下一个任务重新启动
+                    cls.handle_output(executor, job, "error", failure, stats, errors)
+                    journal.record_failed(i, failure)
+                else:
+                    import_start = time.perf_counter()
+                    with Trace.span("Image Import"):
+                        cls.collect_result(sm, mesh_pair, cat, bake_pass, res, out_images, out_tiles, derived_sources, pbr_pack)
+                    stats["stages"]["Image Import"] = time.perf_counter() - import_start
+                    if used := sparse.used_size(sm.buf):
+                        journal.record_done(i, bytes(sm.buf[:used]))
+                    else:
+                        executor.warn("%s[%s] produced no image", mesh_pair[0], bake_pass)
+                    wall = time.perf_counter() - slot["start"]
+                    Trace.record(name, slot["ts"], now_us(), cat, resolution=res, attempt=attempt)
+                    executor.warn(f"{name}: cost {wall:.4f}s")
+                    run_params = stats["run_params"]
+                    # peak_mem 为 Cycles 报告的峰值, 进程的绝对峰值 RSS 在 resources 中, 分别记录
+                    cls.record_perf(executor, ctx, mesh_pair, cat, bake_pass, res, wall, stats["stages"], stats["peak_mem"], resources)
+            finally:
+                SHM.erase(sm.name)
+            finished += 1
+            executor.update_node_process(finished / total)
+            remaining = cls.estimate_remaining([estimates[p[0]] for p in pending] + [estimates[j] for j in running])
+            executor.set_eta(remaining / max_workers if remaining is not None else None)
+
+        executor.update_node_process(0)
+        executor.set_eta(cls.estimate_remaining([estimates[i] for i in memory]))
+        try:
+            with Supervisor() as supervisor:
+                admit()
+                while running or pending:
+                    for i, kind, payload in supervisor.events():
+                        slot = running[i]
+                        if kind == "error":
+                            slot["failure"] = "\n".join(filter(None, (slot["failure"], payload)))
+                        elif kind == "job_error":
+                            # 脚本错误重试也不会成功, 等任务结束后按失败处理
+                            slot["failure"] = "\n".join(filter(None, (slot["failure"], payload)))
+                            slot["retry"] = False
+                            continue
+                        elif kind != "done":
+                            cls.handle_output(executor, slot["job"], kind, payload, slot["stats"], errors)
+                            if len(running) < max_workers:
+                                # 到期的重试或释放的内存可能允许启动新任务
+                                admit()
+                            continue
+                        finish(i)
+                        admit()
+                    if pending and not running:
+                        # 只剩等待退避的重试任务
+                        time.sleep(max(min(p[2] for p in pending) - time.monotonic(), 0))
+                        admit()
+        finally:
+            for slot in running.values():
+                if sampler := slot.get("sampler"):
+                    sampler.stop()
+                SHM.erase(slot["sm"].name)
+                idle.append(slot["worker"])
+            for worker in idle:
+                WorkerPool.release(worker)
+
+    @classmethod
+    def bake_remote(cls, executor: TaskExecutor, ctx: TreeCtx, agents, retries, token: str, prefs: dict, blend_path: Path, bake_queue, job_res, estimates, journal: BakeJournal,
+                    out_images: TreeCtx, out_tiles: TreeCtx, derived_sources: dict, pbr_pack: dict):
+        """
+        任务分发到各 agent 并行执行, 结果在当前线程中按完成顺序写入共享内存并导入
+        prefs: get_worker_prefs 的返回值, 使用其中的 device 和任务超时/无输出超时
+        """
+        # 只分发未完成的任务, 事件中的序号为 indices 的下标
+        indices = journal.pending()
+        if not indices:
+            return
+        estimates = [estimates[i] for i in indices]
+        bake_queue = [bake_queue[i] for i in indices]
+        jobs = []
+        for mesh_pair, cat, bake_pass in bake_queue:
+            res = job_res[mesh_pair]
+            # 在当前线程中序列化, agent 线程发送时 ctx 可能正被修改; shm_name 由 agent 替换
+            # 线程数和绑定的 CPU 由 agent 按其并行数设置
+            config = {"ctx": ctx, "bake_params": (mesh_pair, cat, bake_pass), "resolution": res, "shm_name": "", "run_params": {}, "device": prefs["device"]}
+            jobs.append((repr(config), sparse.buffer_size(*res)))
+        errors = ctx.ensure_list("Errors")
+        coordinator = Coordinator(agents, retries, token=token, job_timeout=prefs["timeout"], stall=prefs["stall"])
+        starts, stats, agent_of = {}, {}, {}
+        pending = set(range(len(jobs)))
+        # 结果按完成顺序逐个写入, 按最大的任务分配一块共享内存
+        sm = SHM.create(max(size for _, size in jobs))
+        try:
+            for index, kind, payload in coordinator.run(blend_path, jobs):
+                if index < 0:
+                    executor.warn("%s", payload)
                     continue
-                # 运行时数据 "[RUN_PARAMS]: {"elementsCount": 3}"
-                match = re.match(r"\[RUN_PARAMS\]: (\{.*?\})", line, re.S)
-                if match:
-                    run_params = json.loads(match.group(1))
+                job = bake_queue[index]
+                mesh_pair, cat, bake_pass = job
+                if kind == "retry":
+                    executor.warn("%s[%s] retry: %s", mesh_pair[0], bake_pass, payload)
                     continue
-                match = re.match(r"Blender (\d+\.\d+\.\d+)", line)
-                if match:
+                if kind == "start":
+                    starts[index] = time.perf_counter()
+                    agent_of[index] = payload
+                    stats[index] = {"stages": {}, "peak_mem": 0, "run_params": {}}
+                    executor.info("%s[%s] -> %s", mesh_pair[0], bake_pass, payload)
                     continue
-                line = line.replace("| Scene ", "")
-                match = re.match(r"Fra:(\d+) Mem:(\d+\.\d+)M \(Peak (\d+\.\d+)M\) \| Time:(\d+:.*?) \| Mem:(\d+\.\d+)M, Peak:(\d+\.\d+)M (.*?)xxxx", line + "xxxx", re.S)
-                if match:
-                    executor.info(f"Fra:{match.group(1)} Mem:{match.group(2)}M {match.group(7)}")
+                if kind == "error":
+                    # 是否失败由重试结果决定, 这里只记录
+                    executor.warn("%s[%s] %s: %s", mesh_pair[0], bake_pass, agent_of.get(index), payload)
                     continue
-                executor.critical(line)
-            dst = mesh_pair[0]
-            img_name = f"{dst}_{cat}_{bake_pass}"
-            if img_name not in bpy.data.images:
-                bpy.data.images.new(name=img_name, width=res[0], height=res[1], alpha=True)
-            img: bpy.types.Image = bpy.data.images[img_name]
-            img.scale(*res)
-            img.pixels.foreach_set(pixels.ravel())
-            pixels.fill(0)
-            bake_result = out_images.ensure_dict(mesh_pair)
-            bake_result[(cat, bake_pass)] = img.name
-
-        SHM.erase(sm.name)
-        return ctx
-        # --tree "Bake Recipe" --node "Output Image Path" --sock -1 --debug 0 --ignorevis 0 --solitr 0 --frameitr 0 --batchitr 0 --rend_dev METAL
+                if kind not in {"result", "failed"}:
+                    cls.handle_output(executor, job, kind, payload, stats[index], errors)
+                    continue
+                pending.discard(index)
+                executor.update_node_process(1 - len(pending) / len(jobs))
+                remaining = cls.estimate_remaining([estimates[i] for i in pending])
+                executor.set_eta(remaining / len(agents) if remaining is not None else None)
+                if kind == "failed":
+                    executor.error("%s[%s] failed: %s", mesh_pair[0], bake_pass, payload)
+                    errors.append({"object": mesh_pair[0], "cat": cat, "pass": bake_pass, "error": payload})
+                    journal.record_failed(indices[index], payload)
+                    continue
+                journal.record_done(indices[index], payload)
+                res = job_res[mesh_pair]
+                job_stats = stats[index]
+                sm.buf[:len(payload)] = payload
+                import_start = time.perf_counter()
+                with Trace.span("Image Import", agent=agent_of[index]):
+                    cls.collect_result(sm, mesh_pair, cat, bake_pass, res, out_images, out_tiles, derived_sources, pbr_pack)
+                job_stats["stages"]["Image Import"] = time.perf_counter() - import_start
+                wall = time.perf_counter() - starts[index]
+                cls.record_perf(executor, ctx, mesh_pair, cat, bake_pass, res, wall, job_stats["stages"], job_stats["peak_mem"], {"agent": agent_of[index]})
+        finally:
+            SHM.erase(sm.name)
+
+    @classmethod
+    def restore_journal(cls, journal: BakeJournal, bake_queue, job_res, out_images: TreeCtx, out_tiles: TreeCtx, derived_sources: dict, pbr_pack: dict):
+        """
+        从烘焙日志的结果文件导入已完成的任务
+        """
+        results = {index: journal.result(index) for index in journal.done}
+        sm = SHM.create(max(len(result) for result in results.values()))
+        try:
+            for index, result in results.items():
+                mesh_pair, cat, bake_pass = bake_queue[index]
+                sm.buf[:len(result)] = result
+                cls.collect_result(sm, mesh_pair, cat, bake_pass, job_res[mesh_pair], out_images, out_tiles, derived_sources, pbr_pack)
+        finally:
+            SHM.erase(sm.name)
+
+    @staticmethod
+    def history_peak(cat, bake_pass, width, height) -> float | None:
+        try:
+            return PerfHistory.peak_memory(cat, bake_pass, width, height)
+        except sqlite3.Error:
+            return None
+
+    @staticmethod
+    def estimate_job(cat, bake_pass, res, samples) -> float | None:
+        try:
+            return PerfHistory.estimate(cat, bake_pass, res[0], res[1], samples)
+        except sqlite3.Error:
+            return None
+
+    @staticmethod
+    def estimate_remaining(estimates: list) -> float | None:
+        known = [e for e in estimates if e is not None]
+        if not known:
+            return None
+        # 没有历史的任务按已知任务的平均值估算
+        return sum(known) + (len(estimates) - len(known)) * sum(known) / len(known)
+
+    @classmethod
+    def record_perf(cls, executor: TaskExecutor, ctx: TreeCtx, mesh_pair, cat, bake_pass, res, wall, stages, peak_mem, resources=None):
+        bake_settings = ctx.get("BakeSettings", {})
+        samples = bake_settings.get("samples", 1)
+        polys = ctx.get("MeshStats", {}).get(mesh_pair, {}).get("polys")
+        if polys is None and (obj := bpy.data.objects.get(mesh_pair[0])) and obj.type == "MESH":
+            polys = len(obj.data.polygons)
+        ctx.ensure_list("PassStats").append({
+            "object": mesh_pair[0],
+            "cat": cat,
+            "pass": bake_pass,
+            "width": res[0],
+            "height": res[1],
+            "wall": wall,
+            "samples": samples,
+            "stages": stages,
+            "peak_mem": peak_mem,
+        })
+        try:
+            expected = PerfHistory.check_regression(cat, bake_pass, res[0], res[1], samples, wall)
+            if expected is not None:
+                executor.warn(f"{mesh_pair[0]}[{bake_pass}] took {wall:.1f}s, expected ~{expected:.1f}s from history")
+            PerfHistory.record({
+                "tree": executor.process.get("etask", ""),
+                "object": mesh_pair[0],
+                "polys": polys,
+                "width": res[0],
+                "height": res[1],
+                "samples": samples,
+                "cat": cat,
+                "pass": bake_pass,
+                "engine": "CYCLES",
+                "blender": bpy.app.version_string,
+                "wall": wall,
+                "stages": stages,
+                "peak_mem": peak_mem,
+                "peak_rss": (resources or {}).get("peak_rss_mb"),
+                "resources": resources or {},
+            })
+        except sqlite3.Error as e:
+            executor.warn(f"Perf history unavailable: {e}")
+
+    @classmethod
+    def collect_result(cls, sm, mesh_pair, cat, bake_pass, res, out_images: TreeCtx, out_tiles: TreeCtx, derived_sources: dict, pbr_pack: dict):
+        dst = mesh_pair[0]
+        img_name = f"{dst}_{cat}_{bake_pass}"
+        img = ensure_image(img_name, res, cat, bake_pass)
+        pixels, tile_ids, tile = sparse.read(sm.buf)
+        if pixels is None:
+            # 后台进程未写入结果
+            pixels = np.zeros((res[1], res[0], 4), dtype=np.float32)
+        img.pixels.foreach_set(pixels.ravel())
+        if tile_ids is not None:
+            out_tiles.ensure_dict(mesh_pair)[(cat, bake_pass)] = {"tile": tile, "ids": tile_ids.tolist()}
+        if cat == "Derived":
+            derived_sources.setdefault(mesh_pair, {})[bake_pass] = img
+            return
+        if cat == "PBR" and pbr_pack.get(bake_pass, {}).get("split"):
+            cls.split_packed(out_images, mesh_pair, img, pbr_pack[bake_pass]["channels"])
+            return
+        bake_result = out_images.ensure_dict(mesh_pair)
+        bake_result[(cat, bake_pass)] = img.name
+
+    @classmethod
+    def get_job_resolutions(cls, ctx: TreeCtx, mesh_pairs: set) -> dict[tuple, tuple[int, int]]:
+        """
+        每个物体的烘焙分辨率, 开启自动分辨率时按 UV面积/世界面积 与目标纹素密度计算
+        """
+        bake_settings = ctx.get("BakeSettings", {})
+        res = tuple(bake_settings.get("resolution", (512, 512)))
+        job_res = {mesh_pair: res for mesh_pair in mesh_pairs}
+        auto_res = bake_settings.get("auto_resolution", {})
+        if not auto_res:
+            return job_res
+        stats = ctx.ensure_dict("MeshStats")
+
+        @Timer.wait_run
+        def f():
+            depsgraph = bpy.context.evaluated_depsgraph_get()
+            for mesh_pair in mesh_pairs:
+                if mesh_pair in stats:
+                    continue
+                obj = bpy.data.objects.get(mesh_pair[0])
+                if not obj:
+                    continue
+                stats[mesh_pair] = mesh_stats(obj, mesh_pair[2] or bake_settings.get("uv_layer", 0), depsgraph)
+
+        f()
+        for mesh_pair in mesh_pairs:
+            if mesh_pair not in stats:
+                continue
+            r = auto_resolution(stats[mesh_pair], auto_res["density"], auto_res["min"], auto_res["max"])
+            job_res[mesh_pair] = (r, r)
+        return job_res
+
+    @classmethod
+    def get_derived_passes(cls, bake_passes: dict, bake_settings: dict) -> dict[str, str]:
+        """
+        返回 {自定义通道: 推导名}, 开启推导时由法线/位置图计算, 无.blend的预设总是推导
+        """
+        use_derived = bake_settings.get("use_derived_passes", False)
+        derived_passes = {}
+        for bake_pass in bake_passes.get("Advanced", []):
+            name = CustomPass.load_preset(bake_pass).get("Derived", "")
+            if name not in DERIVED_PASSES:
+                continue
+            if use_derived or not CustomPass.get_preset_dir().joinpath(f"{bake_pass}.blend").exists():
+                derived_passes[bake_pass] = name
+        return derived_passes
+
+    @classmethod
+    def split_packed(cls, out_images: TreeCtx, mesh_pair, img: bpy.types.Image, channels: list[str]):
+        """
+        将打包图按通道拆分为独立灰度图, 拆分后移除打包图
+        """
+        packed = image_to_array(img)
+        bake_result = out_images.ensure_dict(mesh_pair)
+        for i, channel in enumerate(channels):
+            if channel == "NONE":
+                continue
+            img_name = f"{mesh_pair[0]}_PBR_{channel}"
+            cimg = ensure_image(img_name, img.size, "PBR", channel)
+            pixels = np.empty_like(packed)
+            pixels[..., :3] = packed[..., i:i + 1]
+            pixels[..., 3] = 1
+            cimg.pixels.foreach_set(pixels.ravel())
+            bake_result[("PBR", channel)] = cimg.name
+        bpy.data.images.remove(img)
+
+    @classmethod
+    def bake_derived(cls, executor: TaskExecutor, out_images: TreeCtx, sources: dict, derived_passes: dict, uv_layer=0):
+        keys = {(mesh_pair, tuple(images["NORMAL"].size)) for mesh_pair, images in sources.items() if "NORMAL" in images}
+        masks = get_coverage_masks(keys, uv_layer)
+        for mesh_pair, images in sources.items():
+            normal_img = images.get("NORMAL")
+            position_img = images.get("POSITION")
+            if normal_img and position_img:
+                normal = image_to_array(normal_img)
+                position = image_to_array(position_img)
+                obj = bpy.data.objects.get(mesh_pair[0])
+                matrix = [row[:] for row in obj.matrix_world] if obj else None
+                for bake_pass, name in derived_passes.items():
+                    mask = masks.get((mesh_pair, tuple(normal_img.size)), (None,))[0]
+                    with Trace.span(f"Derive {mesh_pair[0]}[{bake_pass}]", echo=executor.warn):
+                        pixels = derived.compute(name, normal, position, matrix, coverage=mask)
+                    img_name = f"{mesh_pair[0]}_Advanced_{bake_pass}"
+                    img = ensure_image(img_name, normal_img.size, "Advanced", bake_pass)
+                    img.pixels.foreach_set(pixels.ravel())
+                    out_images.ensure_dict(mesh_pair)[("Advanced", bake_pass)] = img.name
+            for img in images.values():
+                bpy.data.images.remove(img)
 
     def dump(self, ctx: TreeCtx = None) -> TreeCtx:
         super().dump(ctx)
@@ -289,6 +817,41 @@ class BakeSetting(NodeBase):
     use_adaptive_sampling: bpy.props.BoolProperty(name="Use Adaptive Sampling", default=True)
     adaptive_threshold: bpy.props.FloatProperty(name="Adaptive Threshold", default=0.0, min=0.0, max=1.0)
     uv_layer: bpy.props.IntProperty(name="UV Layer", default=0, min=0, max=100)
+    use_auto_resolution: bpy.props.BoolProperty(name="Auto Resolution",
+                                                description="Pick a power-of-two resolution per object from its texel density",
+                                                default=False)
+    texel_density: bpy.props.FloatProperty(name="Texel Density", description="Pixels per meter", default=512, min=1, max=65536)
+    min_resolution: bpy.props.IntProperty(name="Min Resolution", default=128, min=32, max=16384)
+    max_resolution: bpy.props.IntProperty(name="Max Resolution", default=4096, min=32, max=16384)
+    use_derived_passes: bpy.props.BoolProperty(name="Derived Passes",
+                                               description="Compute Cavity/Curvature/EdgeMask from one Normal and Position bake",
+                                               default=False)
+    use_convergence: bpy.props.BoolProperty(name="Converge",
+                                            description="Bake noisy passes in sample batches until the noise falls below the adaptive threshold",
+                                            default=False)
+    max_samples: bpy.props.IntProperty(name="Max Samples", description="Sample limit for convergence, 0 uses the per-pass default", default=0, min=0, max=65536)
+    use_denoise: bpy.props.BoolProperty(name="Denoise",
+                                        description="Denoise noisy passes after baking, filtering within UV islands only",
+                                        default=False)
+    denoise_method: bpy.props.EnumProperty(name="Denoise Method",
+                                           items=[("FILTER", "Island Filter", "Edge-preserving filter inside each UV island"),
+                                                  ("OIDN", "OpenImageDenoise", "Compositor denoise node, island filter near seams")],
+                                           default="FILTER")
+    denoise_passes: bpy.props.EnumProperty(name="Denoise Passes",
+                                           items=[("AO", "Ambient Occlusion", "", "NONE", 2 ** 0),
+                                                  ("COMBINED", "Combined", "", "NONE", 2 ** 1),
+                                                  ("DIFFUSE", "Diffuse", "", "NONE", 2 ** 2),
+                                                  ("GLOSSY", "Glossy", "", "NONE", 2 ** 3),
+                                                  ("TRANSMISSION", "Transmission", "", "NONE", 2 ** 4),
+                                                  ("SHADOW", "Shadow", "", "NONE", 2 ** 5),
+                                                  ("Thickness", "Thickness", "", "NONE", 2 ** 6),
+                                                  ("Cavity", "Cavity", "", "NONE", 2 ** 7),
+                                                  ("Dust", "Dust", "", "NONE", 2 ** 8),
+                                                  ("BevelMask", "Bevel Mask", "", "NONE", 2 ** 9),
+                                                  ],
+                                           default={"AO", "COMBINED", "Thickness", "Cavity"},
+                                           options={"ENUM_FLAG"})
+    denoise_strength: bpy.props.FloatProperty(name="Denoise Strength", default=1.0, min=0.1, max=4.0)
 
     def init(self, context: Context):
         from ..xxx.preference import get_pref
@@ -305,25 +868,59 @@ class BakeSetting(NodeBase):
             "use_adaptive_sampling": self.use_adaptive_sampling,
             "adaptive_threshold": self.adaptive_threshold,
             "uv_layer": self.uv_layer,
+            "use_derived_passes": self.use_derived_passes,
+            "converge": self.use_convergence,
+            "max_samples": self.max_samples,
         }
+        if self.use_denoise:
+            ctx["BakeSettings"]["denoise"] = {
+                "method": self.denoise_method,
+                "passes": sorted(self.denoise_passes),
+                "strength": self.denoise_strength,
+            }
+        if self.use_auto_resolution:
+            ctx["BakeSettings"]["auto_resolution"] = {
+                "density": self.texel_density,
+                "min": self.min_resolution,
+                "max": max(self.min_resolution, self.max_resolution),
+            }
         return ctx
 
     def draw_buttons(self, context: Context, layout: UILayout):
         row = layout.row(align=True)
+        row.enabled = not self.use_auto_resolution
         row.prop(self, "resolution")
         row.popover(
             panel="OBJECT_PT_bake_setting_presets",
             icon="PRESET",
             text="",
         )
+        layout.prop(self, "use_auto_resolution", toggle=True)
+        if self.use_auto_resolution:
+            col = layout.column(align=True)
+            col.prop(self, "texel_density")
+            col.prop(self, "min_resolution")
+            col.prop(self, "max_resolution")
         layout.prop(self, "bake_samples")
         layout.prop(self, "samples")
         row = layout.row(align=True)
         row.prop(self, "use_adaptive_sampling", toggle=True)
         rc = row.column()
         rc.prop(self, "adaptive_threshold", text="")
-        rc.enabled = self.use_adaptive_sampling
+        rc.enabled = self.use_adaptive_sampling or self.use_convergence
+        row = layout.row(align=True)
+        row.prop(self, "use_convergence", toggle=True)
+        rc = row.column()
+        rc.prop(self, "max_samples", text="")
+        rc.enabled = self.use_convergence
         layout.prop(self, "uv_layer")
+        layout.prop(self, "use_derived_passes", toggle=True)
+        layout.prop(self, "use_denoise", toggle=True)
+        if self.use_denoise:
+            col = layout.column(align=True)
+            col.prop(self, "denoise_method", text="")
+            col.prop(self, "denoise_strength")
+            col.prop(self, "denoise_passes")
 
 
 class Pass(NodeBase):
@@ -380,26 +977,62 @@ class PBRPass(NodeBase):
     bl_label = "PBRPass"
     bl_icon = "NODETREE"
 
-    bake_passes: bpy.props.EnumProperty(items=[("Albedo", "Albedo", "", "NONE", 2 ** 0),
-                                               ("Metallic", "Metallic", "", "NONE", 2 ** 1),
-                                               ("Roughness", "Roughness", "", "NONE", 2 ** 2),
-                                               ("Normal", "Normal", "", "NONE", 2 ** 3),
-                                               ("Emission", "Emission", "", "NONE", 2 ** 4),
-                                               ("AO", "AO", "", "NONE", 2 ** 5),
-                                               ("IOR", "IOR", "", "NONE", 2 ** 6),
-                                               ],
+    pbr_pass_items = [("Albedo", "Albedo", "", "NONE", 2 ** 0),
+                      ("Metallic", "Metallic", "", "NONE", 2 ** 1),
+                      ("Roughness", "Roughness", "", "NONE", 2 ** 2),
+                      ("Normal", "Normal", "", "NONE", 2 ** 3),
+                      ("Emission", "Emission", "", "NONE", 2 ** 4),
+                      ("AO", "AO", "", "NONE", 2 ** 5),
+                      ("IOR", "IOR", "", "NONE", 2 ** 6),
+                      ]
+    bake_passes: bpy.props.EnumProperty(items=pbr_pass_items,
                                         default={"Albedo"},
                                         name="Pass",
                                         options={"ENUM_FLAG"})
 
+    # 打包模式: 最多三个标量通道写入同一张图的 R/G/B, 一次EMIT烘焙完成
+    pack_channel_items = [("NONE", "None", "", "NONE", 0),
+                          ("AO", "AO", "", "NONE", 1),
+                          ("Roughness", "Roughness", "", "NONE", 2),
+                          ("Metallic", "Metallic", "", "NONE", 3),
+                          ("IOR", "IOR", "", "NONE", 4),
+                          ("Alpha", "Alpha", "", "NONE", 5),
+                          ]
+    use_pack: bpy.props.BoolProperty(name="Pack Channels", default=False)
+    pack_name: bpy.props.StringProperty(name="Pack Name", default="ORM")
+    pack_split: bpy.props.BoolProperty(name="Split Channels", default=False)
+    pack_r: bpy.props.EnumProperty(items=pack_channel_items, name="R", default="AO")
+    pack_g: bpy.props.EnumProperty(items=pack_channel_items, name="G", default="Roughness")
+    pack_b: bpy.props.EnumProperty(items=pack_channel_items, name="B", default="Metallic")
+
     def init(self, context: Context):
         self.width = 250
         self.outputs.new("Pass", "Pass")
 
+    def pack_name_conflict(self) -> bool:
+        """
+        打包名称与固定通道同名时, 后台会按固定通道烘焙(如 "AO"), 不允许使用
+        """
+        name = self.pack_name.casefold()
+        return any(item[0].casefold() == name for item in self.pbr_pass_items + self.pack_channel_items)
+
     def dump(self, ctx: TreeCtx = None) -> TreeCtx:
         super().dump(ctx)
         bake_passes = ctx.ensure_dict("Pass")
+        channels = []
+        if self.use_pack and self.pack_name and self.pack_name_conflict():
+            logger.warning(f"Pack name conflicts with a PBR pass, skip: {self.pack_name}")
+        elif self.use_pack and self.pack_name:
+            channels = [self.pack_r, self.pack_g, self.pack_b]
+            pack = ctx.ensure_dict("PBRPack").ensure_dict(self.pack_name)
+            pack["channels"] = channels
+            pack["split"] = self.pack_split
+            if self.pack_name not in bake_passes.get("PBR", []):
+                bake_passes.ensure_list("PBR").append(self.pack_name)
         for bake_pass in self.bake_passes:
+            # 拆分后的打包通道已包含该通道
+            if self.pack_split and bake_pass in channels:
+                continue
             if bake_pass in bake_passes.get("PBR", []):
                 continue
             bake_passes.ensure_list("PBR").append(bake_pass)
@@ -407,6 +1040,20 @@ class PBRPass(NodeBase):
 
     def draw_buttons(self, context: Context, layout: UILayout):
         layout.column().prop(self, "bake_passes")
+        layout.prop(self, "use_pack", toggle=True)
+        if not self.use_pack:
+            return
+        box = layout.box()
+        row = box.row(align=True)
+        row.alert = self.pack_name_conflict()
+        row.prop(self, "pack_name", text="")
+        row.prop(self, "pack_split", toggle=True)
+        if row.alert:
+            box.label(text="Pack name conflicts with a PBR pass", icon="ERROR")
+        col = box.column(align=True)
+        col.prop(self, "pack_r")
+        col.prop(self, "pack_g")
+        col.prop(self, "pack_b")
 
     def draw_buttons_ext(self, context: Context, layout: UILayout):
         cat = self.bl_label.replace("Pass", "")
@@ -424,23 +1071,45 @@ class CustomPass(NodeBase):
     category = "Pass"
     bl_label = "CustomPass"
     bl_icon = "NODETREE"
-    cached_bake_passes = []
     cached_bake_params_name = {}
+    # 已注册的参数签名, 只有参数变化时才需要重新注册节点类
+    registered_params = None
 
     def get_bake_passes(self, context):
-        if CustomPass.cached_bake_passes:
-            return CustomPass.cached_bake_passes
-        bake_passes = []
-        path = Path(__file__).parent.joinpath("advanced")
-        for file in path.glob("*.json"):
-            config = json.loads(file.read_text(encoding="utf-8"))
-            bake_passes.append((file.stem,
-                               config.get("Name"),
-                               config.get("Description"),
-                               "NONE",
-                                2 ** len(bake_passes)))
-        CustomPass.cached_bake_passes.extend(bake_passes)
-        return CustomPass.cached_bake_passes
+        return CustomPass.bake_pass_items()
+
+    @staticmethod
+    def bake_pass_items() -> list:
+        def make_item(i, name, entry):
+            config = entry.get("config", {})
+            return (name, config.get("Name"), config.get("Description"), "NONE", 2 ** i)
+        return PresetRegistry.items("advanced", make_item)
+
+    @staticmethod
+    def get_preset_dir() -> Path:
+        return Path(__file__).parent.joinpath("advanced")
+
+    @classmethod
+    def load_preset(cls, name) -> dict:
+        return PresetRegistry.config(name)
+
+    @classmethod
+    def init_registry(cls):
+        if "advanced" in PresetRegistry.indexes:
+            return
+        PresetRegistry.add("advanced", cls.get_preset_dir(), ".json", parse_bake_preset)
+        PresetRegistry.add_listener("advanced", lambda changed: Timer.put(cls.on_presets_changed))
+
+    @classmethod
+    def on_presets_changed(cls):
+        if cls.params_signature() == cls.registered_params:
+            return
+        cls.reload_node(refresh=False)
+
+    @classmethod
+    def params_signature(cls) -> str:
+        params = {name: config.get("Params", {}) for name, config in PresetRegistry.configs().items()}
+        return json.dumps(params, sort_keys=True)
 
     @classmethod
     def gen_prop(cls, ptype, pcfg):
@@ -471,14 +1140,12 @@ class CustomPass(NodeBase):
     def parse_params(cls):
         dyn_props = {}
         cls.cached_bake_params_name.clear()
-        path = Path(__file__).parent.joinpath("advanced")
-        for file in path.glob("*.json"):
-            config = json.loads(file.read_text(encoding="utf-8"))
+        for stem, config in PresetRegistry.configs().items():
             params = config.get("Params", {})
             name_map = {}
-            cls.cached_bake_params_name[file.stem] = name_map
+            cls.cached_bake_params_name[stem] = name_map
             for oname, pcfg in params.items():
-                pname = f"{file.stem}_{pcfg['node']}_{pcfg['name']}"
+                pname = f"{stem}_{pcfg['node']}_{pcfg['name']}"
                 pname = bpy.path.clean_name(pname)
                 dyn_props[pname] = cls.gen_prop(pcfg["type"], pcfg)
                 name_map[pname] = oname
@@ -486,12 +1153,14 @@ class CustomPass(NodeBase):
 
     @classmethod
     def reg(cls):
+        cls.init_registry()
         ant = cls.__annotations__
         ant.clear()
         ant["bake_passes"] = bpy.props.EnumProperty(items=cls.get_bake_passes,
                                                     name="Pass",
                                                     options={"ENUM_FLAG"})
         ant.update(cls.parse_params())
+        cls.registered_params = cls.params_signature()
         bpy.utils.register_class(cls)
 
     @classmethod
@@ -499,8 +1168,9 @@ class CustomPass(NodeBase):
         bpy.utils.unregister_class(cls)
 
     @classmethod
-    def reload_node(cls):
-        cls.cached_bake_passes.clear()
+    def reload_node(cls, refresh=True):
+        if refresh:
+            PresetRegistry.refresh("advanced", notify=False)
         cls.unreg()
         cls.reg()
 
@@ -534,7 +1204,8 @@ class CustomPass(NodeBase):
 
     def draw_buttons_ext(self, context: Context, layout: UILayout):
         cat = self.bl_label.replace("Pass", "")
-        for c in filter(lambda x: x[0] in self.bake_passes, self.cached_bake_passes):
+        layout.operator("bake_tree.build_preset_library", icon="ASSET_MANAGER")
+        for c in filter(lambda x: x[0] in self.bake_passes, self.bake_pass_items()):
             c = c[0]
             box = layout.box()
             header = box.row()
@@ -774,6 +1445,7 @@ class ImageCombine(NodeBase):
         if not image_combine.get("combine", False):
             return res
         out_images: dict = task.get("OutImages", {})
+        out_tiles: dict = task.get("OutTiles", {})
 
         bake_images = {}
         for pair, images in out_images.items():
@@ -781,30 +1453,60 @@ class ImageCombine(NodeBase):
                 img = bpy.data.images.get(_name)
                 if not img:
                     continue
-                bake_images.setdefault((cat, bake_pass), []).append(img)
-
-        bake_settings = task.get("BakeSettings", {})
-        reslution = bake_settings.get("resolution", (512, 512))
+                tiles = out_tiles.get(pair, {}).get((cat, bake_pass))
+                bake_images.setdefault((cat, bake_pass), []).append((pair, img, tiles))
+
+        # 自动分辨率下各物体尺寸不同, 合并到其中最大的尺寸
+        resolutions = {}
+        for key, images in bake_images.items():
+            resolutions[key] = max((tuple(img.size) for _, img, _ in images), key=lambda r: r[0] * r[1])
+        # 覆盖掩码按 物体+UV+分辨率 缓存, 同一物体的所有通道共用
+        masks = get_coverage_masks({(pair, resolutions[key]) for key, images in bake_images.items() for pair, _, _ in images},
+                                   task.get("BakeSettings", {}).get("uv_layer", 0),
+                                   bpy.context.scene.render.bake.margin)
         for (cat, bake_pass), images in bake_images.items():
             if len(images) < 2:
                 continue
+            reslution = resolutions[(cat, bake_pass)]
             background = np.zeros(4, dtype=np.float32)
-            canvas = np.zeros((reslution[0], reslution[1], 4), dtype=np.float32)
+            canvas = np.zeros((reslution[1], reslution[0], 4), dtype=np.float32)
             background[3] = 1
             if bake_pass.endswith("Normal"):
                 background[:] = (0.501960813999176, 0.501960813999176, 1, 1)
             canvas[:, :] = background
-            for img in images:
-                pixels = np.zeros(reslution[0] * reslution[1] * 4, dtype=np.float32)
-                img.pixels.foreach_get(pixels)
-                pixels = pixels.reshape(reslution[0], reslution[1], 4)
+            layers = []
+            for pair, img, tiles in images:
+                if tuple(img.size) != reslution:
+                    tmp = img.copy()
+                    tmp.scale(*reslution)
+                    pixels = image_to_array(tmp)
+                    bpy.data.images.remove(tmp)
+                    tiles = None
+                else:
+                    pixels = image_to_array(img)
+                if (pair, reslution) in masks:
+                    layers.append((pixels, *masks[(pair, reslution)]))
+                    continue
+                # 无法获取UV时退回到颜色比较, 有tile信息时只在有数据的tile内比较
+                if tiles and (tview := sparse.tile_view(canvas, tiles["tile"])) is not None:
+                    tmask = sparse.ids_to_mask(tiles["ids"], *reslution, tiles["tile"])
+                    src = sparse.tile_view(pixels, tiles["tile"])[tmask]
+                    dst = tview[tmask]
+                    has_data = np.abs(src[..., :3] - background[:3]).sum(axis=-1) > 0.000001
+                    dst[has_data] = src[has_data]
+                    tview[tmask] = dst
+                    continue
                 has_data = np.abs(pixels[:, :, :3] - background[:3]).sum(axis=2) > 0.000001
                 # 所有物体的同烘焙类型的图片按alpha上叠算法合并
                 canvas[has_data] = pixels[has_data]
+            coverage.composite(canvas, layers)
+            float_buffer, colorspace = image_spec(cat, bake_pass)
             combine_img = bpy.data.images.new(name=f"{cat}_{bake_pass}_Combine",
                                               width=reslution[0],
                                               height=reslution[1],
-                                              alpha=True)
+                                              alpha=True,
+                                              float_buffer=float_buffer)
+            combine_img.colorspace_settings.name = colorspace
             combine_img.pixels.foreach_set(canvas.ravel())
             if "resize" not in image_combine:
                 continue
@@ -1069,18 +1771,10 @@ class SaveToImage(NodeBase):
         name_fmt = cls.calc_name_fmt(name_fmt, seperator)
         scene = bpy.context.scene
         render = scene.render
-        old_img_settings = {}
-
-        for key in img_settings:
-            old_img_settings[key] = getattr(render.image_settings, key)
-
-        @Timer.wait_run
-        def f():
-            for key in img_settings:
-                setattr(render.image_settings, key, img_settings[key])
-
-        f()
+        # 一次主线程调用完成读取旧值和写入
+        old_img_settings = Timer.set_attrs(render.image_settings, img_settings).result()
         img_suffix = "." + img_settings["file_format"].lower()
+        saved = task.ensure_list("SavedImages")
         for pair, images in out_images.items():
             for (cat, bake_pass), _name in images.items():
                 img = bpy.data.images.get(_name)
@@ -1091,18 +1785,14 @@ class SaveToImage(NodeBase):
                                            bake_pass=bake_pass,
                                            resolution=f"{img.size[0]}x{img.size[1]}",
                                            )
-                t = ScopeTimer(f"Save {img_name}", executor.warn)
                 img_path = Path(directory) / (img_name + img_suffix)
                 img_path.unlink(missing_ok=True)
-                img.save_render(filepath=img_path.as_posix(), scene=scene)
+                with Trace.span(f"Save {img_name}", echo=executor.warn):
+                    img.save_render(filepath=img_path.as_posix(), scene=scene)
+                saved.append(img_path.as_posix())
                 # bpy.data.images.remove(img)
 
-        @Timer.wait_run
-        def f():
-            for key in old_img_settings:
-                setattr(render.image_settings, key, old_img_settings[key])
-
-        f()
+        Timer.set_attrs(render.image_settings, old_img_settings).result()
         return res
 
     def dump(self, ctx: TreeCtx = None) -> TreeCtx:
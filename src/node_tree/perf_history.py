@@ -0,0 +1,196 @@
+"""
+烘焙性能历史: 每个通道完成后写入一条记录(SQLite), 用于预估剩余时间、发现性能退化和容量规划
+    耗时近似与 像素数 x 采样数 成正比, 预估使用同类通道历史的 "秒/(百万像素*采样)" 中位数
+    内存(MB):
+        peak_mem: Cycles 报告的任务峰值, 本机和远程任务都有
+        peak_rss: 本机后台进程在任务期间的绝对峰值 RSS(含 blender 基础占用和场景), 远程任务为空
+            任务开始时的占用记录在 resources.base_rss_mb
+"""
+from __future__ import annotations
+import json
+import time
+import sqlite3
+import statistics
+from pathlib import Path
+from threading import Lock
+
+DB_PATH = Path(__file__).parent.parent.parent.joinpath("logs", "perf_history.sqlite")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS passes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts REAL NOT NULL,
+    tree TEXT,
+    object TEXT,
+    polys INTEGER,
+    width INTEGER,
+    height INTEGER,
+    samples INTEGER,
+    cat TEXT,
+    pass TEXT,
+    engine TEXT,
+    blender TEXT,
+    wall REAL,
+    stages TEXT,
+    peak_mem REAL,
+    resources TEXT,
+    peak_rss REAL
+);
+CREATE INDEX IF NOT EXISTS idx_passes_pass ON passes (cat, pass, ts);
+"""
+
+COLUMNS = ("ts", "tree", "object", "polys", "width", "height", "samples", "cat", "pass", "engine", "blender", "wall", "stages", "peak_mem", "resources", "peak_rss")
+# 旧数据库缺少的列
+MIGRATIONS = {"resources": "TEXT", "peak_rss": "REAL"}
+
+
+class PerfHistory:
+    db_path = DB_PATH
+    # 同类通道至少有多少条历史时才做预估/退化判断
+    min_history = 3
+    history_size = 50
+    # 比预估慢 regression_factor 倍且超过 regression_min 秒视为退化
+    regression_factor = 2.0
+    regression_min = 2.0
+    _conn: sqlite3.Connection = None
+    _lock = Lock()
+
+    @classmethod
+    def conn(cls) -> sqlite3.Connection:
+        if cls._conn is None:
+            cls.db_path.parent.mkdir(parents=True, exist_ok=True)
+            cls._conn = sqlite3.connect(cls.db_path.as_posix(), check_same_thread=False, timeout=5)
+            cls._conn.row_factory = sqlite3.Row
+            cls._conn.execute("PRAGMA journal_mode=WAL")
+            cls._conn.executescript(SCHEMA)
+            existing = {row["name"] for row in cls._conn.execute("PRAGMA table_info(passes)")}
+            for column, ctype in MIGRATIONS.items():
+                if column not in existing:
+                    cls._conn.execute(f"ALTER TABLE passes ADD COLUMN {column} {ctype}")
+        return cls._conn
+
+    @classmethod
+    def close(cls):
+        with cls._lock:
+            if cls._conn is not None:
+                cls._conn.close()
+                cls._conn = None
+
+    @classmethod
+    def record(cls, row: dict) -> int:
+        row = dict(row)
+        row.setdefault("ts", time.time())
+        for key in ("stages", "resources"):
+            if isinstance(row.get(key), dict):
+                row[key] = json.dumps(row[key])
+        values = [row.get(c) for c in COLUMNS]
+        sql = f"INSERT INTO passes ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})"
+        with cls._lock:
+            conn = cls.conn()
+            cur = conn.execute(sql, values)
+            conn.commit()
+            return cur.lastrowid
+
+    @classmethod
+    def query(cls, cat=None, bake_pass=None, obj=None, since=None, limit=100) -> list[dict]:
+        where, args = [], []
+        for column, value in (("cat", cat), ("pass", bake_pass), ("object", obj)):
+            if value is not None:
+                where.append(f"{column} = ?")
+                args.append(value)
+        if since is not None:
+            where.append("ts >= ?")
+            args.append(since)
+        sql = "SELECT * FROM passes"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY ts DESC LIMIT ?"
+        args.append(limit)
+        with cls._lock:
+            rows = cls.conn().execute(sql, args).fetchall()
+        result = []
+        for row in rows:
+            item = dict(row)
+            item["stages"] = json.loads(item["stages"] or "{}")
+            item["resources"] = json.loads(item["resources"] or "{}")
+            result.append(item)
+        return result
+
+    @staticmethod
+    def workload(width, height, samples) -> float:
+        return max(width * height / 1e6, 1e-3) * max(samples or 1, 1)
+
+    @classmethod
+    def rate(cls, cat, bake_pass) -> float | None:
+        """
+        秒/(百万像素*采样) 的历史中位数
+        """
+        rows = cls.query(cat=cat, bake_pass=bake_pass, limit=cls.history_size)
+        if len(rows) < cls.min_history:
+            return None
+        return statistics.median(r["wall"] / cls.workload(r["width"], r["height"], r["samples"]) for r in rows)
+
+    @classmethod
+    def estimate(cls, cat, bake_pass, width, height, samples) -> float | None:
+        rate = cls.rate(cat, bake_pass)
+        if rate is None:
+            return None
+        return rate * cls.workload(width, height, samples)
+
+    @classmethod
+    def peak_memory(cls, cat, bake_pass, width, height) -> float | None:
+        """
+        同类通道在相同分辨率下最近记录的后台进程最大峰值 RSS(MB), 用于并行烘焙的准入预估
+        """
+        sql = ("SELECT MAX(peak_rss) AS peak FROM (SELECT peak_rss FROM passes"
+               " WHERE cat = ? AND pass = ? AND width = ? AND height = ? AND peak_rss > 0 ORDER BY ts DESC LIMIT ?)")
+        with cls._lock:
+            row = cls.conn().execute(sql, (cat, bake_pass, width, height, cls.history_size)).fetchone()
+        return row["peak"] if row else None
+
+    @classmethod
+    def check_regression(cls, cat, bake_pass, width, height, samples, wall) -> float | None:
+        """
+        比历史明显变慢时返回预估耗时, 否则返回 None
+        """
+        expected = cls.estimate(cat, bake_pass, width, height, samples)
+        if expected is None:
+            return None
+        if wall > expected * cls.regression_factor and wall - expected > cls.regression_min:
+            return expected
+        return None
+
+    @classmethod
+    def report(cls, since=None) -> list[dict]:
+        sql = "SELECT cat, pass, wall, width, height, samples, peak_mem FROM passes"
+        args = []
+        if since is not None:
+            sql += " WHERE ts >= ?"
+            args.append(since)
+        with cls._lock:
+            rows = cls.conn().execute(sql, args).fetchall()
+        groups: dict[tuple, list] = {}
+        for row in rows:
+            groups.setdefault((row["cat"], row["pass"]), []).append(row)
+        report = []
+        for (cat, bake_pass), items in sorted(groups.items()):
+            walls = sorted(r["wall"] for r in items)
+            mems = [r["peak_mem"] for r in items if r["peak_mem"]]
+            report.append({
+                "cat": cat,
+                "pass": bake_pass,
+                "count": len(items),
+                "total": sum(walls),
+                "p50": statistics.median(walls),
+                "p95": walls[min(int(len(walls) * 0.95), len(walls) - 1)],
+                "rate": statistics.median(r["wall"] / cls.workload(r["width"], r["height"], r["samples"]) for r in items),
+                "peak_mem": max(mems, default=0),
+            })
+        return report
+
+    @classmethod
+    def format_report(cls, since=None) -> str:
+        lines = [f"{'Cat':<10}{'Pass':<20}{'Count':>7}{'Total(s)':>11}{'P50(s)':>9}{'P95(s)':>9}{'s/MP*spp':>10}{'Peak(M)':>10}"]
+        for r in cls.report(since):
+            lines.append(f"{r['cat']:<10}{r['pass']:<20}{r['count']:>7}{r['total']:>11.1f}{r['p50']:>9.2f}{r['p95']:>9.2f}{r['rate']:>10.3f}{r['peak_mem']:>10.0f}")
+        return "\n".join(lines)
@@ -0,0 +1,241 @@
+"""
+预设索引: 启动时从本地清单加载, 按 mtime/size 校验, 只重新解析变化的文件
+    UI 和 dump 的所有查询都从内存返回, 不在重绘时访问磁盘(预设目录可能位于网络共享上)
+    FSWatcher 监听预设目录, 变化后在监听线程中增量刷新, 再通知回调
+    每个预设的枚举序号记录在清单中, 新增/删除预设不会改变其他预设的序号(ENUM_FLAG 选择按位保存)
+"""
+from __future__ import annotations
+import os
+import json
+import hashlib
+from pathlib import Path
+from tempfile import gettempdir
+from threading import RLock
+from typing import Callable
+from ...utils.logger import logger
+from ...utils.watcher import FSWatcher
+
+MANIFEST_DIR = Path(gettempdir()).joinpath("BakeNode")
+MANIFEST_VERSION = 1
+# ENUM_FLAG 的值为 32 位整数
+MAX_IDS = 32
+
+
+class PresetIndex:
+    """
+    单个预设目录的索引
+        entries: {文件名(不含后缀): {"path", "mtime", "size", **parse结果}}
+        ids: {文件名: 序号}, 删除的预设保留序号, 重新添加时不变
+        以 "_" 开头的文件(如合并材质库)不计入索引
+    """
+
+    def __init__(self, kind: str, path: Path, suffix: str, parse: Callable[[Path], dict] = None):
+        self.kind = kind
+        self.path = Path(path)
+        self.suffix = suffix
+        self.parse = parse
+        self.entries: dict[str, dict] = {}
+        self.ids: dict[str, int] = {}
+        self.lock = RLock()
+        self.loaded = False
+
+    @property
+    def manifest(self) -> Path:
+        digest = hashlib.blake2b(self.path.as_posix().encode("utf-8"), digest_size=8).hexdigest()
+        return MANIFEST_DIR.joinpath(f"{self.kind}_{digest}.json")
+
+    def load_manifest(self):
+        self.loaded = True
+        try:
+            data = json.loads(self.manifest.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return
+        if data.get("version") != MANIFEST_VERSION or data.get("path") != self.path.as_posix():
+            return
+        self.entries = data.get("entries", {})
+        self.ids = data.get("ids", {})
+
+    def save_manifest(self):
+        data = {"version": MANIFEST_VERSION, "path": self.path.as_posix(), "entries": self.entries, "ids": self.ids}
+        try:
+            MANIFEST_DIR.mkdir(parents=True, exist_ok=True)
+            tmp = self.manifest.with_suffix(".tmp")
+            tmp.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+            tmp.replace(self.manifest)
+        except OSError as e:
+            logger.warning(f"Preset manifest save failed: {e}")
+
+    def scan(self) -> set[str]:
+        """
+        增量刷新, 返回新增/修改/删除的预设名
+        """
+        with self.lock:
+            if not self.loaded:
+                self.load_manifest()
+            found = {}
+            try:
+                # scandir 的 stat 在 Windows 上来自目录项, 不需要逐个文件请求
+                with os.scandir(self.path) as it:
+                    for entry in it:
+                        stem, suffix = os.path.splitext(entry.name)
+                        if suffix != self.suffix or stem.startswith("_") or not entry.is_file():
+                            continue
+                        st = entry.stat()
+                        found[stem] = (entry.path, st.st_mtime_ns, st.st_size)
+            except OSError as e:
+                logger.warning(f"Preset dir scan failed: {e}")
+                return set()
+            changed = set(self.entries) - set(found)
+            for stem in changed:
+                self.entries.pop(stem)
+            for stem, (path, mtime, size) in found.items():
+                old = self.entries.get(stem)
+                if old and old["mtime"] == mtime and old["size"] == size:
+                    continue
+                entry = {"path": Path(path).as_posix(), "mtime": mtime, "size": size}
+                if self.parse:
+                    try:
+                        entry.update(self.parse(Path(path)))
+                    except (OSError, ValueError) as e:
+                        logger.warning(f"Preset parse failed: {path} {e}")
+                        continue
+                self.entries[stem] = entry
+                changed.add(stem)
+            if self.assign_ids() or changed:
+                self.save_manifest()
+            return changed
+
+    def assign_ids(self) -> bool:
+        """
+        为没有序号的预设按名称顺序分配最小的空闲序号
+            序号用尽时回收已删除预设的序号
+        """
+        missing = sorted(set(self.entries) - set(self.ids))
+        if not missing:
+            return False
+        for stem in set(self.ids) - set(self.entries):
+            if len(self.ids) + len(missing) <= MAX_IDS:
+                break
+            self.ids.pop(stem)
+        used = set(self.ids.values())
+        free = (i for i in range(MAX_IDS) if i not in used)
+        for stem in missing:
+            i = next(free, None)
+            if i is None:
+                logger.warning(f"Too many presets, skip: {stem}")
+                continue
+            self.ids[stem] = i
+        return True
+
+    def id(self, name) -> int:
+        with self.lock:
+            return self.ids.get(name, -1)
+
+    def get(self, name) -> dict:
+        with self.lock:
+            return self.entries.get(name, {})
+
+    def names(self) -> list[str]:
+        with self.lock:
+            return sorted(self.entries)
+
+
+def parse_bake_preset(path: Path) -> dict:
+    config = json.loads(path.read_text(encoding="utf-8"))
+    return {"config": config}
+
+
+class PresetRegistry:
+    """
+    advanced: 自定义烘焙类型(json)
+    tree: 烘焙树预设(blend)
+    """
+    indexes: dict[str, PresetIndex] = {}
+    listeners: dict[str, list[Callable[[set[str]], None]]] = {}
+    # 枚举项需要保持引用, 否则 blender 可能显示乱码
+    _items: dict[str, list] = {}
+
+    @classmethod
+    def add(cls, kind: str, path: Path, suffix: str, parse: Callable[[Path], dict] = None) -> PresetIndex:
+        if kind not in cls.indexes:
+            Path(path).mkdir(parents=True, exist_ok=True)
+            cls.indexes[kind] = PresetIndex(kind, path, suffix, parse)
+            cls.refresh(kind, notify=False)
+            FSWatcher.register(path, cls._on_dir_changed)
+        return cls.indexes[kind]
+
+    @classmethod
+    def add_listener(cls, kind: str, callback: Callable[[set[str]], None]):
+        cls.listeners.setdefault(kind, []).append(callback)
+
+    @classmethod
+    def refresh(cls, kind: str, notify=True) -> set[str]:
+        index = cls.indexes.get(kind)
+        if not index:
+            return set()
+        changed = index.scan()
+        if changed:
+            cls._items.pop(kind, None)
+        if changed and notify:
+            for callback in cls.listeners.get(kind, []):
+                callback(changed)
+        return changed
+
+    @classmethod
+    def get(cls, kind: str, name: str) -> dict:
+        index = cls.indexes.get(kind)
+        return index.get(name) if index else {}
+
+    @classmethod
+    def config(cls, name: str) -> dict:
+        return cls.get("advanced", name).get("config", {})
+
+    @classmethod
+    def configs(cls) -> dict[str, dict]:
+        index = cls.indexes.get("advanced")
+        if not index:
+            return {}
+        return {name: index.get(name).get("config", {}) for name in index.names()}
+
+    @classmethod
+    def items(cls, kind: str, make_item: Callable[[int, str, dict], tuple]) -> list:
+        """
+        缓存的枚举项, 只在索引变化后重建
+            make_item 的序号来自清单, 不随排序位置变化
+        """
+        if kind in cls._items:
+            return cls._items[kind]
+        index = cls.indexes.get(kind)
+        items = []
+        if index:
+            for name in index.names():
+                i = index.id(name)
+                if i < 0:
+                    continue
+                items.append(make_item(i, name, index.get(name)))
+        cls._items[kind] = items
+        return items
+
+    @classmethod
+    def unwatch(cls):
+        for index in cls.indexes.values():
+            FSWatcher.unregister(index.path)
+
+    @classmethod
+    def _on_dir_changed(cls, path: Path, changes: set[Path]):
+        # 监听线程中调用
+        FSWatcher.consume_change(path)
+        for kind, index in list(cls.indexes.items()):
+            if index.path != path:
+                continue
+            # 只关心该目录下对应后缀的文件(事件溢出时 changes 包含目录本身)
+            if not any(p == path or (p.parent == path and p.suffix == index.suffix) for p in changes):
+                continue
+            cls.refresh(kind)
+
+    @classmethod
+    def clear(cls):
+        cls.unwatch()
+        cls.indexes.clear()
+        cls.listeners.clear()
+        cls._items.clear()
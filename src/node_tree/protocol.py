@@ -0,0 +1,100 @@
+"""
+后台烘焙进程与父进程之间的文本协议
+    父进程 -> 子进程(stdin, 每行一条): "JOB <repr(config)>" | "OPEN <blend路径>" | "QUIT"
+    子进程 -> 父进程(stdout): 普通日志行, 以及下列带标记的行
+注意: 该模块会被后台 blender 进程直接导入, 不能使用相对导入, 也不能依赖 bpy
+"""
+from __future__ import annotations
+import os
+import re
+import json
+import time
+
+JOB_DONE = "[JOB_DONE]"
+RUN_PARAMS = "[RUN_PARAMS]"
+TRACE = "[TRACE]"
+ERROR = "[ERROR]"
+
+SKIP_PREFIX = ("Read blend: ", "Info: ", "Blender quit",)
+RE_RUN_PARAMS = re.compile(r"\[RUN_PARAMS\]: (\{.*?\})", re.S)
+RE_VERSION = re.compile(r"Blender (\d+\.\d+\.\d+)")
+RE_PROGRESS = re.compile(r"Fra:(\d+) Mem:(\d+\.\d+)M \(Peak (\d+\.\d+)M\) \| Time:(\d+:.*?) \| Mem:(\d+\.\d+)M, Peak:(\d+\.\d+)M (.*)", re.S)
+
+
+def now_us() -> int:
+    return time.time_ns() // 1000
+
+
+def trace_line(name: str, start: int, end: int, cat="worker", **args) -> str:
+    """
+    Chrome Trace 完整事件(ph="X"), 时间单位为微秒
+    """
+    event = {"name": name, "cat": cat, "ph": "X", "ts": start, "dur": max(end - start, 0), "pid": os.getpid(), "tid": 0, "args": args}
+    return f"\n{TRACE}: {json.dumps(event)}\n"
+
+
+def worker_args(blender: str, blend_path: str, script: str, extra_args: list[str] = ()) -> list[str]:
+    """
+    常驻后台进程的启动参数, 本机 BakeWorker 与远程 agent 共用
+        extra_args 如 ["-t", "4"] 限制线程数, 需在 -P 之前
+    """
+    args = [blender]
+    if blend_path:
+        args.append(blend_path)
+    args.append("-b")
+    args.extend(extra_args)
+    args += ["-P", script, "--factory-startup", "--", "-bnc", repr({"serve": True, "spawn_ts": now_us()})]
+    return args
+
+
+def command(cmd: str, payload="") -> bytes:
+    return f"{cmd} {payload}\n".encode("utf-8")
+
+
+def parse_command(line: str) -> tuple[str, str]:
+    cmd, _, payload = line.strip().partition(" ")
+    return cmd, payload
+
+
+def parse_line(line: str) -> tuple[str, object]:
+    """
+    返回 (类型, 数据):
+        ("", None)                  忽略
+        ("job_done", None)          当前任务结束
+        ("run_params", dict)        运行时数据 "[RUN_PARAMS]: {"elementsCount": 3}"
+        ("trace", dict)             追踪事件 "[TRACE]: {...}"
+        ("progress", dict)          Cycles 进度行
+        ("job_error", str)          run.py 报告的错误 "[ERROR]: ...", 当前任务失败
+        ("log", str)                其他输出
+    """
+    line = line.strip()
+    if not line:
+        return "", None
+    if line == JOB_DONE:
+        return "job_done", None
+    if line.startswith(SKIP_PREFIX):
+        return "", None
+    if line.startswith(ERROR):
+        return "job_error", line[len(ERROR):].lstrip(": ")
+    if line.startswith(TRACE):
+        try:
+            return "trace", json.loads(line[len(TRACE) + 1:])
+        except ValueError:
+            return "", None
+    if line.startswith(RUN_PARAMS):
+        match = RE_RUN_PARAMS.match(line)
+        if match:
+            return "run_params", json.loads(match.group(1))
+    if RE_VERSION.match(line):
+        return "", None
+    if line.startswith("Fra:"):
+        match = RE_PROGRESS.match(line.replace("| Scene ", ""))
+        if match:
+            return "progress", {
+                "frame": int(match.group(1)),
+                "mem": float(match.group(2)),
+                "peak": float(match.group(3)),
+                "time": match.group(4),
+                "info": match.group(7),
+            }
+    return "log", line
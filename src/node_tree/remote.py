@@ -0,0 +1,268 @@
+"""
+分布式烘焙: 协调端(Bake 节点)把烘焙任务分发给各机器上的 agent(agent.py), agent 用本机 blender 执行 run.py
+    消息格式: 头长度(uint32) | JSON头 | 二进制负载, 头中记录负载的 size 和 blake2b 校验值
+    场景文件按内容哈希缓存在 agent 上, 同一次烘焙只传输一次; 结果以 sparse 共享内存布局原样回传
+    每个连接先发送 AUTH 消息携带共享令牌, 验证失败时 agent 关闭连接
+    任务执行期间 agent 定期发送 PING, 连接的读取超时大于心跳间隔, agent 机器失联时不会永远等待
+注意: 该模块会被 agent 进程直接导入, 不能使用相对导入, 也不能依赖 bpy
+"""
+from __future__ import annotations
+import json
+import socket
+import struct
+import hashlib
+import threading
+from pathlib import Path
+from queue import Queue, Empty
+from collections.abc import Iterator
+
+DEFAULT_PORT = 7788
+# agent 在任务执行期间发送 PING 的间隔(秒), 应小于 AgentClient 的读取超时
+HEARTBEAT = 10.0
+HEAD = struct.Struct("!I")
+MAX_HEADER = 16 * 2 ** 20
+CHUNK = 4 * 2 ** 20
+
+
+class ChecksumError(ValueError):
+    ...
+
+
+class AgentError(RuntimeError):
+    ...
+
+
+def digest(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def file_digest(path: Path | str) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        while chunk := f.read(CHUNK):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def recv_exact(sock: socket.socket, size: int) -> bytes:
+    buf = bytearray(size)
+    view = memoryview(buf)
+    got = 0
+    while got < size:
+        n = sock.recv_into(view[got:], min(size - got, CHUNK))
+        if not n:
+            raise ConnectionError("Connection closed")
+        got += n
+    return bytes(buf)
+
+
+def send_msg(sock: socket.socket, header: dict, payload: bytes = b""):
+    header = dict(header, size=len(payload), checksum=digest(payload) if payload else "")
+    data = json.dumps(header).encode("utf-8")
+    sock.sendall(HEAD.pack(len(data)) + data)
+    if payload:
+        sock.sendall(payload)
+
+
+def recv_msg(sock: socket.socket) -> tuple[dict, bytes]:
+    size, = HEAD.unpack(recv_exact(sock, HEAD.size))
+    if size > MAX_HEADER:
+        raise ConnectionError(f"Header too large: {size}")
+    header = json.loads(recv_exact(sock, size).decode("utf-8"))
+    payload = recv_exact(sock, header.get("size", 0)) if header.get("size") else b""
+    if payload and digest(payload) != header.get("checksum"):
+        raise ChecksumError(f"Checksum mismatch: {header.get('cmd')}")
+    return header, payload
+
+
+def parse_agents(text: str) -> list[tuple[str, int]]:
+    """
+    "host:port, host" -> [(host, port), ...]
+    """
+    agents = []
+    for item in text.replace(";", ",").split(","):
+        item = item.strip()
+        if not item:
+            continue
+        host, _, port = item.rpartition(":") if ":" in item else (item, "", "")
+        agents.append((host, int(port) if port else DEFAULT_PORT))
+    return agents
+
+
+class AgentClient:
+    def __init__(self, host: str, port: int, timeout=30.0, token=""):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.token = token
+        self.sock: socket.socket = None
+
+    @property
+    def name(self) -> str:
+        return f"{self.host}:{self.port}"
+
+    def connect(self):
+        if self.sock is None:
+            self.sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+            send_msg(self.sock, {"cmd": "AUTH", "token": self.token})
+            reply, _ = recv_msg(self.sock)
+            if reply.get("cmd") != "OK":
+                self.sock.close()
+                self.sock = None
+                raise AgentError(reply.get("error", "Authentication failed"))
+
+    def close(self):
+        if self.sock is None:
+            return
+        try:
+            send_msg(self.sock, {"cmd": "BYE"})
+        except OSError:
+            ...
+        self.sock.close()
+        self.sock = None
+
+    def request(self, header: dict, payload: bytes = b"") -> tuple[dict, bytes]:
+        self.connect()
+        send_msg(self.sock, header, payload)
+        reply, data = recv_msg(self.sock)
+        if reply.get("cmd") == "ERROR":
+            raise AgentError(reply.get("error", ""))
+        return reply, data
+
+    def ensure_blend(self, blend_path: Path, blend_digest: str):
+        reply, _ = self.request({"cmd": "HAS", "blend": blend_digest})
+        if reply.get("ok"):
+            return
+        self.request({"cmd": "BLEND", "blend": blend_digest}, Path(blend_path).read_bytes())
+
+    def run_job(self, blend_digest: str, config: str, size: int, timeout=0.0, stall=0.0) -> Iterator[tuple[str, object]]:
+        """
+        config: repr 后的任务配置, timeout/stall: 由 agent 执行的任务超时/无输出超时, 0 为不限制
+        逐条返回后台进程输出 (kind, payload), 最后一条为 ("result", 稀疏结果字节)
+        """
+        self.connect()
+        send_msg(self.sock, {"cmd": "JOB", "blend": blend_digest, "config": config, "shm_size": size, "timeout": timeout, "stall": stall})
+        while True:
+            header, payload = recv_msg(self.sock)
+            cmd = header.get("cmd")
+            if cmd == "PING":
+                continue
+            if cmd == "LINE":
+                yield header["kind"], header.get("payload")
+            elif cmd == "RESULT":
+                yield "result", payload
+                return
+            elif cmd == "ERROR":
+                raise AgentError(header.get("error", ""))
+
+
+class Coordinator:
+    """
+    每个 agent 一个线程从共享队列中取任务, 失败(连接断开/校验错误/无结果)的任务重新入队, 由任意 agent 重试
+        run() 在调用线程中按完成顺序返回事件, 以便在同一线程中读取结果和访问 bpy 数据
+    """
+
+    def __init__(self, agents: list[tuple[str, int]], retries=2, timeout=30.0, backoff=2.0, token="", job_timeout=0.0, stall=0.0):
+        self.agents = agents
+        self.token = token
+        # 转发给 agent 的任务超时/无输出超时
+        self.job_timeout = job_timeout
+        self.stall = stall
+        self.retries = retries
+        # 失败的 agent 等待 backoff * 2^n 秒后再取任务, 任务本身立即由其他 agent 重试
+        self.backoff = backoff
+        self.timeout = timeout
+        self.events: Queue = Queue()
+        self.jobs: Queue = Queue()
+        self.alive = 0
+        self.lock = threading.Lock()
+        self.stop = threading.Event()
+
+    def run(self, blend_path: Path | str, jobs: list[tuple[str, int]]) -> Iterator[tuple[int, str, object]]:
+        """
+        jobs: [(repr后的任务配置, 共享内存大小)]
+        返回 (任务序号, kind, payload), kind 额外包括:
+            ("start", agent名) 开始执行, ("result", bytes) 成功, ("retry", 错误) 将重试, ("failed", 错误) 放弃
+        """
+        blend_digest = file_digest(blend_path)
+        for i in range(len(jobs)):
+            self.jobs.put((i, 0))
+        self.alive = len(self.agents)
+        threads = [threading.Thread(target=self.agent_loop, args=(host, port, blend_path, blend_digest, jobs), daemon=True)
+                   for host, port in self.agents]
+        for t in threads:
+            t.start()
+        done = set()
+        try:
+            while len(done) < len(jobs):
+                try:
+                    event = self.events.get(timeout=0.5)
+                except Empty:
+                    with self.lock:
+                        if self.alive:
+                            continue
+                    # 所有 agent 都已断开, 剩余任务失败
+                    for index in range(len(jobs)):
+                        if index not in done:
+                            yield index, "failed", "No agent available"
+                    return
+                if event[1] in {"result", "failed"}:
+                    done.add(event[0])
+                yield event
+        finally:
+            self.stop.set()
+
+    def agent_loop(self, host: str, port: int, blend_path, blend_digest: str, jobs: list[tuple[str, int]]):
+        client = AgentClient(host, port, self.timeout, self.token)
+        try:
+            client.ensure_blend(blend_path, blend_digest)
+        except (OSError, ValueError, AgentError) as e:
+            self.events.put((-1, "log", f"Agent {client.name} unavailable: {e}"))
+            client.close()
+            with self.lock:
+                self.alive -= 1
+            return
+        while not self.stop.is_set():
+            try:
+                index, attempt = self.jobs.get(timeout=0.2)
+            except Empty:
+                # 其他 agent 上的任务可能失败后重新入队, 全部完成前不退出
+                continue
+            config, size = jobs[index]
+            self.events.put((index, "start", client.name))
+            try:
+                result, job_error = b"", ""
+                for kind, payload in client.run_job(blend_digest, config, size, self.job_timeout, self.stall):
+                    if kind == "result":
+                        result = payload
+                    elif kind == "job_error":
+                        job_error = "\n".join(filter(None, (job_error, payload)))
+                    else:
+                        self.events.put((index, kind, payload))
+                if job_error:
+                    # 脚本错误在其他 agent 上重试也不会成功
+                    self.events.put((index, "failed", f"{client.name}: {job_error}"))
+                    continue
+                if not result:
+                    raise AgentError("No result")
+                self.events.put((index, "result", result))
+                continue
+            except (OSError, ValueError, AgentError) as e:
+                error = f"{client.name}: {e}"
+                # 校验错误只出现在结果消息上, 消息边界仍然完整, 连接可继续使用
+                lost = not isinstance(e, (AgentError, ChecksumError))
+            if attempt < self.retries:
+                self.events.put((index, "retry", error))
+                self.jobs.put((index, attempt + 1))
+            else:
+                self.events.put((index, "failed", error))
+            if lost:
+                # 连接已损坏, 该 agent 退出
+                client.close()
+                with self.lock:
+                    self.alive -= 1
+                return
+            self.stop.wait(min(self.backoff * 2 ** attempt, 60))
+        client.close()
+        with self.lock:
+            self.alive -= 1
@@ -1,4 +1,5 @@
 import bpy
+import os
 import sys
 import argparse
 import numpy as np
@@ -8,11 +9,196 @@ import json
 from mathutils import Vector
 from multiprocessing import shared_memory, resource_tracker
 from ast import literal_eval as eval
+from contextlib import contextmanager
 from pathlib import Path
 sys.path.append(Path(__file__).parent.as_posix())
-from common import TreeCtx
+from common import TreeCtx, image_spec
+from protocol import JOB_DONE, parse_command, trace_line, now_us
+from sampling import SamplesPolicy, DEFAULT_THRESHOLD, get_policy, fixed_samples, noise_estimate
+from denoise import uv_islands, dilate_labels, denoise
+import coverage
+import sparse
 
 ONE = Vector((1, 1, 1))
+PRESET_PATH = Path(__file__).parent.joinpath("advanced")
+
+# 打包通道 -> Principled BSDF 输入
+PACK_INPUTS = {
+    "Roughness": "Roughness",
+    "Metallic": "Metallic",
+    "IOR": "IOR",
+    "Alpha": "Alpha",
+}
+
+
+class JobTrace:
+    # 当前任务开始时间(微秒)
+    start = 0
+
+
+def emit_trace(name, start, **args):
+    sys.stdout.write(trace_line(name, start, now_us(), **args))
+    sys.stdout.flush()
+
+
+@contextmanager
+def span(name, **args):
+    start = now_us()
+    try:
+        yield
+    finally:
+        emit_trace(name, start, **args)
+
+
+def run_bake(**kwargs):
+    # 任务开始到烘焙前均视为材质/场景准备
+    emit_trace("Material Prep", JobTrace.start)
+    with span("Cycles Bake", type=kwargs.get("type", "")):
+        bpy.ops.object.bake(**kwargs)
+
+
+def apply_sampling(sce: bpy.types.Scene, bake_settings: dict, bake_pass: str, channels=()) -> SamplesPolicy | None:
+    """
+    按烘焙设置和通道的采样策略设置采样, 返回收敛模式使用的策略, 固定采样时返回 None
+    """
+    sce.render.bake_samples = bake_settings.get("bake_samples", 1)
+    sce.cycles.use_adaptive_sampling = bake_settings.get("use_adaptive_sampling", True)
+    sce.cycles.adaptive_threshold = bake_settings.get("adaptive_threshold", 0.0)
+    policy = get_policy(bake_pass, channels)
+    if bake_settings.get("converge") and policy.batch:
+        sce.cycles.samples = policy.batch
+        return policy
+    # 降噪的通道使用设置的采样数, 不再提高到最少采样数
+    sce.cycles.samples = fixed_samples(policy, bake_settings.get("samples", 1), use_denoise(bake_settings, bake_pass, channels))
+    return None
+
+
+def bake_image(img: bpy.types.Image, policy: SamplesPolicy | None, bake_settings: dict, **kwargs):
+    """
+    policy 为 None 时直接烘焙; 否则每批换一个随机种子烘焙, 奇偶批分别累加,
+    两者的差异(噪声估计)低于阈值或达到采样上限后停止, 写回所有批次的平均值
+    """
+    if policy is None:
+        run_bake(**kwargs)
+        return
+    sce = bpy.context.scene
+    threshold = bake_settings.get("adaptive_threshold", 0.0) or DEFAULT_THRESHOLD
+    max_samples = bake_settings.get("max_samples", 0) or policy.max
+    w, h = img.size
+    pixels = np.empty((h, w, 4), dtype=np.float32)
+    halves = [np.zeros_like(pixels), np.zeros_like(pixels)]
+    counts = [0, 0]
+    old_seed = sce.cycles.seed
+    start = now_us()
+    total, noise = 0, None
+    try:
+        while total < max_samples:
+            batch = counts[0] + counts[1]
+            sce.cycles.seed = old_seed + batch
+            run_bake(**kwargs)
+            img.pixels.foreach_get(pixels.ravel())
+            halves[batch % 2] += pixels
+            counts[batch % 2] += 1
+            total += sce.cycles.samples
+            if counts[0] != counts[1]:
+                continue
+            noise = noise_estimate(halves[0] / counts[0], halves[1] / counts[1])
+            if noise < threshold:
+                break
+    finally:
+        sce.cycles.seed = old_seed
+    pixels = (halves[0] + halves[1]) / (counts[0] + counts[1])
+    img.pixels.foreach_set(pixels.ravel())
+    img.update()
+    emit_trace("Converge", start, type=kwargs.get("type", ""), samples=total, noise=noise, threshold=threshold)
+
+
+def use_denoise(bake_settings: dict, bake_pass: str, channels=()) -> bool:
+    settings = bake_settings.get("denoise")
+    return bool(settings) and bool({bake_pass, *channels} & set(settings.get("passes", ())))
+
+
+def island_labels(obj: bpy.types.Object, res, margin: int) -> np.ndarray:
+    """
+    按激活UV层光栅化(含修改器的)网格的UV孤岛编号图, 烘焙边距归属于相邻孤岛
+    """
+    uv_name = obj.data.uv_layers.active.name if obj.data.uv_layers.active else ""
+    eval_obj = obj.evaluated_get(bpy.context.evaluated_depsgraph_get())
+    mesh = eval_obj.to_mesh()
+    try:
+        mesh.calc_loop_triangles()
+        tnum = len(mesh.loop_triangles)
+        tri_verts = np.empty(tnum * 3, dtype=np.int32)
+        mesh.loop_triangles.foreach_get("vertices", tri_verts)
+        tri_loops = np.empty(tnum * 3, dtype=np.int32)
+        mesh.loop_triangles.foreach_get("loops", tri_loops)
+        uvs = np.zeros((len(mesh.loops), 2), dtype=np.float32)
+        if uv_layer := mesh.uv_layers.get(uv_name):
+            uv_layer.data.foreach_get("uv", uvs.ravel())
+    finally:
+        eval_obj.to_mesh_clear()
+    tri_uvs = uvs[tri_loops].reshape(-1, 3, 2)
+    labels = coverage.rasterize(tri_uvs, *res, labels=uv_islands(tri_verts.reshape(-1, 3), tri_uvs))
+    return dilate_labels(labels, margin)
+
+
+def oidn_denoise(img: bpy.types.Image) -> np.ndarray | None:
+    """
+    在临时场景中用合成器降噪节点(OpenImageDenoise, CPU)处理图片, 合成树中没有渲染层节点, 不会渲染场景
+        图片临时视为非颜色数据, 避免合成器做色彩空间转换
+    失败(如不支持的版本)时返回 None, 由调用方使用孤岛内滤波
+    """
+    w, h = img.size
+    sce = bpy.data.scenes.new("EBN_Denoise")
+    is_data = img.colorspace_settings.is_data
+    try:
+        img.colorspace_settings.is_data = True
+        sce.render.resolution_x, sce.render.resolution_y = w, h
+        sce.render.resolution_percentage = 100
+        sce.use_nodes = True
+        nt = sce.node_tree
+        nt.nodes.clear()
+        src = nt.nodes.new("CompositorNodeImage")
+        src.image = img
+        dn = nt.nodes.new("CompositorNodeDenoise")
+        dn.use_hdr = True
+        viewer = nt.nodes.new("CompositorNodeViewer")
+        comp = nt.nodes.new("CompositorNodeComposite")
+        nt.links.new(src.outputs["Image"], dn.inputs["Image"])
+        nt.links.new(dn.outputs["Image"], viewer.inputs["Image"])
+        nt.links.new(dn.outputs["Image"], comp.inputs["Image"])
+        bpy.ops.render.render(scene=sce.name)
+        result = bpy.data.images.get("Viewer Node")
+        if not result or tuple(result.size) != (w, h):
+            raise RuntimeError("Denoise result not found")
+        pixels = np.empty((h, w, 4), dtype=np.float32)
+        result.pixels.foreach_get(pixels.ravel())
+        return pixels
+    except Exception as e:
+        sys.stdout.write(f"OIDN denoise failed, fallback to filter: {e}\n")
+        return None
+    finally:
+        img.colorspace_settings.is_data = is_data
+        bpy.data.scenes.remove(sce)
+
+
+def denoise_image(img: bpy.types.Image, obj: bpy.types.Object, bake_settings: dict, bake_pass: str, channels=()):
+    """
+    对设置中选择的通道做UV孤岛内降噪, 在写入共享内存前执行
+    """
+    if not use_denoise(bake_settings, bake_pass, channels):
+        return
+    settings = bake_settings["denoise"]
+    start = now_us()
+    w, h = img.size
+    pixels = np.empty((h, w, 4), dtype=np.float32)
+    img.pixels.foreach_get(pixels.ravel())
+    labels = island_labels(obj, (w, h), bpy.context.scene.render.bake.margin)
+    denoised = oidn_denoise(img) if settings.get("method") == "OIDN" else None
+    pixels = denoise(pixels, labels, settings.get("strength", 1.0), denoised)
+    img.pixels.foreach_set(pixels.ravel())
+    img.update()
+    emit_trace("Denoise", start, method="OIDN" if denoised is not None else "FILTER", islands=int(labels.max()))
 
 
 def find_from_node(socket: bpy.types.NodeSocket) -> bpy.types.Node:
@@ -36,9 +222,14 @@ def write_to_shm(sm_name, img: bpy.types.Image):
     if not sm_name:
         return
     try:
+        start = now_us()
         sm = shared_memory.SharedMemory(name=sm_name, create=False)
-        pixels = np.ndarray((*img.size, img.channels), dtype=np.float32, buffer=sm.buf)
+        w, h = img.size
+        pixels = np.empty((h, w, img.channels), dtype=np.float32)
         img.pixels.foreach_get(pixels.ravel())
+        # 只传输有数据的tile
+        tiles = sparse.write(sm.buf, pixels)
+        emit_trace("SHM Write", start, tiles=tiles)
         if platform.system() != "Windows":
             resource_tracker.unregister(sm._name, "shared_memory")
         sm.close()
@@ -47,11 +238,21 @@ def write_to_shm(sm_name, img: bpy.types.Image):
         sys.stdout.flush()
 
 
-def create_img_node(name, res, mat: bpy.types.Material):
+def get_resolution(config) -> tuple[int, int]:
+    # 任务级分辨率(自动分辨率)优先于烘焙设置
+    if res := config.get("resolution"):
+        return tuple(res)
+    return tuple(config.get("ctx", {}).get("BakeSettings", {}).get("resolution", (512, 512)))
+
+
+def create_img_node(name, res, mat: bpy.types.Material, cat, bake_pass):
+    float_buffer, colorspace = image_spec(cat, bake_pass)
     img: bpy.types.Image = bpy.data.images.new(name=name,
                                                width=res[0],
                                                height=res[1],
-                                               alpha=True)
+                                               alpha=True,
+                                               float_buffer=float_buffer)
+    img.colorspace_settings.name = colorspace
     img_node = mat.node_tree.nodes.new("ShaderNodeTexImage")
     img_node.image = img
     img_node.select = True
@@ -105,13 +306,32 @@ def prepare_pbr_mat(nt, lhs_node, rhs_inp, bake_pass):
         nt.links.new(mix_rgb.outputs[0], rhs_inp)
 
 
+def prepare_packed_mat(nt, from_node, rhs_inp, channels):
+    """
+    channels: [R, G, B] 通道名, 经 Combine 节点合并后写入rhs_inp
+    """
+    if bpy.app.version >= (3, 3, 0):
+        combine = nt.nodes.new("ShaderNodeCombineColor")
+    else:
+        combine = nt.nodes.new("ShaderNodeCombineRGB")
+    for i, channel in enumerate(channels):
+        inp = combine.inputs[i]
+        if channel == "AO":
+            ao = nt.nodes.new("ShaderNodeAmbientOcclusion")
+            nt.links.new(ao.outputs["AO"], inp)
+        elif channel in PACK_INPUTS:
+            prepare_pbr_mat(nt, from_node, inp, PACK_INPUTS[channel])
+        else:
+            inp.default_value = 0
+    nt.links.new(combine.outputs[0], rhs_inp)
+    return combine
+
+
 def bake_pbr(config, mesh_pair, cat, bake_pass):
     ctx = config.get("ctx", {})
     bake_settings = ctx.get("BakeSettings", {})
 
     sce = bpy.context.scene
-    sce.render.bake_samples = bake_settings.get("bake_samples", 1)
-    sce.cycles.samples = bake_settings.get("samples", 1)
     init_scene(sce)
     dst, src, _uv = mesh_pair
     bpy.ops.object.select_all(action="DESELECT")
@@ -127,12 +347,15 @@ def bake_pbr(config, mesh_pair, cat, bake_pass):
     act_mtl: bpy.types.Material = dst_obj.active_material
     if not act_mtl:
         return
+    # 在副本上修改节点, 任务结束后由 job_scope 还原
+    act_mtl = act_mtl.copy()
+    dst_obj.active_material = act_mtl
 
     src_obj: bpy.types.Object = bpy.data.objects.get(src)
     if src_obj:
         src_obj.select_set(True)
 
-    res = bake_settings.get("resolution", (512, 512))
+    res = get_resolution(config)
     output = act_mtl.node_tree.get_output_node("ALL")
     if not output:
         sys.stdout.write("[ERROR]: No output node found")
@@ -159,48 +382,195 @@ def bake_pbr(config, mesh_pair, cat, bake_pass):
         ...
     elif bake_pass == "AO":
         final_bake_pass = "AO"
-        sce.cycles.samples = max(sce.cycles.samples, 32)
     elif bake_pass == "IOR":
         prepare_pbr_mat(nt, from_node, emit.inputs["Strength"], "IOR")
+    elif bake_pass in ctx.get("PBRPack", {}):
+        channels = ctx["PBRPack"][bake_pass].get("channels", [])
+        prepare_packed_mat(nt, from_node, emit.inputs["Color"], channels)
 
-    res = bake_settings.get("resolution", (512, 512))
-    img_node = create_img_node(f"{dst}_{cat}_{bake_pass}", res, act_mtl)
+    res = get_resolution(config)
+    img_node = create_img_node(f"{dst}_{cat}_{bake_pass}", res, act_mtl, cat, bake_pass)
     act_mtl.node_tree.nodes.active = img_node
     img_node.location = output.location
     img_node.location.y -= output.height
     emit.location = output.location
     emit.location.y += output.height
-    bpy.ops.object.bake(type=final_bake_pass, save_mode="INTERNAL")
+    # 打包通道按其中最需要采样的子通道(如 AO)设置
+    channels = ctx.get("PBRPack", {}).get(bake_pass, {}).get("channels", ())
+    policy = apply_sampling(sce, bake_settings, bake_pass, channels)
+    bake_image(img_node.image, policy, bake_settings, type=final_bake_pass, save_mode="INTERNAL")
+    denoise_image(img_node.image, dst_obj, bake_settings, bake_pass, channels)
     sys.stdout.flush()
     write_to_shm(config.get("shm_name", ""), img_node.image)
     # bpy.ops.wm.save_as_mainfile(filepath="/Users/karrycharon/Desktop/Blend Project/Bake-Node-Test-Export.blend", copy=True)
 
 
+class PresetCache:
+    """
+    进程内的预设缓存: 配置/脚本只解析编译一次, 材质(及其依赖的节点组)只从库中加载一次, 每个任务使用其副本
+        存在合并库 advanced/_library.blend 时, 一次打开即可加载所有预设材质(材质名见 _library.json)
+    """
+    LIBRARY = PRESET_PATH.joinpath("_library.blend")
+    configs: dict[str, dict] = {}
+    scripts: dict[str, object] = {}
+    materials: dict[str, bpy.types.Material] = {}
+    library_loaded = False
+
+    @classmethod
+    def reset(cls):
+        # 打开新的blend文件后材质失效, 配置与脚本仍然有效
+        cls.materials.clear()
+        cls.library_loaded = False
+
+    @classmethod
+    def config(cls, name) -> dict:
+        if name not in cls.configs:
+            cpath = PRESET_PATH.joinpath(name).with_suffix(".json")
+            if not cpath.exists():
+                return {}
+            cls.configs[name] = json.loads(cpath.read_text(encoding="utf-8"))
+        return cls.configs[name]
+
+    @classmethod
+    def script(cls, script_name):
+        if not script_name:
+            return None
+        if script_name not in cls.scripts:
+            run_py = PRESET_PATH.joinpath(script_name)
+            code = None
+            if run_py.exists():
+                code = compile(run_py.read_text(encoding="utf-8"), run_py.as_posix(), "exec")
+            cls.scripts[script_name] = code
+        return cls.scripts[script_name]
+
+    @classmethod
+    def is_valid(cls, mtl) -> bool:
+        try:
+            return mtl is not None and bool(mtl.name)
+        except ReferenceError:
+            return False
+
+    @classmethod
+    def load_library(cls):
+        if cls.library_loaded:
+            return
+        cls.library_loaded = True
+        if not cls.LIBRARY.exists():
+            return
+        lib_mtime = cls.LIBRARY.stat().st_mtime
+        # 预设名 -> 库中材质名, 旧版本生成的库没有该文件, 材质按预设名命名
+        try:
+            mtl_names = json.loads(cls.LIBRARY.with_suffix(".json").read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            mtl_names = None
+        names = []
+        with bpy.data.libraries.load(cls.LIBRARY.as_posix()) as (df, dt):
+            if mtl_names is None:
+                mtl_names = {name: name for name in df.materials}
+            for name, mtl_name in mtl_names.items():
+                blend = PRESET_PATH.joinpath(f"{name}.blend")
+                # 预设在合并库生成后被修改过, 则从预设自身的blend加载
+                if mtl_name not in df.materials or (blend.exists() and blend.stat().st_mtime > lib_mtime):
+                    continue
+                names.append(name)
+            dt.materials = [mtl_names[name] for name in names]
+        for name, mtl in zip(names, dt.materials):
+            if mtl:
+                cls.materials[name] = mtl
+
+    @classmethod
+    def material(cls, name) -> bpy.types.Material:
+        if cls.is_valid(cls.materials.get(name)):
+            return cls.materials[name]
+        cls.load_library()
+        if cls.is_valid(cls.materials.get(name)):
+            return cls.materials[name]
+        jconfig = cls.config(name)
+        preset_name = jconfig.get("Name", name)
+        mtl_name = jconfig.get("Material", preset_name)
+        blend = PRESET_PATH.joinpath(f"{preset_name}.blend")
+        if not blend.exists():
+            return None
+        with bpy.data.libraries.load(blend.as_posix()) as (df, dt):
+            if df.materials:
+                if mtl_name not in df.materials:
+                    mtl_name = df.materials[0]
+                dt.materials = [mtl_name]
+        if not dt.materials or not dt.materials[0]:
+            return None
+        cls.materials[name] = dt.materials[0]
+        return cls.materials[name]
+
+    @classmethod
+    def clone(cls, name) -> bpy.types.Material:
+        mtl = cls.material(name)
+        if not mtl:
+            return None
+        return mtl.copy()
+
+    @classmethod
+    def cached(cls) -> set:
+        return {m for m in cls.materials.values() if cls.is_valid(m)}
+
+
+@contextmanager
+def job_scope(mesh_pair):
+    """
+    任务结束后还原物体材质/UV/选择状态, 清理任务中新建的图像和材质, 使同一进程可以连续执行多个任务
+    """
+    view_layer = bpy.context.view_layer
+    selected = [obj.name for obj in view_layer.objects if obj.select_get()]
+    active = view_layer.objects.active.name if view_layer.objects.active else ""
+    normal_space = bpy.context.scene.render.bake.normal_space
+    dst_obj: bpy.types.Object = bpy.data.objects.get(mesh_pair[0])
+    mesh_mtls, slot_mtls, uv_index, attributes = [], [], 0, set()
+    if dst_obj:
+        mesh_mtls = list(dst_obj.data.materials)
+        slot_mtls = [(slot.link, slot.material) for slot in dst_obj.material_slots]
+        uv_index = dst_obj.data.uv_layers.active_index
+        attributes = {attr.name for attr in dst_obj.data.attributes}
+    images = set(bpy.data.images)
+    materials = set(bpy.data.materials)
+    try:
+        yield
+    finally:
+        if dst_obj:
+            for i, mtl in enumerate(mesh_mtls):
+                dst_obj.data.materials[i] = mtl
+            for slot, (link, mtl) in zip(dst_obj.material_slots, slot_mtls):
+                if link == "OBJECT":
+                    slot.material = mtl
+            dst_obj.data.uv_layers.active_index = uv_index
+            # 预设脚本可能新建顶点色等属性
+            for name in [attr.name for attr in dst_obj.data.attributes if attr.name not in attributes]:
+                dst_obj.data.attributes.remove(dst_obj.data.attributes[name])
+        for img in set(bpy.data.images) - images:
+            bpy.data.images.remove(img)
+        for mtl in set(bpy.data.materials) - materials - PresetCache.cached():
+            bpy.data.materials.remove(mtl)
+        for obj in view_layer.objects:
+            obj.select_set(obj.name in selected)
+        view_layer.objects.active = bpy.data.objects.get(active)
+        bpy.context.scene.render.bake.normal_space = normal_space
+
+
 def bake_advanced(config, mesh_pair, cat, bake_pass):
     ctx = config.get("ctx", {})
-    preset_path = Path(__file__).parent.joinpath("advanced")
-    cpath = preset_path.joinpath(bake_pass).with_suffix(".json")
-    if not cpath.exists():
-        sys.stdout.write(f"[ERROR]: {cpath} not found")
-        return
+    # 常驻进程中上一个任务选中的物体会作为额外的源物体参与烘焙
+    bpy.ops.object.select_all(action="DESELECT")
     # 配置解析
-    jconfig = json.loads(cpath.read_text())
-    {'Name': 'Position', 'Material': 'Position', 'Run': 'run.py', 'BakeType': 'EMIT', 'Params': {}, 'Description': ''}
-    name = jconfig.get("Name", bake_pass)
-    mtl_name = jconfig.get("Material", name)
+    jconfig = PresetCache.config(bake_pass)
+    if not jconfig:
+        sys.stdout.write(f"[ERROR]: {bake_pass} not found")
+        return
     final_bake_pass = jconfig.get("BakeType", "EMIT")
     params = jconfig.get("Params", {})
 
     # load阶段
-    blend = preset_path.joinpath(f"{name}.blend").as_posix()
-    with bpy.data.libraries.load(blend) as (df, dt):
-        if not df.materials:
-            sys.stderr.write("[ERROR]: No materials found")
-            return
-        if mtl_name not in df.materials:
-            mtl_name = df.materials[0]
-        dt.materials = [mtl_name]
-    act_mtl = bpy.data.materials[mtl_name]
+    act_mtl = PresetCache.clone(bake_pass)
+    if not act_mtl:
+        sys.stderr.write("[ERROR]: No materials found")
+        return
 
     # 参数设置阶段
     def value_set(obj, path: str, value) -> None:
@@ -216,10 +586,9 @@ def bake_advanced(config, mesh_pair, cat, bake_pass):
         value_set(act_mtl, data_path, pvalue)
 
     # prepare阶段
-    script_name = jconfig.get("Run", "")
-    run_py = preset_path.joinpath(script_name)
-    if script_name and run_py.exists():
-        exec(run_py.read_text(), globals())
+    code = PresetCache.script(jconfig.get("Run", ""))
+    if code:
+        exec(code, globals())
         _Run = globals().get("_Run")
         try:
             _Run(config, mesh_pair, cat, bake_pass, config.get("run_params", {}))
@@ -248,10 +617,12 @@ def bake_advanced(config, mesh_pair, cat, bake_pass):
     if src_obj:
         src_obj.select_set(True)
 
-    res = bake_settings.get("resolution", (512, 512))
-    img_node = create_img_node(f"{dst}_{cat}_{bake_pass}", res, act_mtl)
+    res = get_resolution(config)
+    img_node = create_img_node(f"{dst}_{cat}_{bake_pass}", res, act_mtl, cat, bake_pass)
     act_mtl.node_tree.nodes.active = img_node
-    bpy.ops.object.bake(type=final_bake_pass, save_mode="INTERNAL")
+    policy = apply_sampling(bpy.context.scene, bake_settings, bake_pass)
+    bake_image(img_node.image, policy, bake_settings, type=final_bake_pass, save_mode="INTERNAL")
+    denoise_image(img_node.image, dst_obj, bake_settings, bake_pass)
     sys.stdout.flush()
     write_to_shm(config.get("shm_name", ""), img_node.image)
 
@@ -261,11 +632,11 @@ def bake_internal(config, mesh_pair, cat, bake_pass):
     bake_settings = ctx.get("BakeSettings", {})
 
     sce = bpy.context.scene
-    sce.render.bake_samples = bake_settings.get("bake_samples", 1)
-    sce.cycles.samples = bake_settings.get("samples", 1)
-    if bake_pass in {"AO", "DIFFUSE", "GLOSSY"}:
-        sce.cycles.samples = max(sce.cycles.samples, 32)
+    policy = apply_sampling(sce, bake_settings, bake_pass)
     init_scene(sce)
+    # 推导通道使用物体空间法线, 由父进程转换到世界空间; 其他任务使用场景中的设置, 由 job_scope 还原
+    if cat == "Derived":
+        sce.render.bake.normal_space = "OBJECT"
 
     dst, src, _uv = mesh_pair
     bpy.ops.object.select_all(action="DESELECT")
@@ -281,13 +652,15 @@ def bake_internal(config, mesh_pair, cat, bake_pass):
     act_mtl: bpy.types.Material = dst_obj.active_material
     if not act_mtl:
         return
+    act_mtl = act_mtl.copy()
+    dst_obj.active_material = act_mtl
 
     src_obj: bpy.types.Object = bpy.data.objects.get(src)
     if src_obj:
         src_obj.select_set(True)
 
-    res = bake_settings.get("resolution", (512, 512))
-    img_node = create_img_node(f"{dst}_{cat}_{bake_pass}", res, act_mtl)
+    res = get_resolution(config)
+    img_node = create_img_node(f"{dst}_{cat}_{bake_pass}", res, act_mtl, cat, bake_pass)
     act_mtl.node_tree.nodes.active = img_node
     output = act_mtl.node_tree.get_output_node("ALL")
     if not output:
@@ -295,33 +668,116 @@ def bake_internal(config, mesh_pair, cat, bake_pass):
         return
     img_node.location = output.location
     img_node.location.y -= output.height
-    bpy.ops.object.bake(type=bake_pass, save_mode="INTERNAL")
+    bake_image(img_node.image, policy, bake_settings, type=bake_pass, save_mode="INTERNAL")
+    denoise_image(img_node.image, dst_obj, bake_settings, bake_pass)
     sys.stdout.flush()
     write_to_shm(config.get("shm_name", ""), img_node.image)
 
 
+GPU_BACKENDS = ("OPTIX", "CUDA", "HIP", "METAL", "ONEAPI")
+
+
+class DeviceCache:
+    # 是否有可用的 GPU, 进程内只检测一次
+    has_gpu = None
+
+
+def detect_gpu() -> bool:
+    """
+    --factory-startup 启动时未配置计算设备, 依次尝试各后端, 启用找到的 GPU
+    """
+    if DeviceCache.has_gpu is not None:
+        return DeviceCache.has_gpu
+    DeviceCache.has_gpu = False
+    addon = bpy.context.preferences.addons.get("cycles")
+    if not addon:
+        return False
+    cprefs = addon.preferences
+    backends = [cprefs.compute_device_type] if cprefs.compute_device_type != "NONE" else list(GPU_BACKENDS)
+    for backend in backends:
+        try:
+            cprefs.compute_device_type = backend
+            cprefs.get_devices()
+        except (TypeError, AttributeError, RuntimeError):
+            continue
+        gpus = [d for d in cprefs.devices if d.type == backend]
+        if not gpus:
+            continue
+        for d in gpus:
+            d.use = True
+        DeviceCache.has_gpu = True
+        return True
+    cprefs.compute_device_type = "NONE"
+    return False
+
+
+def select_device(device: str):
+    """
+    device: AUTO(有 GPU 时使用 GPU) | GPU | CPU
+    """
+    sce = bpy.context.scene
+    if device == "CPU":
+        sce.cycles.device = "CPU"
+        return
+    sce.cycles.device = "GPU" if detect_gpu() or device == "GPU" else "CPU"
+
+
+# 进程启动时可用的 CPU, 不绑定的任务恢复为该集合
+STARTUP_CPUS = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else []
+
+
+def pin_cpus(cpus: list[int]):
+    """
+    绑定进程的所有线程(sched_setaffinity 只作用于单个线程), 之后创建的线程继承
+    """
+    if not cpus or not hasattr(os, "sched_setaffinity"):
+        return
+    try:
+        tids = [int(tid) for tid in os.listdir("/proc/self/task")]
+    except OSError:
+        tids = [0]
+    for tid in tids:
+        try:
+            os.sched_setaffinity(tid, cpus)
+        except OSError:
+            # 线程已退出
+            ...
+
+
+def apply_cpu_config(config: dict):
+    """
+    threads: 渲染线程数, 0 为自动; cpus: 绑定的 CPU 列表, 空为不绑定
+    """
+    render = bpy.context.scene.render
+    if threads := config.get("threads", 0):
+        render.threads_mode = "FIXED"
+        render.threads = threads
+    else:
+        render.threads_mode = "AUTO"
+    # 复用的进程可能仍绑定在上一个任务的 CPU 上
+    pin_cpus(config.get("cpus") or STARTUP_CPUS)
+
+
 def bake(config):
     bpy.context.scene.render.engine = "CYCLES"
-    bpy.context.scene.cycles.device = "GPU"
+    select_device(config.get("device", "AUTO"))
+    apply_cpu_config(config)
     config = TreeCtx().load(config)
     bake_params = config.get("bake_params", [])
     if not bake_params:
         return
     mesh_pair, cat, bake_pass = bake_params
-    if cat == "PBR":
-        bake_pbr(config, mesh_pair, cat, bake_pass)
-    elif cat == "Advanced":
-        bake_advanced(config, mesh_pair, cat, bake_pass)
-    else:
-        bake_internal(config, mesh_pair, cat, bake_pass)
+    JobTrace.start = now_us()
+    with job_scope(mesh_pair):
+        if cat == "PBR":
+            bake_pbr(config, mesh_pair, cat, bake_pass)
+        elif cat == "Advanced":
+            bake_advanced(config, mesh_pair, cat, bake_pass)
+        else:
+            bake_internal(config, mesh_pair, cat, bake_pass)
 
 
-if __name__ == "__main__":
-    argv = sys.argv[sys.argv.index("--") + 1:]
-    parser = argparse.ArgumentParser()
-    parser.add_argument("-bnc", dest="config", type=str, default="{}")
-    args = parser.parse_args(argv)
-    config = args.config
+def run_safe(config):
     while isinstance(config, str):
         config = eval(config)
     try:
@@ -331,3 +787,41 @@ if __name__ == "__main__":
         trace_info = traceback.format_exc()
         sys.stdout.write(f"[ERROR]: {trace_info}\n")
         sys.stdout.flush()
+
+
+def serve(config):
+    """
+    常驻模式: 从stdin逐行读取命令, 每个任务结束后输出 JOB_DONE
+    """
+    if spawn_ts := config.get("spawn_ts"):
+        # 进程启动 + 初始blend文件加载
+        emit_trace("Worker Startup", spawn_ts)
+    for line in sys.stdin:
+        cmd, payload = parse_command(line)
+        if cmd == "QUIT":
+            break
+        if cmd == "OPEN":
+            with span("Scene Load", path=payload):
+                bpy.ops.wm.open_mainfile(filepath=payload, load_ui=False)
+            PresetCache.reset()
+            continue
+        if cmd != "JOB":
+            continue
+        run_safe(payload)
+        sys.stderr.flush()
+        sys.stdout.write(f"\n{JOB_DONE}\n")
+        sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    argv = sys.argv[sys.argv.index("--") + 1:]
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-bnc", dest="config", type=str, default="{}")
+    args = parser.parse_args(argv)
+    config = args.config
+    while isinstance(config, str):
+        config = eval(config)
+    if config.get("serve"):
+        serve(config)
+    else:
+        run_safe(config)
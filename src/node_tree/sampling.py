@@ -0,0 +1,73 @@
+"""
+烘焙采样策略: 每个通道在固定采样下的最少采样数, 收敛模式下的每批采样数和采样上限, 以及收敛判断用的噪声估计
+    收敛模式把采样分成若干批依次烘焙, 奇偶批分别累加为两个独立的估计 A/B,
+    完整结果的噪声约为 |A-B|/2, 按亮度归一化后在覆盖区域上取均方根, 低于阈值时停止
+    法线/UV/颜色等确定性通道没有噪声, 不使用收敛模式
+注意: 该模块会被后台 blender 进程直接导入, 不能使用相对导入, 也不能依赖 bpy
+"""
+from __future__ import annotations
+from typing import NamedTuple
+import numpy as np
+
+
+class SamplesPolicy(NamedTuple):
+    # 固定采样时的最少采样数
+    min: int
+    # 收敛模式每批采样数, 0 表示确定性通道
+    batch: int
+    # 收敛模式采样上限
+    max: int
+
+
+DEFAULT_POLICY = SamplesPolicy(1, 0, 0)
+SAMPLES_POLICY = {
+    "AO": SamplesPolicy(32, 8, 512),
+    "DIFFUSE": SamplesPolicy(32, 8, 512),
+    "GLOSSY": SamplesPolicy(32, 16, 1024),
+    "TRANSMISSION": SamplesPolicy(1, 16, 1024),
+    "COMBINED": SamplesPolicy(1, 16, 1024),
+    "SHADOW": SamplesPolicy(1, 8, 256),
+    # 高级预设中使用 AO/倒角节点的通道
+    "Thickness": SamplesPolicy(1, 8, 512),
+    "Cavity": SamplesPolicy(1, 8, 256),
+    "Dust": SamplesPolicy(1, 8, 256),
+    "BevelMask": SamplesPolicy(1, 8, 256),
+    "NormalObjectBevel": SamplesPolicy(1, 8, 256),
+    "NormalTangentBevel": SamplesPolicy(1, 8, 256),
+}
+# 自适应阈值为 0 时(Cycles 中表示自动)使用的噪声阈值
+DEFAULT_THRESHOLD = 0.01
+# 暗部按该亮度归一化, 避免接近 0 的像素放大相对误差
+LUMINANCE_FLOOR = 0.1
+
+
+def get_policy(bake_pass: str, channels=()) -> SamplesPolicy:
+    """
+    打包通道取各子通道中最严格的策略
+    """
+    policies = [SAMPLES_POLICY.get(name, DEFAULT_POLICY) for name in (bake_pass, *channels)]
+    return SamplesPolicy(
+        max(p.min for p in policies),
+        max(p.batch for p in policies),
+        max(p.max for p in policies),
+    )
+
+
+def fixed_samples(policy: SamplesPolicy, samples: int, denoised=False) -> int:
+    """
+    denoised: 烘焙后会降噪, 直接使用设置的采样数
+    """
+    return samples if denoised else max(samples, policy.min)
+
+
+def noise_estimate(a: np.ndarray, b: np.ndarray, fill=(0, 0, 0, 1)) -> float:
+    """
+    a/b: 两个独立估计的 (h, w, 4) 像素, 只统计与初始填充色不同(被烘焙覆盖)的像素
+    """
+    mask = np.any(a != fill, axis=-1) | np.any(b != fill, axis=-1)
+    if not mask.any():
+        return 0.0
+    a, b = a[mask][:, :3], b[mask][:, :3]
+    scale = np.maximum((a + b) * 0.5, LUMINANCE_FLOOR)
+    err = (a - b) * 0.5 / scale
+    return float(np.sqrt(np.mean(err * err)))
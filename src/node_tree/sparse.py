@@ -0,0 +1,115 @@
+"""
+按 tile 稀疏传输烘焙结果: 只传输与图像初始填充色不同的 tile
+    共享内存布局: header(int32 x 8) | tile索引(int32 x n) | tile数据(float32 x n x T x T x 4)
+    未传输的 tile 在重建时以同一填充色还原, 因此是无损的
+注意: 该模块会被后台 blender 进程直接导入, 不能使用相对导入
+"""
+from __future__ import annotations
+import numpy as np
+
+MAGIC = 0x42534854
+TILE = 32
+HEADER = 8
+# 新建图像的默认颜色
+FILL = (0, 0, 0, 1)
+
+
+def buffer_size(width: int, height: int, tile=TILE) -> int:
+    tx, ty = -(-width // tile), -(-height // tile)
+    return (HEADER + tx * ty) * 4 + tx * ty * tile * tile * 4 * 4
+
+
+def as_tiles(pixels: np.ndarray, tile=TILE, fill=FILL) -> np.ndarray:
+    """
+    (H, W, 4) -> (ty, tx, T, T, 4), 尺寸不是tile整数倍时以填充色补齐(会复制)
+        补齐部分与填充色相同, 不会使边缘tile被误判为有内容
+    """
+    h, w = pixels.shape[:2]
+    ph, pw = -h % tile, -w % tile
+    if ph or pw:
+        canvas = np.empty((h + ph, w + pw, pixels.shape[2]), dtype=pixels.dtype)
+        canvas[:] = fill
+        canvas[:h, :w] = pixels
+        pixels = canvas
+    ty, tx = pixels.shape[0] // tile, pixels.shape[1] // tile
+    return pixels.reshape(ty, tile, tx, tile, -1).swapaxes(1, 2)
+
+
+def tile_view(pixels: np.ndarray, tile=TILE) -> np.ndarray | None:
+    """
+    尺寸为tile整数倍时返回 (ty, tx, T, T, 4) 视图(可写回), 否则返回None
+    """
+    h, w = pixels.shape[:2]
+    if h % tile or w % tile:
+        return None
+    return as_tiles(pixels, tile)
+
+
+def tile_mask(pixels: np.ndarray, fill=FILL, tile=TILE) -> np.ndarray:
+    """
+    (ty, tx) bool, 含有非填充色像素的 tile
+    """
+    tiles = as_tiles(pixels, tile, fill)
+    return (tiles != np.asarray(fill, dtype=np.float32)).any(axis=(2, 3, 4))
+
+
+def write(buf, pixels: np.ndarray, fill=FILL, tile=TILE) -> int:
+    """
+    写入共享内存, 返回传输的tile数
+    """
+    h, w = pixels.shape[:2]
+    mask = tile_mask(pixels, fill, tile)
+    ids = np.flatnonzero(mask).astype(np.int32)
+    header = np.ndarray((HEADER,), dtype=np.int32, buffer=buf)
+    header[:] = (0, tile, w, h, len(ids), 0, 0, 0)
+    offset = (HEADER + mask.size) * 4
+    np.ndarray((len(ids),), dtype=np.int32, buffer=buf, offset=HEADER * 4)[:] = ids
+    data = np.ndarray((len(ids), tile, tile, 4), dtype=np.float32, buffer=buf, offset=offset)
+    data[:] = as_tiles(pixels, tile, fill)[mask]
+    # 最后写入MAGIC, 表示数据完整
+    header[0] = MAGIC
+    return len(ids)
+
+
+def used_size(buf) -> int:
+    """
+    当前有效数据的字节数(无有效数据时为0), 远程传输时只发送这部分
+    """
+    header = np.ndarray((HEADER,), dtype=np.int32, buffer=buf)
+    if header[0] != MAGIC:
+        return 0
+    _, tile, w, h, n = header[:5].tolist()
+    tx, ty = -(-w // tile), -(-h // tile)
+    return (HEADER + tx * ty) * 4 + n * tile * tile * 4 * 4
+
+
+def reset(buf):
+    np.ndarray((HEADER,), dtype=np.int32, buffer=buf)[:] = 0
+
+
+def read(buf, fill=FILL) -> tuple[np.ndarray, np.ndarray, int]:
+    """
+    从共享内存重建完整图像
+        返回: pixels (H, W, 4), tile索引, tile尺寸; 无有效数据时返回 (None, None, 0)
+    """
+    header = np.ndarray((HEADER,), dtype=np.int32, buffer=buf)
+    if header[0] != MAGIC:
+        return None, None, 0
+    _, tile, w, h, n = header[:5].tolist()
+    tx, ty = -(-w // tile), -(-h // tile)
+    ids = np.ndarray((n,), dtype=np.int32, buffer=buf, offset=HEADER * 4).copy()
+    offset = (HEADER + tx * ty) * 4
+    data = np.ndarray((n, tile, tile, 4), dtype=np.float32, buffer=buf, offset=offset)
+    canvas = np.empty((ty * tile, tx * tile, 4), dtype=np.float32)
+    canvas[:] = fill
+    tiles = canvas.reshape(ty, tile, tx, tile, 4).swapaxes(1, 2)
+    tiles[ids // tx, ids % tx] = data
+    return canvas[:h, :w], ids, tile
+
+
+def ids_to_mask(ids, width: int, height: int, tile=TILE) -> np.ndarray:
+    tx, ty = -(-width // tile), -(-height // tile)
+    mask = np.zeros(tx * ty, dtype=bool)
+    mask[np.asarray(ids, dtype=np.int64)] = True
+    return mask.reshape(ty, tx)
+
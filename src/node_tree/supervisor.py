@@ -0,0 +1,198 @@
+"""
+后台进程监管: 在一个线程中同时管理多个后台 blender 进程
+    非阻塞读取各进程输出(selectors), 检查任务总超时和无输出超时, 回收退出码, 按到达顺序返回事件
+    Windows 的管道不支持 select, 改为每个进程一个读取线程把数据放入队列, 事件仍在调用线程中处理
+注意: 该模块也会被 agent 进程直接导入
+"""
+from __future__ import annotations
+import os
+import time
+import selectors
+import threading
+from queue import Queue, Empty
+from collections import deque
+from collections.abc import Hashable, Iterator
+from subprocess import Popen
+if __package__:
+    from .protocol import parse_line
+else:
+    from protocol import parse_line
+
+READ_SIZE = 64 * 1024
+USE_SELECT = os.name != "nt"
+
+
+class OutputStream:
+    """
+    进程 stdout 的读取状态, buffer 中保存尚不完整的行和上一个任务结束后多读到的行
+    """
+
+    def __init__(self, process: Popen):
+        self.process = process
+        self.fd = process.stdout.fileno()
+        self.buffer = bytearray()
+        self.chunks: Queue = None
+        if not USE_SELECT:
+            self.chunks = Queue()
+            threading.Thread(target=self._read_loop, daemon=True).start()
+
+    def _read_loop(self):
+        while True:
+            try:
+                data = os.read(self.fd, READ_SIZE)
+            except OSError:
+                data = b""
+            self.chunks.put(data)
+            if not data:
+                return
+
+    def read(self) -> bytes | None:
+        """
+        b"" 表示进程已关闭输出, None 表示暂无数据(仅读取线程模式)
+        """
+        if self.chunks is None:
+            try:
+                return os.read(self.fd, READ_SIZE)
+            except OSError:
+                return b""
+        try:
+            return self.chunks.get_nowait()
+        except Empty:
+            return None
+
+    def next_line(self) -> str | None:
+        end = self.buffer.find(b"\n")
+        if end < 0:
+            return None
+        line = bytes(self.buffer[:end])
+        del self.buffer[:end + 1]
+        return line.decode("utf-8", "replace")
+
+
+class SupervisedJob:
+    def __init__(self, key: Hashable, worker, timeout: float, stall: float):
+        self.key = key
+        self.worker = worker
+        self.timeout = timeout
+        self.stall = stall
+        self.start = self.last_output = time.monotonic()
+
+    @property
+    def stream(self) -> OutputStream:
+        return self.worker.stream
+
+    def expired(self, now: float) -> str:
+        if self.timeout and now - self.start > self.timeout:
+            return f"Job timed out after {self.timeout:.0f}s"
+        if self.stall and now - self.last_output > self.stall:
+            return f"Worker produced no output for {self.stall:.0f}s"
+        return ""
+
+
+class Supervisor:
+    """
+    submit(key, worker, config) 向已启动的 worker 提交任务, events() 返回 (key, kind, payload) 直到所有任务结束
+        kind 为 parse_line 的类型, 每个任务以 ("done", 耗时) 或 ("error", 原因) 结束
+        超时的进程被终止, 下一个任务由 worker.start 重新启动
+    worker 需提供 process/stream/send/kill, 如 BakeWorker
+    """
+
+    def __init__(self, poll_interval=0.5):
+        self.poll_interval = poll_interval
+        self.jobs: dict[Hashable, SupervisedJob] = {}
+        self.ready: deque[tuple[Hashable, str, object]] = deque()
+        self.selector = selectors.DefaultSelector() if USE_SELECT else None
+
+    def __enter__(self) -> Supervisor:
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self):
+        return len(self.jobs)
+
+    def submit(self, key: Hashable, worker, config: dict, timeout=0.0, stall=0.0):
+        if key in self.jobs:
+            raise KeyError(f"Job already running: {key}")
+        try:
+            worker.send("JOB", repr(config))
+        except OSError as e:
+            self.ready.append((key, "error", f"Worker exited: {e}"))
+            return
+        job = SupervisedJob(key, worker, timeout, stall)
+        self.jobs[key] = job
+        if self.selector:
+            self.selector.register(job.stream.fd, selectors.EVENT_READ, job)
+        # 上一个任务之后多读到的行
+        self.drain(job)
+
+    def events(self) -> Iterator[tuple[Hashable, str, object]]:
+        while self.ready or self.jobs:
+            while self.ready:
+                yield self.ready.popleft()
+            if not self.jobs:
+                return
+            for job, data in self.poll():
+                if job.key not in self.jobs:
+                    continue
+                if not data:
+                    code = job.worker.process.wait()
+                    self.finish(job, "error", f"Worker exited with code {code}")
+                    continue
+                job.last_output = time.monotonic()
+                job.stream.buffer += data
+                self.drain(job)
+            self.check_timeouts()
+
+    def poll(self) -> Iterator[tuple[SupervisedJob, bytes]]:
+        if self.selector:
+            for key, _ in self.selector.select(self.poll_interval):
+                job: SupervisedJob = key.data
+                yield job, job.stream.read()
+            return
+        got = False
+        for job in list(self.jobs.values()):
+            while (data := job.stream.read()) is not None:
+                got = True
+                yield job, data
+                if not data:
+                    break
+        if not got:
+            time.sleep(0.02)
+
+    def drain(self, job: SupervisedJob):
+        while (line := job.stream.next_line()) is not None:
+            kind, payload = parse_line(line)
+            if kind == "job_done":
+                self.finish(job, "done", time.monotonic() - job.start)
+                return
+            if kind:
+                self.ready.append((job.key, kind, payload))
+
+    def check_timeouts(self):
+        now = time.monotonic()
+        for job in list(self.jobs.values()):
+            if reason := job.expired(now):
+                job.worker.kill()
+                self.finish(job, "error", reason)
+
+    def finish(self, job: SupervisedJob, kind: str, payload):
+        self.jobs.pop(job.key, None)
+        if self.selector:
+            try:
+                self.selector.unregister(job.stream.fd)
+            except (KeyError, ValueError):
+                ...
+        self.ready.append((job.key, kind, payload))
+
+    def close(self):
+        """
+        未结束的任务所在进程被终止, 进程状态未知不能复用
+        """
+        for job in list(self.jobs.values()):
+            job.worker.kill()
+            self.finish(job, "error", "Supervisor closed")
+        self.ready.clear()
+        if self.selector:
+            self.selector.close()
@@ -0,0 +1,102 @@
+from __future__ import annotations
+from pathlib import Path
+from subprocess import Popen, PIPE, STDOUT, TimeoutExpired
+from ...utils.trace import Trace
+from .protocol import command, worker_args
+from .supervisor import OutputStream
+
+
+class BakeWorker:
+    """
+    常驻的后台 blender 进程, 打开一次blend文件后依次执行多个烘焙任务
+        进程内缓存预设材质/脚本, 避免每个任务都重新启动blender和加载预设库
+        进程意外退出时, 下一个任务会自动重启
+    """
+
+    def __init__(self, blender: str, blend_path: str, script: Path | str, extra_args: list[str] = None):
+        self.blender = blender
+        self.blend_path = blend_path
+        self.script = Path(script)
+        self.extra_args = list(extra_args or [])
+        self.process: Popen = None
+        self.stream: OutputStream = None
+
+    def args(self) -> list[str]:
+        return worker_args(self.blender, self.blend_path, self.script.as_posix(), self.extra_args)
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+    @property
+    def pid(self) -> int:
+        return self.process.pid if self.process else 0
+
+    def start(self):
+        if self.alive:
+            return
+        with Trace.span("Worker Spawn"):
+            self.process = Popen(self.args(), stdin=PIPE, stdout=PIPE, stderr=STDOUT, cwd=self.script.parent.as_posix())
+        self.stream = OutputStream(self.process)
+
+    def send(self, cmd: str, payload=""):
+        self.process.stdin.write(command(cmd, payload))
+        self.process.stdin.flush()
+
+    def open(self, blend_path: str):
+        """
+        切换到另一个blend文件, 进程和已编译的预设脚本保持不变
+        """
+        self.blend_path = blend_path
+        if self.alive:
+            self.send("OPEN", blend_path)
+
+    def kill(self):
+        if self.process is None:
+            return
+        if self.alive:
+            self.process.kill()
+        self.process.wait()
+
+    def close(self, timeout=10):
+        if not self.alive:
+            return
+        try:
+            self.send("QUIT")
+            self.process.wait(timeout=timeout)
+        except (OSError, TimeoutExpired):
+            self.process.kill()
+            self.process.wait()
+
+
+class WorkerPool:
+    """
+    空闲的后台进程, keep_warm 开启时(如命令行批处理)跨节点/跨文件复用, 否则用完即关闭
+        复用时发送 OPEN 重新加载新导出的blend文件, 省去进程启动和预设库加载
+    """
+    keep_warm = False
+    idle: list[BakeWorker] = []
+
+    @classmethod
+    def acquire(cls, blender: str, blend_path: str, script: Path | str, extra_args: list[str] = None) -> BakeWorker:
+        script = Path(script)
+        extra_args = list(extra_args or [])
+        while cls.idle:
+            worker = cls.idle.pop()
+            if worker.alive and worker.blender == blender and worker.script == script and worker.extra_args == extra_args:
+                worker.open(blend_path)
+                return worker
+            worker.close()
+        return BakeWorker(blender, blend_path, script, extra_args)
+
+    @classmethod
+    def release(cls, worker: BakeWorker):
+        if cls.keep_warm and worker.alive:
+            cls.idle.append(worker)
+            return
+        worker.close()
+
+    @classmethod
+    def close_all(cls):
+        while cls.idle:
+            cls.idle.pop().close()
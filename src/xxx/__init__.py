@@ -1,10 +1,12 @@
 import bpy
 from .operators import (BakeTreeRun,
+                        BakePerfReport,
                         BakeSettingsPresetsOps,
                         SaveAsBakePresets,
                         MarkPropAsParams,
                         DeletePropFromParams,
                         DeleteBakePreset,
+                        BuildPresetLibrary,
                         BakeTreePresetsOps,
                         PrefBakeSettingsPresetsOps,
                         )
@@ -15,11 +17,13 @@ from .preference import AddonPreference
 
 def register():
     bpy.utils.register_class(BakeTreeRun)
+    bpy.utils.register_class(BakePerfReport)
     bpy.utils.register_class(BakeSettingsPresetsOps)
     bpy.utils.register_class(SaveAsBakePresets)
     bpy.utils.register_class(MarkPropAsParams)
     bpy.utils.register_class(DeletePropFromParams)
     bpy.utils.register_class(DeleteBakePreset)
+    bpy.utils.register_class(BuildPresetLibrary)
     bpy.utils.register_class(BakeTreePresetsOps)
     bpy.utils.register_class(PrefBakeSettingsPresetsOps)
     bpy.utils.register_class(AIBakeTree)
@@ -47,9 +51,11 @@ def unregister():
     bpy.utils.unregister_class(AIBakeTree)
     bpy.utils.unregister_class(PrefBakeSettingsPresetsOps)
     bpy.utils.unregister_class(BakeTreePresetsOps)
+    bpy.utils.unregister_class(BuildPresetLibrary)
     bpy.utils.unregister_class(DeleteBakePreset)
     bpy.utils.unregister_class(DeletePropFromParams)
     bpy.utils.unregister_class(MarkPropAsParams)
     bpy.utils.unregister_class(SaveAsBakePresets)
     bpy.utils.unregister_class(BakeSettingsPresetsOps)
+    bpy.utils.unregister_class(BakePerfReport)
     bpy.utils.unregister_class(BakeTreeRun)
@@ -2,10 +2,15 @@ from typing import Set
 from pathlib import Path
 from bpy.types import Context, Event
 from ...utils.logger import logger
+from ...utils.trace import Trace
 from ..node_tree.node_tree import TREE_TYPE, TNodeTree
 from ..node_tree.executor import TaskExecutor
+from ..node_tree.preset_registry import PresetRegistry
+from ..node_tree.perf_history import PerfHistory
 import bpy
 import json
+import time
+import sqlite3
 OPS_CTX = "BakeNodeOps"
 
 
@@ -15,6 +20,8 @@ class BakeTreeRun(bpy.types.Operator):
     bl_label = "Run Bake"
     bl_translation_context = OPS_CTX
 
+    resume: bpy.props.BoolProperty(name="Resume", default=False, description="Skip jobs completed by an interrupted run")
+
     @classmethod
     def poll(cls, context: Context) -> bool:
         space = context.space_data
@@ -27,11 +34,37 @@ class BakeTreeRun(bpy.types.Operator):
         tree: TNodeTree = context.space_data.edit_tree
         if not tree:
             return {"CANCELLED"}
-        task = tree.dump()
+        with Trace.span("Tree Dump", tree=tree.name):
+            task = tree.dump()
+        if self.resume:
+            TNodeTree.set_resume(task)
         TaskExecutor.submit_task(task)
         return {"FINISHED"}
 
 
+class BakePerfReport(bpy.types.Operator):
+    bl_idname = "bake_tree.perf_report"
+    bl_label = "Performance Report"
+    bl_description = "Summarize bake pass timings from the performance history"
+    bl_translation_context = OPS_CTX
+
+    days: bpy.props.IntProperty(name="Days", default=30, min=0, description="0 for all history")
+
+    def execute(self, context: Context):
+        since = time.time() - self.days * 86400 if self.days else None
+        try:
+            report = PerfHistory.format_report(since)
+        except sqlite3.Error as e:
+            self.report({"ERROR"}, str(e))
+            return {"CANCELLED"}
+        text = bpy.data.texts.get("BakePerfReport") or bpy.data.texts.new("BakePerfReport")
+        text.clear()
+        text.write(report)
+        logger.info("\n%s", report)
+        self.report({"INFO"}, "Report written to text BakePerfReport")
+        return {"FINISHED"}
+
+
 class BakeSettingsPresetsOps(bpy.types.Operator):
     bl_idname = "bake_tree.bake_settings_presets"
     bl_label = "Bake Settings Presets"
@@ -162,6 +195,54 @@ class DeleteBakePreset(bpy.types.Operator):
         return {"FINISHED"}
 
 
+class BuildPresetLibrary(bpy.types.Operator):
+    bl_idname = "bake_tree.build_preset_library"
+    bl_label = "Build Preset Library"
+    bl_description = "Merge all preset materials into one library so bake workers load them at once"
+    bl_translation_context = OPS_CTX
+
+    # 材质依赖的数据块, 生成后与材质一起删除
+    DEPENDS = ("node_groups", "images", "textures")
+
+    def execute(self, context: Context):
+        from ..node_tree.nodes import CustomPass
+        p = CustomPass.get_preset_dir()
+        collections = [bpy.data.materials] + [getattr(bpy.data, attr) for attr in self.DEPENDS]
+        existing = [(coll, set(coll)) for coll in collections]
+        loaded = {}
+        try:
+            for blend in p.glob("*.blend"):
+                if blend.stem.startswith("_"):
+                    continue
+                config = CustomPass.load_preset(blend.stem)
+                if not config:
+                    continue
+                mtl_name = config.get("Material", config.get("Name", blend.stem))
+                with bpy.data.libraries.load(blend.as_posix()) as (df, dt):
+                    if not df.materials:
+                        continue
+                    if mtl_name not in df.materials:
+                        mtl_name = df.materials[0]
+                    dt.materials = [mtl_name]
+                if dt.materials and dt.materials[0]:
+                    loaded[blend.stem] = dt.materials[0]
+            if not loaded:
+                self.report({"WARNING"}, "No preset materials found")
+                return {"CANCELLED"}
+            # 不重命名材质(可能与用户材质重名), 预设名 -> 库中材质名 记录在 _library.json, 后台进程据此查找
+            library = p.joinpath("_library.blend")
+            bpy.data.libraries.write(library.as_posix(), set(loaded.values()), fake_user=True, compress=True)
+            names = {name: mtl.name for name, mtl in loaded.items()}
+            library.with_suffix(".json").write_text(json.dumps(names, ensure_ascii=False, indent=2), encoding="utf-8")
+        finally:
+            # 删除本次加载的材质及其依赖, 不留下孤立的节点组/图像
+            added = [data for coll, before in existing for data in coll if data not in before]
+            if added:
+                bpy.data.batch_remove(added)
+        logger.info(f"Preset library saved: {library}")
+        return {"FINISHED"}
+
+
 class MarkPropAsParams(bpy.types.Operator):
     bl_idname = "bake_tree.mark_prop_as_params"
     bl_label = "Mark Prop As Params"
@@ -308,6 +389,7 @@ class BakeTreePresetsOps(bpy.types.Operator):
         save_path = preset_dir.joinpath(save_name).with_suffix(".blend")
         save_path.unlink(missing_ok=True)
         bpy.data.libraries.write(save_path.as_posix(), {tree})
+        PresetRegistry.refresh("tree")
 
     def del_preset(self):
         if not bpy.context.window_manager.bake_tree.preset:
@@ -316,6 +398,7 @@ class BakeTreePresetsOps(bpy.types.Operator):
         del_path = Path(bpy.context.window_manager.bake_tree.preset)
         if del_path.is_file():
             del_path.unlink(missing_ok=True)
+        PresetRegistry.refresh("tree")
 
     def load_preset(self):
         load_path = Path(bpy.context.window_manager.bake_tree.preset)
@@ -1,6 +1,6 @@
 import bpy
 from bpy.types import Context
-from .operators import BakeTreeRun, BakeSettingsPresetsOps, PrefBakeSettingsPresetsOps, SaveAsBakePresets, MarkPropAsParams, DeletePropFromParams, BakeTreePresetsOps
+from .operators import OPS_CTX, BakeTreeRun, BakeSettingsPresetsOps, PrefBakeSettingsPresetsOps, SaveAsBakePresets, MarkPropAsParams, DeletePropFromParams, BakeTreePresetsOps
 from ..node_tree.node_tree import TREE_TYPE
 from .preference import get_pref
 PROP_CTX = "BakeNodeProp"
@@ -86,7 +86,9 @@ class BakeTreePanel(bpy.types.Panel):
         self.show_preset(layout)
 
     def show_common(self, layout: bpy.types.UILayout):
-        layout.operator(BakeTreeRun.bl_idname)
+        row = layout.row(align=True)
+        row.operator(BakeTreeRun.bl_idname)
+        row.operator(BakeTreeRun.bl_idname, text="Resume Bake", text_ctxt=OPS_CTX).resume = True
         wm = bpy.context.window_manager
         props = wm.bake_tree
         col = layout.column()
@@ -104,6 +106,13 @@ class BakeTreePanel(bpy.types.Panel):
             row.label(text="Exe Node", text_ctxt=PROP_CTX)
             row.label(text=props.enode)
             box.prop(props, "enode_p")
+            if props.eta:
+                row = box.row()
+                row.label(text="ETA", text_ctxt=PROP_CTX)
+                row.label(text=props.eta)
+            if props.worker_usage:
+                box.label(text=props.worker_usage, icon="MEMORY")
+        layout.operator("bake_tree.perf_report", icon="TEXT")
 
         node = bpy.context.active_node
         if not node or not hasattr(node, "draw_buttons_ext"):
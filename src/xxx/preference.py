@@ -27,9 +27,80 @@ class AddonPreference(bpy.types.AddonPreferences):
                                                          update=update_default_bake_resolution,
                                                          translation_context="BakeNodePref")
 
+    bake_agents: bpy.props.StringProperty(name="Bake Agents",
+                                          description="Remote bake agents, host:port separated by commas. Empty to bake locally",
+                                          default="",
+                                          translation_context="BakeNodePref")
+    agent_retries: bpy.props.IntProperty(name="Agent Retries",
+                                         description="Times a failed job is retried on any agent",
+                                         default=2,
+                                         min=0,
+                                         max=10,
+                                         translation_context="BakeNodePref")
+
+    agent_token: bpy.props.StringProperty(name="Agent Token",
+                                          description="Shared token the bake agents were started with",
+                                          default="",
+                                          subtype="PASSWORD",
+                                          translation_context="BakeNodePref")
+
+    job_timeout: bpy.props.IntProperty(name="Job Timeout",
+                                       description="Kill a bake worker whose job runs longer than this (seconds), 0 for no limit",
+                                       default=0,
+                                       min=0,
+                                       translation_context="BakeNodePref")
+    stall_timeout: bpy.props.IntProperty(name="Stall Timeout",
+                                         description="Kill a bake worker that prints nothing for this long (seconds), 0 for no limit",
+                                         default=0,
+                                         min=0,
+                                         translation_context="BakeNodePref")
+    job_retries: bpy.props.IntProperty(name="Job Retries",
+                                       description="Times a local job is retried after its worker crashed or timed out",
+                                       default=2,
+                                       min=0,
+                                       max=10,
+                                       translation_context="BakeNodePref")
+    max_local_workers: bpy.props.IntProperty(name="Max Local Workers",
+                                             description="Background Blender processes baking in parallel on this machine. Fewer run when memory is short",
+                                             default=1,
+                                             min=1,
+                                             max=64,
+                                             translation_context="BakeNodePref")
+    worker_threads: bpy.props.IntProperty(name="Worker Threads",
+                                          description="Render threads per background Blender process, 0 to split the CPU cores between parallel workers",
+                                          default=0,
+                                          min=0,
+                                          max=1024,
+                                          translation_context="BakeNodePref")
+    pin_worker_cpus: bpy.props.BoolProperty(name="Pin Worker CPUs",
+                                            description="Bind each parallel worker to its own CPU cores (Linux only)",
+                                            default=False,
+                                            translation_context="BakeNodePref")
+    bake_device: bpy.props.EnumProperty(name="Bake Device",
+                                        items=[("AUTO", "Auto", "Use GPU when a compute device is available, otherwise CPU"),
+                                               ("GPU", "GPU", ""),
+                                               ("CPU", "CPU", "")],
+                                        default="AUTO",
+                                        translation_context="BakeNodePref")
+
     def draw(self, context):
         layout = self.layout
         layout.prop(self, "default_bake_resolution")
+        row = layout.row()
+        row.prop(self, "job_timeout")
+        row.prop(self, "stall_timeout")
+        row = layout.row()
+        row.prop(self, "job_retries")
+        row.prop(self, "max_local_workers")
+        row = layout.row()
+        row.prop(self, "bake_device")
+        row.prop(self, "worker_threads")
+        row.prop(self, "pin_worker_cpus")
+        layout.prop(self, "bake_agents")
+        if self.bake_agents:
+            row = layout.row()
+            row.prop(self, "agent_token")
+            row.prop(self, "agent_retries")
 
 
 def get_pref() -> AddonPreference:
@@ -24,21 +24,17 @@ class BakeTreeProps(bpy.types.PropertyGroup):
                                      max=100,
                                      subtype="PERCENTAGE",
                                      **common_kwargs)
+    eta: bpy.props.StringProperty(name="ETA", default="", **common_kwargs)
+    worker_usage: bpy.props.StringProperty(name="Worker Usage", default="", **common_kwargs)
     mat_preset_save_name: bpy.props.StringProperty(name="SaveName", default="", **common_kwargs)
     mat_name_as_save_name: bpy.props.BoolProperty(name="UseMatName", default=True, **common_kwargs)
     mat_preset_description: bpy.props.StringProperty(name="BakeTypeDescription", default="", **common_kwargs)
 
-    _presets = []
-
     def preset_items(self, context):
-        presets = []
         from .operators import BakeTreePresetsOps
-        preset_path = BakeTreePresetsOps.get_preset_dir()
-        for f in preset_path.glob("*.blend"):
-            presets.append((f.as_posix(), f.stem, "", 0))
-        self._presets.clear()
-        self._presets.extend(presets)
-        return self._presets
+        from ..node_tree.preset_registry import PresetRegistry
+        PresetRegistry.add("tree", BakeTreePresetsOps.get_preset_dir(), ".blend")
+        return PresetRegistry.items("tree", lambda i, name, entry: (entry["path"], name, "", i))
     preset: bpy.props.EnumProperty(items=preset_items)
     preset_save_name: bpy.props.StringProperty(name="SaveName", default="", **common_kwargs)
 
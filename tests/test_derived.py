@@ -0,0 +1,60 @@
+"""
+推导通道: 世界位置不在 [0, 1] 内时(真实模型), 纹素尺寸与曲率仍然正确
+"""
+import sys
+from pathlib import Path
+import numpy as np
+
+# 与后台进程相同, 直接导入 node_tree 下不依赖 bpy 的模块
+sys.path.insert(0, Path(__file__).parents[1].joinpath("src", "node_tree").as_posix())
+import derived  # noqa: E402
+from common import image_spec  # noqa: E402
+
+RADIUS = 20.0
+CENTER = np.array([100.0, -50.0, 30.0], dtype=np.float32)
+STEP = 0.01
+
+
+def sphere_patch(size=64):
+    """
+    球面上的一块区域, 每个像素对应 STEP 弧度, 返回 (法线图, 位置图)
+    """
+    a = (np.arange(size, dtype=np.float32) - size / 2) * STEP
+    phi, theta = np.meshgrid(a, a, indexing="ij")
+    n = np.stack([np.sin(theta) * np.cos(phi), np.sin(phi), np.cos(theta) * np.cos(phi)], axis=-1)
+    normal = np.ones((size, size, 4), dtype=np.float32)
+    normal[..., :3] = (n + 1) / 2
+    position = np.ones((size, size, 4), dtype=np.float32)
+    position[..., :3] = CENTER + RADIUS * n
+    return normal, position
+
+
+def test_position_out_of_unit_range():
+    normal, position = sphere_patch()
+    assert position[..., :3].min() < 0 and position[..., :3].max() > 1
+    coverage = np.ones(normal.shape[:2], dtype=bool)
+    step = derived.texel_size(position[..., :3], coverage)
+    assert np.isclose(step, RADIUS * STEP, rtol=0.01)
+    # 凸球面: 每像素的法线变化量为 STEP
+    k = derived.curvature(derived.decode_normal(normal), position[..., :3], coverage)
+    assert np.allclose(k[2:-2, 2:-2], STEP, rtol=0.05)
+    out = derived.compute("Curvature", normal, position, coverage=coverage, params={"blur": 0})
+    assert np.allclose(out[2:-2, 2:-2, 0], 0.5 + 0.5 * STEP * 4, atol=1e-3)
+
+
+def test_clamped_position_breaks_derived():
+    # 8位图像会把位置截断到 [0, 1] 并量化, 推导结果失效
+    normal, position = sphere_patch()
+    clamped = np.round(np.clip(position, 0, 1) * 255) / 255
+    coverage = np.ones(normal.shape[:2], dtype=bool)
+    assert derived.texel_size(clamped[..., :3], coverage) != RADIUS * STEP
+    out = derived.compute("Curvature", normal, clamped, coverage=coverage, params={"blur": 0})
+    assert not np.allclose(out[2:-2, 2:-2, 0], 0.5 + 0.5 * STEP * 4, atol=1e-3)
+
+
+def test_derived_sources_use_float_images():
+    for bake_pass in derived.DERIVED_SOURCES:
+        assert image_spec("Derived", bake_pass) == (True, "Non-Color")
+    assert image_spec("Internal", "POSITION") == (True, "Non-Color")
+    assert image_spec("PBR", "Roughness") == (False, "Non-Color")
+    assert image_spec("PBR", "Albedo") == (False, "sRGB")
@@ -0,0 +1,41 @@
+"""
+自动分辨率: 结果总是2的幂, 上下限不是2的幂时也一样
+"""
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).parents[1]
+# mesh_stats 在模块级导入 bpy, 使用基准测试的 bpy 替身
+sys.path.insert(0, ROOT.joinpath("benchmarks").as_posix())
+sys.path.insert(0, ROOT.joinpath("src", "node_tree").as_posix())
+import fake_bpy  # noqa: E402
+
+fake_bpy.install()
+from mesh_stats import auto_resolution  # noqa: E402
+
+
+def is_pow2(value: int) -> bool:
+    return value > 0 and value & (value - 1) == 0
+
+
+def test_power_of_two_bounds():
+    # 1 平方米, UV 占满: res = density
+    stats = {"world_area": 1.0, "uv_area": 1.0}
+    assert auto_resolution(stats, 300, 64, 4096) == 512
+    assert auto_resolution(stats, 10, 64, 4096) == 64
+    assert auto_resolution(stats, 10000, 64, 4096) == 4096
+
+
+def test_non_power_of_two_bounds():
+    stats = {"world_area": 1.0, "uv_area": 1.0}
+    # 上限 1000 向下取整为 512, 下限 100 向上取整为 128
+    assert auto_resolution(stats, 5000, 100, 1000) == 512
+    assert auto_resolution(stats, 10, 100, 1000) == 128
+    # 上下限之间没有2的幂时取上限以下的2的幂
+    assert auto_resolution(stats, 700, 600, 1000) == 512
+    for density in (1, 37, 300, 999, 1500, 10000):
+        assert is_pow2(auto_resolution(stats, density, 100, 1000))
+
+
+def test_missing_area_uses_lower_bound():
+    assert auto_resolution({}, 300, 100, 1000) == 128
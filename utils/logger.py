@@ -1,13 +1,20 @@
+import os
+import time
+import atexit
 import logging
+from queue import SimpleQueue
+from threading import Lock
 from logging import handlers
 from pathlib import Path
-DEBUG = True
+# BAKE_NODE_DEBUG=1 开启调试日志, BAKE_NODE_LOG_LEVEL 指定级别(DEBUG/INFO/WARNING/...)
+DEBUG = os.environ.get("BAKE_NODE_DEBUG", "").lower() in {"1", "true", "yes", "on"}
 LOGFILE = Path(__file__).parent.parent.joinpath("logs", "runtime.log")
 NAME = "BakeNode"
 
-L = logging.WARNING
-if DEBUG:
-    L = logging.DEBUG
+L = logging.DEBUG if DEBUG else logging.INFO
+L = logging.getLevelName(os.environ.get("BAKE_NODE_LOG_LEVEL", "").upper() or L)
+if not isinstance(L, int):
+    L = logging.INFO
 
 FMTDICT = {
     'DEBUG': ["[36m", "DBG"],
@@ -38,7 +45,9 @@ class KcHandler(logging.StreamHandler):
 
             end = "" if is_same_line else self.terminator
             stream.write(msg + end)
-            self.flush()
+            # 由 KcQueueListener 在队列空闲时统一 flush
+            if is_same_line:
+                self.flush()
         except RecursionError:
             raise
         except Exception:
@@ -62,22 +71,112 @@ class KcFilter(logging.Filter):
         return True
 
 
+class RateLimitFilter(logging.Filter):
+    """
+    在调用线程中过滤, 被丢弃的记录不进入队列
+        collapse: 带 collapse 键的记录(如 Cycles 进度行)每 interval 秒最多通过一条, 合并的条数附加到通过的记录上
+        rate: 每个来源(extra 的 source, 默认为 调用处的文件:行号)每秒最多通过 rate 条, 超出部分丢弃并在下一条记录中汇总
+    """
+
+    def __init__(self, interval=0.5, rate=50) -> None:
+        super().__init__()
+        self.interval = interval
+        self.rate = rate
+        self.lock = Lock()
+        self.collapse_state: dict[str, list] = {}
+        self.rate_state: dict[str, list] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        # 错误始终通过, 外部来源(如后台进程输出)的除外
+        if record.levelno >= logging.ERROR and not hasattr(record, "source"):
+            return True
+        now = time.monotonic()
+        with self.lock:
+            if key := getattr(record, "collapse", None):
+                return self.pass_collapse(key, record, now)
+            key = getattr(record, "source", None) or f"{record.pathname}:{record.lineno}"
+            return self.pass_rate(key, record, now)
+
+    def pass_collapse(self, key, record: logging.LogRecord, now) -> bool:
+        state = self.collapse_state.setdefault(key, [0, 0])
+        if now - state[0] < self.interval:
+            state[1] += 1
+            return False
+        if state[1]:
+            record.suppressed = state[1]
+        self.collapse_state[key] = [now, 0]
+        return True
+
+    def pass_rate(self, key, record: logging.LogRecord, now) -> bool:
+        # [窗口起点, 窗口内数量, 丢弃数量]
+        state = self.rate_state.setdefault(key, [now, 0, 0])
+        if now - state[0] >= 1:
+            if state[2]:
+                record.suppressed = state[2]
+            self.rate_state[key] = [now, 1, 0]
+            return True
+        if state[1] >= self.rate:
+            state[2] += 1
+            return False
+        state[1] += 1
+        return True
+
+
+class KcQueueHandler(handlers.QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # 不在调用线程中格式化, 由监听线程的各 handler 完成
+        return record
+
+
+class KcQueueListener(handlers.QueueListener):
+    """
+    队列取空后再 flush 所有 handler, 大量日志时不再逐条 flush
+    """
+
+    def dequeue(self, block):
+        if self.queue.empty():
+            for handler in self.handlers:
+                handler.flush()
+        return self.queue.get(block)
+
+    def handle(self, record: logging.LogRecord) -> None:
+        if suppressed := getattr(record, "suppressed", 0):
+            record.msg = f"{record.msg} (+{suppressed} suppressed)"
+            record.suppressed = 0
+        super().handle(record)
+
+
 class KcLogger(logging.Logger):
     def __init__(self, name, level=logging.NOTSET):
         self.closed = False
+        self.listener: KcQueueListener = None
         super().__init__(name, level)
 
     def set_translate(self, translate_func):
-        for handler in self.handlers:
+        # KcFilter 在监听线程的 handler 上, self.handlers 中只有队列 handler
+        handlers = self.listener.handlers if self.listener else self.handlers
+        for handler in handlers:
             for filter in handler.filters:
                 if not isinstance(filter, KcFilter):
                     continue
                 filter.translate_func = translate_func
 
+    def set_level(self, level):
+        self.setLevel(level)
+        if self.listener:
+            for handler in self.listener.handlers:
+                if isinstance(handler, KcHandler):
+                    handler.setLevel(level)
+
     def close(self):
         if self.closed:
             return
         self.closed = True
+        if self.listener:
+            # stop 会先处理完队列中剩余的记录
+            self.listener.stop()
+            self.handlers = self.listener.handlers[:]
+            self.listener = None
         for h in reversed(self.handlers[:]):
             try:
                 try:
@@ -115,9 +214,14 @@ def getLogger(name="CLOG", level=logging.INFO, fmt='[%(name)s-%(levelname)s]: %(
     l.setLevel(level)
     # 防止卸载模块后重新加载导致 重复打印
     if not l.hasHandlers():
-        # 注意添加顺序, ch有filter, 如果fh后添加 则会默认带上ch的filter
-        l.addHandler(dfh)
-        l.addHandler(ch)
+        # 文件/命令行输出在监听线程中进行, 注意顺序: ch的filter会修改记录, 需在dfh之后
+        q = SimpleQueue()
+        qh = KcQueueHandler(q)
+        qh.addFilter(RateLimitFilter())
+        l.addHandler(qh)
+        l.listener = KcQueueListener(q, dfh, ch, respect_handler_level=True)
+        l.listener.start()
+        atexit.register(l.close)
     return l
 
 
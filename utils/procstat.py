@@ -0,0 +1,142 @@
+"""
+从 /proc/<pid> 采样子进程资源占用(仅 Linux, 其他平台 read_proc 返回 None)
+    rss: 常驻内存(字节), cpu: 用户+系统CPU时间(秒), threads: 线程数, read/write: 实际读写磁盘字节数
+read_meminfo 读取整机内存(/proc/meminfo), 其他平台退回 sysconf
+"""
+from __future__ import annotations
+import os
+import time
+import threading
+from pathlib import Path
+
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+CLK_TCK = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+
+def read_proc(pid: int) -> dict | None:
+    proc = Path("/proc", str(pid))
+    try:
+        stat = proc.joinpath("stat").read_text()
+        statm = proc.joinpath("statm").read_text().split()
+    except OSError:
+        return None
+    # comm 字段可能包含空格, 从最后一个 ')' 之后开始解析
+    fields = stat[stat.rfind(")") + 2:].split()
+    sample = {
+        "t": time.monotonic(),
+        "rss": int(statm[1]) * PAGE_SIZE,
+        "cpu": (int(fields[11]) + int(fields[12])) / CLK_TCK,
+        "threads": int(fields[17]),
+        "read": 0,
+        "write": 0,
+    }
+    try:
+        for line in proc.joinpath("io").read_text().splitlines():
+            key, _, value = line.partition(":")
+            if key == "read_bytes":
+                sample["read"] = int(value)
+            elif key == "write_bytes":
+                sample["write"] = int(value)
+    except OSError:
+        # 无权限读取 io 时忽略
+        ...
+    return sample
+
+
+def read_meminfo() -> dict | None:
+    """
+    {"total", "available"} 字节, 不可用时返回 None
+        available 取 MemAvailable(含可回收的缓存); sysconf 只能得到空闲页, 偏保守
+    """
+    try:
+        info = {}
+        for line in Path("/proc/meminfo").read_text().splitlines():
+            key, _, value = line.partition(":")
+            if key in {"MemTotal", "MemAvailable"}:
+                info[key] = int(value.split()[0]) * 1024
+        if len(info) == 2:
+            return {"total": info["MemTotal"], "available": info["MemAvailable"]}
+    except (OSError, ValueError):
+        ...
+    try:
+        return {"total": os.sysconf("SC_PHYS_PAGES") * PAGE_SIZE, "available": os.sysconf("SC_AVPHYS_PAGES") * PAGE_SIZE}
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+class ProcSampler:
+    """
+    后台线程按固定间隔采样, on_sample(latest, peak_rss) 在采样线程中回调
+        峰值为进程的绝对 RSS: 新启动的进程在任务开始时还在加载场景, 相对开始时的增量在新旧进程间不可比
+        采样序列超过 max_samples 的 2 倍时隔一个丢弃, 长时间任务的内存占用保持有界
+    """
+    max_samples = 240
+
+    def __init__(self, pid: int, interval=0.5, on_sample=None):
+        self.pid = pid
+        self.interval = interval
+        self.on_sample = on_sample
+        self.samples: list[dict] = []
+        self.base_rss = 0
+        self.peak_rss = 0
+        self.latest: dict = {}
+        self._stop = threading.Event()
+        self._thread: threading.Thread = None
+
+    def start(self) -> ProcSampler:
+        if self.pid and Path("/proc", str(self.pid)).exists():
+            self._thread = threading.Thread(target=self._loop, daemon=True)
+            self._thread.start()
+        return self
+
+    def _loop(self):
+        prev = None
+        while not self._stop.is_set():
+            sample = read_proc(self.pid)
+            if sample is None:
+                break
+            # 两次采样间的CPU占用率(100% = 一个核心)
+            sample["cpu_pct"] = 0.0
+            if prev and sample["t"] > prev["t"]:
+                sample["cpu_pct"] = (sample["cpu"] - prev["cpu"]) / (sample["t"] - prev["t"]) * 100
+            prev = sample
+            if not self.samples:
+                self.base_rss = sample["rss"]
+            self.peak_rss = max(self.peak_rss, sample["rss"])
+            self.latest = sample
+            self.samples.append(sample)
+            if len(self.samples) > self.max_samples * 2:
+                del self.samples[1::2]
+            if self.on_sample:
+                self.on_sample(sample, self.peak_rss)
+            self._stop.wait(self.interval)
+
+    def stop(self) -> dict:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(self.interval * 2)
+        return self.summary()
+
+    def summary(self) -> dict:
+        """
+        用于写入性能历史: 峰值/均值及精简后的采样序列(MB, %, 线程数)
+            peak_rss_mb: 任务期间进程的绝对峰值(含 blender 基础占用和场景)
+            base_rss_mb: 第一次采样时进程已占用的内存(复用的常驻进程已加载场景, 新启动的进程接近 0), 只作参考
+        """
+        if not self.samples:
+            return {}
+        t0 = self.samples[0]["t"]
+        first, last = self.samples[0], self.samples[-1]
+        return {
+            "peak_rss_mb": self.peak_rss / 2 ** 20,
+            "base_rss_mb": self.base_rss / 2 ** 20,
+            # 按CPU时间计算, 不受采样序列精简的影响
+            "avg_cpu_pct": (last["cpu"] - first["cpu"]) / (last["t"] - t0) * 100 if last["t"] > t0 else 0.0,
+            "max_threads": max(s["threads"] for s in self.samples),
+            "read_mb": (last["read"] - first["read"]) / 2 ** 20,
+            "write_mb": (last["write"] - first["write"]) / 2 ** 20,
+            "samples": [
+                (round(s["t"] - t0, 2), round(s["rss"] / 2 ** 20, 1), round(s["cpu_pct"], 1), s["threads"])
+                for s in self.samples
+            ],
+        }
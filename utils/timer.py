@@ -1,23 +1,122 @@
 import bpy
+import time
+import threading
 import traceback
-from queue import Queue
-from typing import Any
+from concurrent.futures import Future
+from queue import Queue, Empty
+from typing import Any, Callable
 from .logger import logger
 
 
+class _Call:
+    __slots__ = ("func", "args", "kwargs", "future", "queued")
+
+    def __init__(self, func, args=(), kwargs=None, future: Future = None):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs or {}
+        self.future = future
+        self.queued = time.perf_counter()
+
+
 class Timer:
+    """
+    主线程调度器: 其他线程提交的函数在 bpy.app.timers 中执行
+        submit: 返回 Future, 主线程中调用时直接执行
+        put: 只提交不等待(兼容旧接口, 支持 (func, *args) 元组)
+        set_attrs: 批量属性写入, 同一 key 的多次写入合并为一次调用
+        budget: 每次 tick 最多占用的时间(秒), 超出后剩余任务留到下一次 tick, 保证界面响应
+    """
     TimerQueue = Queue()
+    budget = 0.004
+    interval = 0.01666
+    stats = {"count": 0, "total": 0.0, "max": 0.0, "backlog": 0}
+    _pending_attrs: dict[Any, _Call] = {}
+    _attrs_lock = threading.Lock()
+
+    @classmethod
+    def is_main_thread(cls) -> bool:
+        return threading.current_thread() is threading.main_thread()
 
     @classmethod
     def put(cls, delegate: Any):
-        cls.TimerQueue.put(delegate)
+        if isinstance(delegate, (list, tuple)):
+            cls.TimerQueue.put(_Call(delegate[0], tuple(delegate[1:])))
+        else:
+            cls.TimerQueue.put(_Call(delegate))
+
+    @classmethod
+    def submit(cls, func: Callable, *args, **kwargs) -> Future:
+        future = Future()
+        call = _Call(func, args, kwargs, future)
+        if cls.is_main_thread():
+            cls.execute(call)
+        else:
+            cls.TimerQueue.put(call)
+        return future
+
+    @classmethod
+    def set_attrs(cls, target, values: dict, key=None) -> Future:
+        """
+        target: 对象 或 返回对象的函数(在主线程中解析, 避免在子线程中访问 bpy 数据)
+        key: 合并写入的标识, 执行前同一 key 的后续写入合并到同一次调用(后写覆盖先写)
+        Future 结果为写入前的旧值
+        """
+        if key is None:
+            return cls.submit(cls._apply_attrs, target, dict(values))
+        with cls._attrs_lock:
+            call = cls._pending_attrs.get(key)
+            if call:
+                call.args[2].update(values)
+                return call.future
+            call = _Call(cls._flush_attrs, (key, target, dict(values)), None, Future())
+            cls._pending_attrs[key] = call
+        if cls.is_main_thread():
+            cls.execute(call)
+        else:
+            cls.TimerQueue.put(call)
+        return call.future
 
     @classmethod
-    def executor(cls, t):
-        if isinstance(t, (list, tuple)):
-            t[0](*t[1:])
+    def _flush_attrs(cls, key, target, values: dict):
+        with cls._attrs_lock:
+            cls._pending_attrs.pop(key, None)
+            values = dict(values)
+        return cls._apply_attrs(target, values)
+
+    @staticmethod
+    def _apply_attrs(target, values: dict) -> dict:
+        if callable(target):
+            target = target()
+        old = {}
+        for attr, value in values.items():
+            old[attr] = getattr(target, attr)
+            setattr(target, attr, value)
+        return old
+
+    @classmethod
+    def execute(cls, call: _Call):
+        latency = time.perf_counter() - call.queued
+        stats = cls.stats
+        stats["count"] += 1
+        stats["total"] += latency
+        stats["max"] = max(stats["max"], latency)
+        future = call.future
+        if future and not future.set_running_or_notify_cancel():
+            return
+        try:
+            res = call.func(*call.args, **call.kwargs)
+        except Exception as e:
+            if future:
+                future.set_exception(e)
+                return
+            traceback.print_exc()
+            logger.error("%s: %s", type(e).__name__, e)
+        except KeyboardInterrupt:
+            ...
         else:
-            t()
+            if future:
+                future.set_result(res)
 
     @classmethod
     def run(cls):
@@ -25,39 +124,45 @@ class Timer:
 
     @classmethod
     def run_ex(cls, queue: Queue):
-        while not queue.empty():
-            t = queue.get()
+        deadline = time.perf_counter() + cls.budget
+        # 至少执行一个, 避免单个耗时任务饿死
+        while True:
             try:
-                cls.executor(t)
-            except Exception as e:
-                traceback.print_exc()
-                logger.error("%s: %s", type(e).__name__, e)
-            except KeyboardInterrupt:
-                ...
-        return 0.01666
+                call = queue.get_nowait()
+            except Empty:
+                cls.stats["backlog"] = 0
+                return cls.interval
+            if not isinstance(call, _Call):
+                call = _Call(call[0], tuple(call[1:])) if isinstance(call, (list, tuple)) else _Call(call)
+            cls.execute(call)
+            if time.perf_counter() >= deadline:
+                break
+        cls.stats["backlog"] = queue.qsize()
+        return 0 if cls.stats["backlog"] else cls.interval
+
+    @classmethod
+    def latency_stats(cls) -> dict:
+        stats = dict(cls.stats)
+        stats["avg"] = stats["total"] / stats["count"] if stats["count"] else 0
+        return stats
+
+    @classmethod
+    def reset_stats(cls):
+        cls.stats.update({"count": 0, "total": 0.0, "max": 0.0, "backlog": 0})
 
     @classmethod
     def clear(cls):
         while not cls.TimerQueue.empty():
-            cls.TimerQueue.get()
+            call = cls.TimerQueue.get()
+            if isinstance(call, _Call) and call.future:
+                call.future.cancel()
+        with cls._attrs_lock:
+            cls._pending_attrs.clear()
 
     @classmethod
     def wait_run(cls, func):
         def wrap(*args, **kwargs):
-            q = Queue()
-
-            def wrap_job(q):
-                try:
-                    res = func(*args, **kwargs)
-                    q.put(res)
-                except Exception as e:
-                    q.put(e)
-
-            cls.put((wrap_job, q))
-            res = q.get()
-            if isinstance(res, Exception):
-                raise res
-            return res
+            return cls.submit(func, *args, **kwargs).result()
 
         return wrap
 
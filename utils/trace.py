@@ -0,0 +1,124 @@
+"""
+Chrome Trace Event 格式的耗时追踪, 生成的 trace.json 可用 Perfetto / chrome://tracing 打开
+    Trace.begin/end 之间的 span 写入同一文件, 后台烘焙进程的事件通过 add_events 合并
+    没有进行中的追踪时, span 暂存起来并归入下一次追踪(如提交任务前的节点树导出)
+"""
+from __future__ import annotations
+import os
+import re
+import json
+import time
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from .logger import logger
+
+TRACE_DIR = Path(__file__).parent.parent.joinpath("logs", "traces")
+
+
+def now_us() -> int:
+    # 使用墙上时间, 以便与子进程的时间戳对齐
+    return time.time_ns() // 1000
+
+
+class Tracer:
+    def __init__(self, name: str):
+        self.name = name
+        self.pid = os.getpid()
+        self.events: list[dict] = []
+        self.lock = threading.Lock()
+        self.named_pids: set[int] = set()
+        self.add_meta(self.pid, "Blender")
+
+    def add_meta(self, pid, name):
+        self.named_pids.add(pid)
+        self.events.append({"name": "process_name", "ph": "M", "pid": pid, "tid": 0, "args": {"name": name}})
+
+    def add(self, event: dict):
+        with self.lock:
+            self.events.append(event)
+
+    def add_events(self, events: list[dict], process_name=""):
+        with self.lock:
+            for event in events:
+                pid = event.get("pid", 0)
+                if process_name and pid not in self.named_pids:
+                    self.add_meta(pid, f"{process_name} {pid}")
+                self.events.append(event)
+
+    def save(self, path: Path = None) -> Path:
+        if path is None:
+            stamp = time.strftime("%Y%m%d-%H%M%S")
+            safe = re.sub(r"[^\w\-.]+", "_", self.name) or "trace"
+            path = TRACE_DIR.joinpath(f"{stamp}_{safe}", "trace.json")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with self.lock:
+            data = {"traceEvents": list(self.events), "displayTimeUnit": "ms"}
+        path.write_text(json.dumps(data), encoding="utf-8")
+        return path
+
+
+class Trace:
+    current: Tracer = None
+    # 最近一次结束的追踪, 供基准测试汇总各阶段耗时
+    last: Tracer = None
+    pending: list[dict] = []
+    max_pending = 1024
+
+    @classmethod
+    def begin(cls, name: str) -> Tracer:
+        cls.current = Tracer(name)
+        pending, cls.pending = cls.pending, []
+        cls.current.add_events(pending)
+        return cls.current
+
+    @classmethod
+    def end(cls) -> Path | None:
+        tracer, cls.current = cls.current, None
+        if not tracer:
+            return None
+        cls.last = tracer
+        try:
+            path = tracer.save()
+        except OSError as e:
+            logger.warning(f"Trace save failed: {e}")
+            return None
+        logger.info("Trace saved: %s", path)
+        return path
+
+    @classmethod
+    def record(cls, name: str, start: int, end: int, cat="bake", **args):
+        event = {
+            "name": name,
+            "cat": cat,
+            "ph": "X",
+            "ts": start,
+            "dur": max(end - start, 0),
+            "pid": os.getpid(),
+            "tid": threading.get_native_id(),
+            "args": args,
+        }
+        if cls.current:
+            cls.current.add(event)
+        elif len(cls.pending) < cls.max_pending:
+            cls.pending.append(event)
+
+    @classmethod
+    @contextmanager
+    def span(cls, name: str, cat="bake", echo=None, **args):
+        """
+        echo: 结束时输出耗时的函数(如 executor.warn), 替代 ScopeTimer
+        """
+        start = now_us()
+        try:
+            yield
+        finally:
+            end = now_us()
+            cls.record(name, start, end, cat, **args)
+            if echo:
+                echo(f"{name}: cost {(end - start) / 1e6:.4f}s")
+
+    @classmethod
+    def add_events(cls, events: list[dict], process_name="Bake Worker"):
+        if cls.current:
+            cls.current.add_events(events, process_name)
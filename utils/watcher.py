@@ -1,26 +1,215 @@
+from __future__ import annotations
+import os
 import queue
 import time
+import select
+import struct
 import platform
-from threading import Thread
+from threading import Thread, Lock
 from pathlib import Path
 from functools import lru_cache
 from .logger import logger
 
 
+class PollingBackend:
+    """
+    通用后端: 定时 stat 所有注册路径(文件夹递归), 与上次快照比较
+    """
+    interval = 0.5
+
+    def __init__(self) -> None:
+        self.snapshots: dict[Path, dict[Path, tuple[int, int]]] = {}
+        self.lock = Lock()
+        self.next_poll = 0
+
+    @staticmethod
+    def snapshot(root: Path) -> dict[Path, tuple[int, int]]:
+        result = {}
+        try:
+            st = root.stat()
+        except OSError:
+            return result
+        result[root] = (st.st_mtime_ns, st.st_size)
+        if not root.is_dir():
+            return result
+        stack = [root]
+        while stack:
+            try:
+                with os.scandir(stack.pop()) as it:
+                    for entry in it:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(Path(entry.path))
+                        st = entry.stat(follow_symlinks=False)
+                        result[Path(entry.path)] = (st.st_mtime_ns, st.st_size)
+            except OSError:
+                continue
+        return result
+
+    def add(self, root: Path):
+        snap = self.snapshot(root)
+        with self.lock:
+            self.snapshots[root] = snap
+
+    def remove(self, root: Path):
+        with self.lock:
+            self.snapshots.pop(root, None)
+
+    def wait(self, timeout: float) -> dict[Path, set[Path]]:
+        delay = self.next_poll - time.monotonic()
+        if delay > 0:
+            time.sleep(min(delay, timeout))
+            if delay > timeout:
+                return {}
+        self.next_poll = time.monotonic() + self.interval
+        changes = {}
+        with self.lock:
+            roots = list(self.snapshots)
+        for root in roots:
+            new = self.snapshot(root)
+            with self.lock:
+                if root not in self.snapshots:
+                    continue
+                old = self.snapshots[root]
+                self.snapshots[root] = new
+            changed = {p for p in old.keys() | new.keys() if old.get(p) != new.get(p)}
+            if changed:
+                changes[root] = changed
+        return changes
+
+    def close(self):
+        with self.lock:
+            self.snapshots.clear()
+
+
+class InotifyBackend:
+    """
+    Linux inotify 后端(ctypes), 递归监听文件夹, 新建的子文件夹自动加入监听
+    """
+    IN_MODIFY = 0x00000002
+    IN_ATTRIB = 0x00000004
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_DELETE_SELF = 0x00000400
+    IN_MOVE_SELF = 0x00000800
+    IN_Q_OVERFLOW = 0x00004000
+    IN_IGNORED = 0x00008000
+    IN_ISDIR = 0x40000000
+    IN_NONBLOCK = 0o4000
+    IN_CLOEXEC = 0o2000000
+    # 不监听 IN_MODIFY, 文件写入过程中不通知, 写完(CLOSE_WRITE)后通知一次
+    MASK = (IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE
+            | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF)
+    EVENT = struct.Struct("iIII")
+
+    def __init__(self) -> None:
+        import ctypes
+        import ctypes.util
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = self.libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.ctypes = ctypes
+        # wd -> (注册路径, 被监听的路径)
+        self.watches: dict[int, tuple[Path, Path]] = {}
+        self.lock = Lock()
+
+    def _add_watch(self, root: Path, path: Path):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), self.MASK)
+        if wd < 0:
+            logger.debug(f"inotify_add_watch failed: {path} errno={self.ctypes.get_errno()}")
+            return
+        with self.lock:
+            self.watches[wd] = (root, path)
+
+    def _add_tree(self, root: Path, path: Path):
+        self._add_watch(root, path)
+        if not path.is_dir():
+            return
+        for dirpath, dirnames, _ in os.walk(path):
+            for d in dirnames:
+                self._add_watch(root, Path(dirpath, d))
+
+    def add(self, root: Path):
+        self._add_tree(root, root)
+
+    def remove(self, root: Path):
+        with self.lock:
+            wds = [wd for wd, (r, _) in self.watches.items() if r == root]
+            for wd in wds:
+                self.watches.pop(wd)
+        for wd in wds:
+            self.libc.inotify_rm_watch(self.fd, wd)
+
+    def wait(self, timeout: float) -> dict[Path, set[Path]]:
+        try:
+            readable, _, _ = select.select([self.fd], [], [], timeout)
+        except (OSError, ValueError):
+            return {}
+        if not readable:
+            return {}
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return {}
+        changes: dict[Path, set[Path]] = {}
+        offset = 0
+        while offset + self.EVENT.size <= len(data):
+            wd, mask, _, length = self.EVENT.unpack_from(data, offset)
+            offset += self.EVENT.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+            if mask & self.IN_Q_OVERFLOW:
+                # 事件队列溢出, 所有注册路径视为变化
+                with self.lock:
+                    roots = {r for r, _ in self.watches.values()}
+                for root in roots:
+                    changes.setdefault(root, set()).add(root)
+                continue
+            with self.lock:
+                watch = self.watches.get(wd)
+                if mask & self.IN_IGNORED:
+                    self.watches.pop(wd, None)
+            if not watch:
+                continue
+            root, path = watch
+            if name:
+                path = path.joinpath(os.fsdecode(name))
+            if mask & self.IN_ISDIR and mask & (self.IN_CREATE | self.IN_MOVED_TO):
+                self._add_tree(root, path)
+            changes.setdefault(root, set()).add(path)
+        return changes
+
+    def close(self):
+        if self.fd < 0:
+            return
+        os.close(self.fd)
+        self.fd = -1
+        with self.lock:
+            self.watches.clear()
+
+
 class FSWatcher:
     """
     监听文件/文件夹变化的工具类
-        register: 注册监听, 传入路径和回调函数(可空)
+        register: 注册监听, 传入路径和回调函数(可空), 回调参数为 (注册路径, 变化的文件集合)
         unregister: 注销监听
         run: 监听循环, 使用单例,只在第一次初始化时调用
         stop: 停止监听, 释放资源
         consume_change: 消费变化, 当监听对象发生变化时记录为changed, 主动消费后置False, 用于自定义回调函数
+    Linux 使用 inotify, 其他平台(或 inotify 不可用时)轮询
+    debounce 时间内连续发生的变化合并为一次回调
     """
     _watcher_path: dict[Path, bool] = {}
-    _watcher_stat = {}
     _watcher_callback = {}
     _watcher_queue = queue.Queue()
     _running = False
+    _backend: PollingBackend | InotifyBackend = None
+    debounce = 0.2
+    # 持续有变化时, 最长延迟
+    max_delay = 2.0
 
     @classmethod
     def init(cls) -> None:
@@ -33,18 +222,34 @@ class FSWatcher:
             return
         cls._watcher_path[path] = False
         cls._watcher_callback[path] = callback
+        if cls._backend:
+            cls._backend.add(path)
 
     @classmethod
     def unregister(cls, path):
         path = cls.to_path(path)
-        cls._watcher_path.pop(path)
-        cls._watcher_callback.pop(path)
+        cls._watcher_path.pop(path, None)
+        cls._watcher_callback.pop(path, None)
+        if cls._backend:
+            cls._backend.remove(path)
+
+    @classmethod
+    def create_backend(cls) -> PollingBackend | InotifyBackend:
+        if platform.system() == "Linux":
+            try:
+                return InotifyBackend()
+            except (OSError, AttributeError) as e:
+                logger.warning(f"inotify unavailable, fallback to polling: {e}")
+        return PollingBackend()
 
     @classmethod
     def _run(cls):
         if cls._running:
             return
         cls._running = True
+        cls._backend = cls.create_backend()
+        for path in list(cls._watcher_path):
+            cls._backend.add(path)
         Thread(target=cls._loop, daemon=True).start()
         Thread(target=cls._run_ex, daemon=True).start()
 
@@ -52,38 +257,57 @@ class FSWatcher:
     def _run_ex(cls):
         while cls._running:
             try:
-                path = cls._watcher_queue.get(timeout=0.1)
+                item = cls._watcher_queue.get(timeout=0.1)
+                if item is None:
+                    continue
+                path, changes = item
                 if path not in cls._watcher_path:
                     continue
                 if callback := cls._watcher_callback[path]:
-                    callback(path)
+                    callback(path, changes)
             except queue.Empty:
                 pass
+            except Exception as e:
+                logger.error(f"FSWatcher callback error: {e}")
 
     @classmethod
     def _loop(cls):
         """
-            监听所有注册的路径, 有变化时记录为changed
+            监听所有注册的路径, 有变化时记录为changed, 合并 debounce 时间内的变化后分发
         """
+        backend = cls._backend
+        pending: dict[Path, set[Path]] = {}
+        first = last = 0
         while cls._running:
-            # list() avoid changed while iterating
-            for path, changed in list(cls._watcher_path.items()):
-                if changed:
-                    continue
-                if not path.exists():
-                    continue
-                mtime = path.stat().st_mtime_ns
-                if cls._watcher_stat.get(path, None) == mtime:
+            timeout = 0.5
+            if pending:
+                now = time.monotonic()
+                timeout = max(min(last + cls.debounce, first + cls.max_delay) - now, 0)
+            changes = backend.wait(timeout)
+            now = time.monotonic()
+            if changes:
+                if not pending:
+                    first = now
+                last = now
+                for path, changed in changes.items():
+                    pending.setdefault(path, set()).update(changed)
+            if not pending:
+                continue
+            if now - last < cls.debounce and now - first < cls.max_delay:
+                continue
+            for path, changed in pending.items():
+                if path not in cls._watcher_path:
                     continue
-                cls._watcher_stat[path] = mtime
                 cls._watcher_path[path] = True
-                cls._watcher_queue.put(path)
-            time.sleep(0.5)
+                cls._watcher_queue.put((path, changed))
+            pending = {}
+        backend.close()
 
     @classmethod
     def stop(cls):
         cls._watcher_queue.put(None)
         cls._running = False
+        cls._backend = None
 
     @classmethod
     def consume_change(cls, path) -> bool: